@@ -0,0 +1,95 @@
+"""Benchmark JSONC comment stripping on large generated settings files.
+
+Compares the previous per-character implementation of soft_read_json_file with
+strip_jsonc.
+
+Usage: python benchmarks/bench_jsonc.py [--keys 1000 10000 50000]
+"""
+
+import argparse
+import json
+import time
+from typing import List
+
+from multi.utils import strip_jsonc
+
+
+def legacy_strip_comments(lines: List[str]) -> str:
+    """The comment handling soft_read_json_file used before strip_jsonc."""
+    result = []
+    for line in lines:
+        processed_line = ""
+        in_string = False
+        string_char = None
+        i = 0
+        while i < len(line):
+            char = line[i]
+            if char in ['"', "'"] and (i == 0 or line[i - 1] != "\\"):
+                if not in_string:
+                    in_string = True
+                    string_char = char
+                elif string_char == char:
+                    in_string = False
+                    string_char = None
+            if (
+                not in_string
+                and char == "/"
+                and i + 1 < len(line)
+                and line[i + 1] == "/"
+            ):
+                break
+            processed_line += char
+            i += 1
+        result.append(processed_line)
+    return "".join(result)
+
+
+def generate_settings(keys: int) -> str:
+    """A settings.json-like document with comments every few lines.
+
+    Values are long strings and lists, similar to cSpell.words or files.exclude,
+    so some lines are long.
+    """
+    lines = ["// Generated benchmark settings", "{"]
+    for i in range(keys):
+        if i % 10 == 0:
+            lines.append(f"    // Section {i}")
+        if i % 100 == 0:
+            words = ", ".join(f'"word{j}"' for j in range(200))
+            lines.append(f'    "list.{i}": [{words}],')
+        else:
+            lines.append(f'    "key.{i}": "${{workspaceFolder}}/path/to/{i}/file.py",')
+    lines.append('    "last": true')
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def best_of(func, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    for keys in args.keys:
+        text = generate_settings(keys)
+        lines = text.splitlines(keepends=True)
+        assert json.loads(strip_jsonc(text)) == json.loads(legacy_strip_comments(lines))
+
+        legacy = best_of(lambda lines=lines: legacy_strip_comments(lines))
+        scanner = best_of(lambda text=text: strip_jsonc(text))
+        print(
+            f"{keys} keys ({len(text) / 1024:.0f} KiB): legacy {legacy * 1000:.1f} ms, "
+            f"strip_jsonc {scanner * 1000:.1f} ms ({legacy / scanner:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Benchmark deep_merge on large settings from many repositories.
+
+Two scenarios:
+
+- lists: each repository contributes a list of launch-configuration-like dicts
+  and a cSpell.words-like list of strings, most of which are shared with the
+  other repositories. Compares the previous linear-scan list union with the
+  hash indexed one. The linear scan is quadratic, so it is only run at
+  --legacy-items.
+- settings: each repository has a large settings.json, merged the way
+  SettingsFileMerger does it. Compares time and peak memory (tracemalloc) of
+  the previous copy-everything merge with the copy-on-write one.
+
+Usage: python benchmarks/bench_merge.py [--scenario lists|settings|all]
+           [--items 10000] [--repos 50] [--legacy-items 1000]
+           [--settings-repos 100] [--settings-keys 2000]
+"""
+
+import argparse
+import contextlib
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+from unittest import mock
+
+import multi.sync_vscode_helpers
+from multi.sync_vscode_helpers import _list_union, _OwnedNodes, deep_merge
+
+
+def legacy_list_union(
+    existing: List[Any], new: List[Any], owned: Any = None
+) -> List[Any]:
+    """The list union _deep_merge_recursive used before the hash index."""
+    return existing + [x for x in new if x not in existing]
+
+
+def legacy_prefix_repo_name_to_path_recursive(value: Any, repo_name: str) -> Any:
+    """prefix_repo_name_to_path_recursive before it stopped rebuilding every container."""
+    if isinstance(value, str) and "${workspaceFolder}" in value:
+        return multi.sync_vscode_helpers.prefix_repo_name_to_path(value, repo_name)
+    elif isinstance(value, dict):
+        return {
+            k: legacy_prefix_repo_name_to_path_recursive(v, repo_name)
+            for k, v in value.items()
+        }
+    elif isinstance(value, list):
+        return [
+            legacy_prefix_repo_name_to_path_recursive(item, repo_name) for item in value
+        ]
+    return value
+
+
+def legacy_deep_merge_recursive(
+    base: Dict[str, Any], override: Dict[str, Any]
+) -> Dict[str, Any]:
+    """_deep_merge_recursive before copy-on-write: copies base at every level."""
+    merged = base.copy()
+    for key, value in override.items():
+        if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
+            merged[key] = legacy_deep_merge_recursive(merged[key], value)
+        elif (
+            key in merged and isinstance(merged[key], list) and isinstance(value, list)
+        ):
+            merged[key] = _list_union(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def generate_repo_settings(repo: int, items: int) -> Dict[str, Any]:
+    """List-heavy settings for one repository. Every tenth item is repo specific."""
+
+    def owner(i: int) -> str:
+        return f"repo{repo}" if i % 10 == 0 else "shared"
+
+    return {
+        "configurations": [
+            {"name": f"{owner(i)} config {i}", "port": 9000 + i, "args": ["--x", i]}
+            for i in range(items)
+        ],
+        "cSpell.words": [f"{owner(i)}word{i}" for i in range(items)],
+    }
+
+
+def generate_large_settings(repo: int, keys: int) -> Dict[str, Any]:
+    """A large settings.json: many scalar keys, nested language sections,
+    a big files.exclude map and a few paths using ${workspaceFolder}."""
+    settings: Dict[str, Any] = {
+        f"extension{i % 50}.option{i}": i if i % 3 else f"value {i}"
+        for i in range(keys)
+    }
+    settings["files.exclude"] = {f"**/generated{i}": True for i in range(keys // 4)}
+    settings["files.exclude"][f"**/repo{repo}-only"] = True
+    for language in ("python", "typescript", "json", "markdown"):
+        settings[f"[{language}]"] = {
+            "editor.formatOnSave": True,
+            "editor.rulers": [80, 120],
+            "editor.codeActionsOnSave": {
+                f"source.fix{i}": "explicit" for i in range(20)
+            },
+        }
+    settings["python.analysis.extraPaths"] = ["${workspaceFolder}/src"]
+    settings["cSpell.words"] = [f"word{i}" for i in range(keys // 4)] + [f"repo{repo}"]
+    return settings
+
+
+def merge_all(repos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    owned = _OwnedNodes()
+    merged: Dict[str, Any] = {}
+    for repo_settings in repos:
+        merged = deep_merge(merged, repo_settings, owned=owned)
+    return merged
+
+
+def merge_settings_pipeline(repos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """How VSCodeFileMerger merges each repo into the accumulated result."""
+    owned = _OwnedNodes()
+    merged: Dict[str, Any] = {}
+    for i, repo_settings in enumerate(repos):
+        merged = deep_merge(merged, repo_settings, f"repo{i}", owned=owned)
+    return merged
+
+
+def legacy_merge_settings_pipeline(repos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged: Dict[str, Any] = {}
+    for i, repo_settings in enumerate(repos):
+        prefixed = legacy_prefix_repo_name_to_path_recursive(repo_settings, f"repo{i}")
+        merged = legacy_deep_merge_recursive(merged, prefixed)
+    return merged
+
+
+def time_merge(
+    repos: List[Dict[str, Any]], legacy: bool
+) -> Tuple[float, Dict[str, Any]]:
+    patch = (
+        mock.patch.object(multi.sync_vscode_helpers, "_list_union", legacy_list_union)
+        if legacy
+        else contextlib.nullcontext()
+    )
+    with patch:
+        start = time.perf_counter()
+        merged = merge_all(repos)
+        return time.perf_counter() - start, merged
+
+
+def measure(
+    func: Callable[[List[Dict[str, Any]]], Dict[str, Any]],
+    repos: List[Dict[str, Any]],
+) -> Tuple[float, float, Dict[str, Any]]:
+    """Best time of three runs, and the peak traced memory (MiB) of a separate run."""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        merged = func(repos)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(repos)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak / (1024 * 1024), merged
+
+
+def bench_lists(args: argparse.Namespace) -> None:
+    for items in sorted({args.legacy_items, args.items}):
+        repos = [generate_repo_settings(r, items) for r in range(args.repos)]
+        current, merged = time_merge(repos, legacy=False)
+        line = (
+            f"lists: {items} items x {args.repos} repos "
+            f"({len(merged['configurations'])} merged): hash index {current * 1000:.0f} ms"
+        )
+        if items <= args.legacy_items:
+            legacy, legacy_merged = time_merge(repos, legacy=True)
+            assert legacy_merged == merged
+            line += f", linear scan {legacy * 1000:.0f} ms ({legacy / current:.0f}x)"
+        print(line)
+
+
+def bench_settings(args: argparse.Namespace) -> None:
+    repos = [
+        generate_large_settings(r, args.settings_keys)
+        for r in range(args.settings_repos)
+    ]
+    legacy_time, legacy_peak, legacy_merged = measure(
+        legacy_merge_settings_pipeline, repos
+    )
+    current_time, current_peak, merged = measure(merge_settings_pipeline, repos)
+    assert merged == legacy_merged
+    print(
+        f"settings: {args.settings_keys} keys x {args.settings_repos} repos: "
+        f"copy everything {legacy_time * 1000:.0f} ms / {legacy_peak:.1f} MiB peak, "
+        f"copy-on-write {current_time * 1000:.0f} ms / {current_peak:.1f} MiB peak"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", choices=["lists", "settings", "all"], default="all"
+    )
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repos", type=int, default=50)
+    parser.add_argument("--legacy-items", type=int, default=1000)
+    parser.add_argument("--settings-repos", type=int, default=100)
+    parser.add_argument("--settings-keys", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.scenario in ("lists", "all"):
+        bench_lists(args)
+    if args.scenario in ("settings", "all"):
+        bench_settings(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark branch existence checks in repositories with many refs.
+
+Compares the previous GitPython implementation, which materializes every head
+and remote ref, with check_branch_existence, which looks refs up directly.
+
+Usage: python benchmarks/bench_refs.py [--refs 10000] [--queries 50]
+"""
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+import git
+
+from multi.git_helpers import check_branch_existence
+
+
+def legacy_check_branch_existence(
+    repo_path: Path, branch_name: str
+) -> Tuple[bool, bool]:
+    repo = git.Repo(repo_path)
+    exists_locally = branch_name in [head.name for head in repo.heads]
+    remote_refs = [ref.name for ref in repo.remotes.origin.refs]
+    exists_remotely = f"origin/{branch_name}" in remote_refs
+    return exists_locally, exists_remotely
+
+
+def create_repo_with_refs(repo_path: Path, ref_count: int, packed: bool) -> None:
+    """Create a repository with ref_count refs, split between heads and origin."""
+    repo = git.Repo.init(repo_path)
+    (repo_path / "README.md").write_text("bench")
+    repo.index.add(["README.md"])
+    commit = repo.index.commit("Initial commit").hexsha
+    repo.create_remote("origin", "https://example.invalid/bench.git")
+
+    commands = []
+    for i in range(ref_count // 2):
+        commands.append(f"create refs/heads/branch-{i} {commit}\n")
+        commands.append(f"create refs/remotes/origin/branch-{i} {commit}\n")
+    subprocess.run(
+        ["git", "update-ref", "--stdin"],
+        cwd=repo_path,
+        input="".join(commands),
+        text=True,
+        check=True,
+    )
+    if packed:
+        subprocess.run(["git", "pack-refs", "--all"], cwd=repo_path, check=True)
+
+
+def time_queries(func, repo_path: Path, ref_count: int, queries: int) -> float:
+    """Average seconds per query, mixing present and missing branches."""
+    names = [
+        f"branch-{i * (ref_count // 2) // queries}" if i % 2 else f"missing-{i}"
+        for i in range(queries)
+    ]
+    start = time.perf_counter()
+    for name in names:
+        func(repo_path, name)
+    return (time.perf_counter() - start) / queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--refs", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for packed in (False, True):
+            repo_path = Path(tmp) / ("packed" if packed else "loose")
+            create_repo_with_refs(repo_path, args.refs, packed=packed)
+            legacy = time_queries(
+                legacy_check_branch_existence, repo_path, args.refs, args.queries
+            )
+            direct = time_queries(
+                check_branch_existence, repo_path, args.refs, args.queries
+            )
+            layout = "packed" if packed else "loose"
+            print(
+                f"{args.refs} {layout} refs: legacy {legacy * 1000:.2f} ms/query, "
+                f"direct {direct * 1000:.3f} ms/query ({legacy / direct:.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark CLI startup time.
+
+Runs a few cheap commands in fresh interpreters. For each command it reports
+the best wall-clock time, the total time spent importing modules (from
+`python -X importtime`), and the slowest imports.
+
+Usage: python benchmarks/bench_startup.py [--runs 10] [--top 8]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+COMMANDS = [
+    ["--version"],
+    ["--help"],
+    ["sync", "--help"],
+    ["git", "--help"],
+]
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Map each imported module to its (self, cumulative) import time in µs."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run(args: List[str], importtime: bool = False) -> subprocess.CompletedProcess:
+    flags = ["-X", "importtime"] if importtime else []
+    return subprocess.run(
+        [sys.executable, *flags, "-m", "multi", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    for command in COMMANDS:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            run(command)
+            timings.append(time.perf_counter() - start)
+        modules = parse_importtime(run(command, importtime=True).stderr)
+
+        print(
+            f"multi {' '.join(command)}: {min(timings) * 1000:.0f} ms wall, "
+            f"imports {sum(s for s, _ in modules.values()) / 1000:.1f} ms, "
+            f"{len(modules)} modules, GitPython {'imported' if 'git' in modules else 'not imported'}"
+        )
+        slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (self_us, _) in slowest[: args.top]:
+            print(f"  {self_us / 1000:6.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Time the main multi operations on synthetic workspaces of several sizes.
+
+For each workspace size (number of repositories) a workspace is generated with
+synthetic_workspace.py, then each benchmark is run --repeat times:
+
+- sync_cold: `multi sync` in a new workspace root, cloning every repository
+- sync_warm: `multi sync` again, with nothing to clone or merge
+- sync_vscode_<kind>: each `multi sync vscode <kind>` with --force
+- sync_vscode_unchanged: `multi sync vscode` when every merge is up to date
+- set_branch_create / set_branch_checkout: `multi set-branch` to a new branch
+  and back to main
+- git_status: `multi git status --short` across every repository
+- soft_read_json_file: parsing every repository's settings.json
+- deep_merge: merging every repository's settings
+
+Operations are called in process, with a new WorkspaceSession for each run and
+an empty settings cache, so interpreter startup is not included (see
+bench_startup.py for that).
+
+Results are printed as a table and can be written as JSON with --output. With
+--baseline, each median is compared with a previous --output file and the
+script exits with status 1 if any benchmark got slower than --max-ratio.
+
+Usage: python benchmarks/suite.py [--repos 10 50 100] [--repeat 3]
+           [--vscode-items 200] [--rules 5] [--refs 100] [--untracked 100]
+           [--only sync_warm deep_merge] [--output results.json]
+           [--baseline previous.json] [--max-ratio 1.25]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from synthetic_workspace import (
+    DEFAULT_SPEC,
+    WorkspaceSpec,
+    add_untracked_files,
+    commit_workspace_root,
+    create_remotes,
+    create_workspace_root,
+)
+
+from multi._version import __version__
+from multi.git_run import run_git_in_all_repos
+from multi.git_set_branch import set_branch_in_all_repos
+from multi.session import WorkspaceSession
+from multi.settings import settings_cache
+from multi.sync import sync
+from multi.sync_vscode import merge_vscode_configs
+from multi.sync_vscode_extensions import merge_extensions_json
+from multi.sync_vscode_helpers import _OwnedNodes, deep_merge
+from multi.sync_vscode_launch import merge_launch_json
+from multi.sync_vscode_settings import merge_settings_json
+from multi.sync_vscode_tasks import merge_tasks_json
+from multi.utils import soft_read_json_file
+
+VSCODE_MERGES = {
+    "settings": merge_settings_json,
+    "launch": merge_launch_json,
+    "tasks": merge_tasks_json,
+    "extensions": merge_extensions_json,
+}
+
+
+def measure(func: Callable[[int], Any], repeat: int) -> List[float]:
+    """Seconds taken by each of repeat calls of func(run_index)."""
+    timings = []
+    for run in range(repeat):
+        settings_cache.clear()
+        start = time.perf_counter()
+        func(run)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_size(
+    workdir: Path, spec: WorkspaceSpec, repeat: int, only: List[str] | None
+) -> Dict[str, List[float]]:
+    """Generate a workspace of spec.repos repositories and run every benchmark on it."""
+    timings: Dict[str, List[float]] = {}
+
+    def bench(name: str, func: Callable[[int], Any]) -> None:
+        if only is None or name in only:
+            timings[name] = measure(func, repeat)
+            print(f"  {name}: {min(timings[name]) * 1000:.1f} ms", file=sys.stderr)
+
+    urls = create_remotes(workdir, spec)
+    roots = [
+        create_workspace_root(workdir / f"workspace{i}", urls) for i in range(repeat)
+    ]
+    # Every cold sync clones into its own root; the last one is used from then on
+    root = roots[-1]
+    if only is None or "sync_cold" in only:
+        bench("sync_cold", lambda run: sync(root_dir=roots[run]))
+    else:
+        sync(root_dir=root)
+    commit_workspace_root(root)
+
+    bench("sync_warm", lambda run: sync(root_dir=root))
+    for kind, merge in VSCODE_MERGES.items():
+        bench(f"sync_vscode_{kind}", lambda run, merge=merge: merge(root, force=True))
+    bench(
+        "sync_vscode_unchanged",
+        lambda run: merge_vscode_configs(WorkspaceSession(root)),
+    )
+    commit_workspace_root(root)
+
+    def set_branch(branch: str) -> None:
+        set_branch_in_all_repos(root_dir=root, branch_name=branch)
+
+    bench("set_branch_create", lambda run: set_branch(f"bench/create-{run}"))
+    set_branch("bench/checkout")
+    set_branch("main")
+    # Alternates between two branches that exist in every repository
+    bench(
+        "set_branch_checkout",
+        lambda run: set_branch("main" if run % 2 else "bench/checkout"),
+    )
+    set_branch("main")
+
+    add_untracked_files(root, spec.untracked)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        bench(
+            "git_status",
+            lambda run: run_git_in_all_repos(
+                WorkspaceSession(root), ["status", "--short"]
+            ),
+        )
+
+    settings_paths = sorted(root.glob("repo*/.vscode/settings.json"))
+    bench(
+        "soft_read_json_file",
+        lambda run: [soft_read_json_file(path) for path in settings_paths],
+    )
+    repo_settings = [soft_read_json_file(path) for path in settings_paths]
+
+    def merge_all(run: int) -> None:
+        owned = _OwnedNodes()
+        merged: Dict[str, Any] = {}
+        for i, settings in enumerate(repo_settings):
+            merged = deep_merge(merged, settings, f"repo{i}", owned=owned)
+
+    bench("deep_merge", merge_all)
+    return timings
+
+
+def environment() -> Dict[str, Any]:
+    git_version = subprocess.run(
+        ["git", "--version"], capture_output=True, text=True, check=False
+    ).stdout.strip()
+    return {
+        "multi": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git_version,
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline_path: Path, max_ratio: float
+) -> bool:
+    """Print each median against the baseline's; returns whether all are within max_ratio."""
+    baseline = {
+        (result["name"], result["repos"]): result["median_s"]
+        for result in json.loads(baseline_path.read_text())["results"]
+    }
+    ok = True
+    for result in results:
+        previous = baseline.get((result["name"], result["repos"]))
+        if not previous:
+            continue
+        ratio = result["median_s"] / previous
+        marker = ""
+        if ratio > max_ratio:
+            ok = False
+            marker = "  <-- regression"
+        print(
+            f"{result['name']:<24} {result['repos']:>5} repos: "
+            f"{ratio:5.2f}x baseline{marker}"
+        )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repos", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--vscode-items", type=int, default=DEFAULT_SPEC.vscode_items)
+    parser.add_argument("--rules", type=int, default=DEFAULT_SPEC.rules)
+    parser.add_argument("--refs", type=int, default=DEFAULT_SPEC.refs)
+    parser.add_argument("--untracked", type=int, default=100)
+    parser.add_argument("--only", nargs="+", help="Only run these benchmarks.")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON.")
+    parser.add_argument("--baseline", type=Path, help="A previous --output file.")
+    parser.add_argument("--max-ratio", type=float, default=1.25)
+    args = parser.parse_args()
+
+    # Only errors are shown, the benchmarks log a lot at INFO level
+    logging.basicConfig(level=logging.ERROR)
+
+    results = []
+    for repos in args.repos:
+        spec = WorkspaceSpec(
+            repos=repos,
+            vscode_items=args.vscode_items,
+            rules=args.rules,
+            refs=args.refs,
+            untracked=args.untracked,
+        )
+        print(f"{repos} repositories:", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix="multi-bench-") as tmp:
+            timings = run_size(Path(tmp), spec, args.repeat, args.only)
+        for name, values in timings.items():
+            results.append(
+                {
+                    "name": name,
+                    "repos": repos,
+                    "spec": spec._asdict(),
+                    "times_s": values,
+                    "min_s": min(values),
+                    "median_s": statistics.median(values),
+                }
+            )
+
+    print(f"\n{'benchmark':<24} {'repos':>5} {'min ms':>10} {'median ms':>10}")
+    for result in results:
+        print(
+            f"{result['name']:<24} {result['repos']:>5} "
+            f"{result['min_s'] * 1000:>10.1f} {result['median_s'] * 1000:>10.1f}"
+        )
+
+    if args.output:
+        args.output.write_text(
+            json.dumps({"environment": environment(), "results": results}, indent=2)
+            + "\n"
+        )
+    if args.baseline:
+        print()
+        if not compare(results, args.baseline, args.max_ratio):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
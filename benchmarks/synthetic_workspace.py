@@ -0,0 +1,245 @@
+"""Generate a synthetic multi workspace for benchmarks.
+
+Creates N local repositories, each with a bare "remote" and configurable
+.vscode files, Cursor rules and refs, plus a workspace root whose multi.json
+lists the remotes as file:// URLs. Cloning the repositories is left to
+`multi sync`, so that it can be timed.
+
+Usage: python benchmarks/synthetic_workspace.py DEST [--repos 100]
+           [--vscode-items 200] [--rules 5] [--refs 100]
+"""
+
+import argparse
+import json
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+from multi.sync_claude import convert_cursor_rules_to_claude_md
+
+GIT_ENV_CONFIG = [
+    "-c",
+    "user.name=multi-bench",
+    "-c",
+    "user.email=bench@example.invalid",
+    "-c",
+    "init.defaultBranch=main",
+    "-c",
+    "commit.gpgsign=false",
+]
+
+
+class WorkspaceSpec(NamedTuple):
+    """The shape of a synthetic workspace."""
+
+    repos: int = 100
+    # Settings keys per repo; launch configurations and tasks get a tenth of that
+    vscode_items: int = 200
+    rules: int = 5
+    # Extra branches per repo, which clones see as remote-tracking refs
+    refs: int = 100
+    untracked: int = 0
+
+
+DEFAULT_SPEC = WorkspaceSpec()
+
+
+def git(cwd: Path, *args: str, input: str | None = None) -> None:
+    subprocess.run(
+        ["git", *GIT_ENV_CONFIG, *args],
+        cwd=cwd,
+        input=input,
+        text=True,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def _owner(repo: int, i: int) -> str:
+    """Every tenth item is specific to a repo, the rest is shared by all repos."""
+    return f"repo{repo}" if i % 10 == 0 else "shared"
+
+
+def generate_settings(repo: int, items: int) -> Dict[str, Any]:
+    settings: Dict[str, Any] = {
+        f"extension{i % 20}.{_owner(repo, i)}Option{i}": i if i % 3 else f"value {i}"
+        for i in range(items)
+    }
+    settings["files.exclude"] = {
+        f"**/{_owner(repo, i)}-generated{i}": True for i in range(items // 4)
+    }
+    settings["cSpell.words"] = [f"{_owner(repo, i)}word{i}" for i in range(items // 4)]
+    settings["[python]"] = {
+        "editor.formatOnSave": True,
+        "editor.codeActionsOnSave": {f"source.fix{i}": "explicit" for i in range(10)},
+    }
+    settings["python.analysis.extraPaths"] = ["${workspaceFolder}/src"]
+    return settings
+
+
+def generate_launch(repo: int, items: int) -> Dict[str, Any]:
+    return {
+        "version": "0.2.0",
+        "configurations": [
+            {
+                "name": f"repo{repo}: run {i}",
+                "type": "debugpy",
+                "request": "launch",
+                "program": f"${{workspaceFolder}}/src/app{i}.py",
+                "args": ["--port", str(8000 + i)],
+                "required": i == 0,
+            }
+            for i in range(max(1, items // 10))
+        ],
+    }
+
+
+def generate_tasks(repo: int, items: int) -> Dict[str, Any]:
+    return {
+        "version": "2.0.0",
+        "tasks": [
+            {
+                "label": f"repo{repo}: task {i}",
+                "type": "shell",
+                "command": f"make target{i}",
+                "options": {"cwd": "${workspaceFolder}"},
+            }
+            for i in range(max(1, items // 10))
+        ],
+    }
+
+
+def generate_extensions(repo: int, items: int) -> Dict[str, Any]:
+    return {
+        "recommendations": [
+            f"publisher.{_owner(repo, i)}-extension{i}"
+            for i in range(max(1, items // 20))
+        ]
+    }
+
+
+def write_jsonc(path: Path, data: Dict[str, Any]) -> None:
+    """Write data as JSON with a few comments, like hand-edited .vscode files."""
+    lines = json.dumps(data, indent=4).splitlines()
+    for i in range(1, len(lines), 25):
+        lines[i] += "  // generated for benchmarks"
+    path.write_text("// Synthetic benchmark file\n" + "\n".join(lines) + "\n")
+
+
+def create_source_repo(path: Path, repo: int, spec: WorkspaceSpec) -> None:
+    """Create one repository with a commit of config files and spec.refs branches."""
+    vscode_dir = path / ".vscode"
+    rules_dir = path / ".cursor" / "rules"
+    vscode_dir.mkdir(parents=True)
+    rules_dir.mkdir(parents=True)
+
+    write_jsonc(
+        vscode_dir / "settings.json", generate_settings(repo, spec.vscode_items)
+    )
+    write_jsonc(vscode_dir / "launch.json", generate_launch(repo, spec.vscode_items))
+    write_jsonc(vscode_dir / "tasks.json", generate_tasks(repo, spec.vscode_items))
+    write_jsonc(
+        vscode_dir / "extensions.json", generate_extensions(repo, spec.vscode_items)
+    )
+    for i in range(spec.rules):
+        frontmatter = (
+            f"description: Rule {i} of repo{repo}\nglobs: *.py\n"
+            f"alwaysApply: {'true' if i == 0 else 'false'}\n"
+        )
+        body = f"Follow convention {i} in repo{repo}.\n" * 3
+        (rules_dir / f"rule{i}.mdc").write_text(f"---\n{frontmatter}---\n{body}")
+    if repo % 2 == 0:
+        (path / "pyproject.toml").write_text(f'[project]\nname = "repo{repo}"\n')
+    if repo == 0:
+        (path / "ruff.toml").write_text("line-length = 100\n")
+    (path / "README.md").write_text(f"# repo{repo}\n")
+    # Repositories commit the CLAUDE.md generated from their rules, so that
+    # syncing leaves them clean
+    convert_cursor_rules_to_claude_md(path / ".cursor")
+
+    git(path, "init", "-q")
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", "Initial commit")
+    if spec.refs:
+        git(
+            path,
+            "update-ref",
+            "--stdin",
+            input="".join(
+                f"create refs/heads/feature/branch-{i} HEAD\n" for i in range(spec.refs)
+            ),
+        )
+
+
+def create_remotes(dest: Path, spec: WorkspaceSpec) -> List[str]:
+    """Create the bare remotes under dest/remotes; returns their file:// URLs."""
+    # git runs in dest, and file:// URLs need absolute paths
+    dest = dest.resolve()
+    sources = dest / "sources"
+    remotes = dest / "remotes"
+    remotes.mkdir(parents=True)
+    urls = []
+    for repo in range(spec.repos):
+        source = sources / f"repo{repo}"
+        create_source_repo(source, repo, spec)
+        remote = remotes / f"repo{repo}.git"
+        git(dest, "clone", "-q", "--bare", str(source), str(remote))
+        urls.append(remote.as_uri())
+    return urls
+
+
+def create_workspace_root(root: Path, urls: List[str]) -> Path:
+    """Create a workspace root (a git repo with multi.json) for urls."""
+    root.mkdir(parents=True)
+    repos = [
+        {"url": url, "name": url.rsplit("/", 1)[-1][: -len(".git")]} for url in urls
+    ]
+    (root / "multi.json").write_text(json.dumps({"repos": repos}, indent=2) + "\n")
+    git(root, "init", "-q")
+    git(root, "add", "multi.json")
+    git(root, "commit", "-q", "-m", "Initial commit")
+    return root
+
+
+def commit_workspace_root(root: Path) -> None:
+    """Commit what sync generated, so that the root repo is clean."""
+    git(root, "add", "-A")
+    git(root, "commit", "-q", "--allow-empty", "-m", "Sync")
+
+
+def add_untracked_files(root: Path, count: int) -> None:
+    """Write count untracked files into every cloned repository of the workspace.
+
+    Repositories with untracked files are not clean, so this is done after
+    anything that needs clean repositories (like set-branch).
+    """
+    for repo_path in sorted(root.glob("repo*")):
+        untracked_dir = repo_path / "scratch"
+        untracked_dir.mkdir(exist_ok=True)
+        for i in range(count):
+            (untracked_dir / f"notes{i}.txt").write_text(f"untracked {i}\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dest", type=Path)
+    parser.add_argument("--repos", type=int, default=DEFAULT_SPEC.repos)
+    parser.add_argument("--vscode-items", type=int, default=DEFAULT_SPEC.vscode_items)
+    parser.add_argument("--rules", type=int, default=DEFAULT_SPEC.rules)
+    parser.add_argument("--refs", type=int, default=DEFAULT_SPEC.refs)
+    args = parser.parse_args()
+
+    spec = WorkspaceSpec(
+        repos=args.repos,
+        vscode_items=args.vscode_items,
+        rules=args.rules,
+        refs=args.refs,
+    )
+    urls = create_remotes(args.dest, spec)
+    root = create_workspace_root(args.dest / "workspace", urls)
+    print(f"Created {root} with {spec.repos} repositories. Run `multi sync` there.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,49 @@
+import importlib
+from typing import Dict, List
+
 import click
 
 from multi._version import __version__
-from multi.cli_helpers import common_command_wrapper
-from multi.git_run import git_cmd
-from multi.git_set_branch import set_branch_cmd
-from multi.init import init_cmd
-from multi.sync import sync_cmd
+
+# Subcommands are imported only when invoked (or listed by --help), so that
+# commands like `multi --version` do not pay for GitPython and every sync module
+LAZY_SUBCOMMANDS = {
+    "set-branch": "multi.git_set_branch:set_branch_cmd",
+    "sync": "multi.sync:sync_cmd",
+    "git": "multi.git_run:git_cmd",
+    "init": "multi.init:init_cmd",
+    "serve": "multi.serve:serve_cmd",
+    "cache": "multi.object_cache:cache_cmd",
+}
+
+
+class LazyGroup(click.Group):
+    """A click group that imports its subcommands on first use.
+
+    lazy_subcommands maps each command name to "module:attribute". Loaded
+    commands are wrapped with common_command_wrapper.
+    """
+
+    def __init__(self, *args, lazy_subcommands: Dict[str, str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = dict(lazy_subcommands or {})
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.lazy_subcommands:
+            self.add_command(self._load(cmd_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def _load(self, cmd_name: str) -> click.Command:
+        from multi.cli_helpers import common_command_wrapper
+
+        module_name, attribute = self.lazy_subcommands.pop(cmd_name).split(":")
+        command = getattr(importlib.import_module(module_name), attribute)
+        if not isinstance(command, click.Command):
+            raise ValueError(f"{module_name}:{attribute} is not a click command")
+        return common_command_wrapper(command)
 
 
 def print_version(ctx, param, value):
@@ -15,7 +53,7 @@ def print_version(ctx, param, value):
     ctx.exit()
 
 
-@click.group()
+@click.group(cls=LazyGroup, lazy_subcommands=LAZY_SUBCOMMANDS)
 @click.option(
     "--version",
     is_flag=True,
@@ -36,10 +74,5 @@ def main():
     pass
 
 
-main.add_command(common_command_wrapper(set_branch_cmd))
-main.add_command(common_command_wrapper(sync_cmd))
-main.add_command(common_command_wrapper(git_cmd))
-main.add_command(common_command_wrapper(init_cmd))
-
 if __name__ == "__main__":
     main()
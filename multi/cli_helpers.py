@@ -1,21 +1,39 @@
+import contextlib
 import functools
 import logging
 import sys
 import traceback
-from pathlib import Path
 
 import click
 
-from multi.errors import GitError
+from multi.errors import GitError, NoRepositoriesError
 from multi.git_helpers import check_all_on_same_branch
 from multi.logging import configure_logging
-from multi.paths import Paths
+from multi.metrics import CommandOutcome, command_metrics
+from multi.profiling import DEFAULT_PROFILE_PATH, profile_command, stage
+from multi.session import get_session
+from multi.settings import settings_cache
+from multi.tracing import OTLP_SUFFIX, trace_command
+
+
+def _command_name(ctx: click.Context) -> str:
+    """The command as typed, e.g. "multi sync vscode", however multi was started."""
+    names = []
+    while ctx.parent is not None:
+        names.append(ctx.info_name or "")
+        ctx = ctx.parent
+    return " ".join(["multi", *reversed(names)])
 
 
 def common_command_wrapper(command_to_wrap: click.Command) -> click.Command:
     """
     Wraps an existing Click command to add common functionality:
     - A --verbose option for detailed logging.
+    - A --profile[=PATH] option that runs the command under cProfile.
+    - A --trace PATH option that writes the command's stages as spans.
+    - Metrics added to a textfile, if the workspace or environment asks for them.
+      Commands that set records_own_metrics (such as serve, which runs for a
+      whole editor session) are left to record their own.
     - Standardized error handling and logging.
     This function modifies the command_to_wrap in-place.
     """
@@ -31,33 +49,76 @@ def common_command_wrapper(command_to_wrap: click.Command) -> click.Command:
         # Pop the verbose flag. It's added by this wrapper to the command's params.
         # Click will pass it in kwargs to this new_callback.
         verbose_value = kwargs.pop("verbose", False)
+        profile_path = kwargs.pop("profile", None)
+        trace_path = kwargs.pop("trace", None)
 
         # Configure logging based on verbosity
         log_level = logging.DEBUG if verbose_value else logging.INFO
         configure_logging(level=log_level)
 
         exit_code = None
-        try:
-            # Call the original command's callback with its intended kwargs
-            return original_callback(**kwargs)
-        except Exception as e:
-            logger = logging.getLogger(__name__)  # Get logger after configuration
-            logger.error(str(e))  # This will use the emoji formatter
-            if verbose_value:
-                # For verbose mode, also print traceback directly to stderr
-                click.secho("\nDebug traceback:", fg="yellow", err=True)
-                click.secho(traceback.format_exc(), fg="yellow", err=True)
-            exit_code = 1
-
-        # After every command, check that all sub-repos are on the same branch as the root repo
-        try:
-            paths = Paths(Path.cwd())
-            check_all_on_same_branch(paths=paths, raise_error=True)
-        except GitError as e:
-            click.secho(e.args[0], fg="red", err=True)
+        result = None
+        profiling = (
+            profile_command(profile_path) if profile_path else contextlib.nullcontext()
+        )
+        ctx = click.get_current_context()
+        command_name = _command_name(ctx)
+        if ctx.invoked_subcommand is not None:
+            command_name = f"{command_name} {ctx.invoked_subcommand}"
+        tracing = (
+            trace_command(trace_path, command_name)
+            if trace_path
+            else contextlib.nullcontext()
+        )
+        if getattr(command_to_wrap, "records_own_metrics", False):
+            metrics = contextlib.nullcontext(CommandOutcome())
+        elif ctx.invoked_subcommand is None:
+            metrics = command_metrics(get_session(), command_name)
+        else:
+            # A group's callback returns before its subcommand runs, so keep
+            # tracing and profiling until the context closes after the whole
+            # invocation. The group is counted as the subcommand in metrics.
+            ctx.with_resource(tracing)
+            ctx.with_resource(profiling)
+            tracing = profiling = contextlib.nullcontext()
+            metrics = contextlib.nullcontext(CommandOutcome())
+        with tracing, profiling, metrics as outcome:
+            try:
+                # Call the original command's callback with its intended kwargs
+                result = original_callback(**kwargs)
+            except Exception as e:
+                logger = logging.getLogger(__name__)  # Get logger after configuration
+                logger.error(str(e))  # This will use the emoji formatter
+                if verbose_value:
+                    # For verbose mode, also print traceback directly to stderr
+                    click.secho("\nDebug traceback:", fg="yellow", err=True)
+                    click.secho(traceback.format_exc(), fg="yellow", err=True)
+                exit_code = 1
+
+            # After every command, check that all sub-repos are on the same branch as the root repo.
+            # A group that goes on to run a subcommand leaves that to the subcommand.
+            if ctx.invoked_subcommand is None:
+                try:
+                    with stage("check branches"):
+                        session = get_session()
+                        check_all_on_same_branch(
+                            paths=session.paths, raise_error=True, repos=session.repos
+                        )
+                except GitError as e:
+                    click.secho(e.args[0], fg="red", err=True)
+                except (FileNotFoundError, NoRepositoriesError) as e:
+                    # Not in a workspace; already reported if the command failed
+                    if exit_code is None:
+                        raise click.ClickException(str(e)) from e
+            outcome.failed = exit_code is not None
+
+        logging.getLogger(__name__).debug(
+            f"Settings cache: {settings_cache.hits} hits, {settings_cache.misses} misses"
+        )
 
         if exit_code is not None:
             sys.exit(exit_code)
+        return result
 
     # Replace the command's callback with our new wrapped version
     command_to_wrap.callback = new_wrapped_callback
@@ -76,4 +137,33 @@ def common_command_wrapper(command_to_wrap: click.Command) -> click.Command:
         )
         command_to_wrap.params.append(verbose_option)
 
+    if not any(
+        isinstance(p, click.Option) and p.name == "profile"
+        for p in command_to_wrap.params
+    ):
+        command_to_wrap.params.append(
+            click.Option(
+                ["--profile"],
+                is_flag=False,
+                flag_value=DEFAULT_PROFILE_PATH,
+                default=None,
+                metavar="[PATH]",
+                help=f"Profile the command and write the stats to PATH (default: {DEFAULT_PROFILE_PATH}).",
+            )
+        )
+
+    if not any(
+        isinstance(p, click.Option) and p.name == "trace"
+        for p in command_to_wrap.params
+    ):
+        command_to_wrap.params.append(
+            click.Option(
+                ["--trace"],
+                type=click.Path(dir_okay=False),
+                default=None,
+                metavar="PATH",
+                help=f"Write a trace of the command to PATH (Chrome trace JSON, or OTLP JSON lines if PATH ends in {OTLP_SUFFIX}).",
+            )
+        )
+
     return command_to_wrap  # Return the modified command
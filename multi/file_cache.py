@@ -0,0 +1,86 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+from multi.parallel import run_in_parallel
+from multi.profiling import count, stage
+from multi.utils import soft_parse_json
+
+logger = logging.getLogger(__name__)
+
+
+def _copy_json(value: Any) -> Any:
+    """Copy the dicts and lists of a parsed JSON value; the rest is immutable."""
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+class FileCache:
+    """Contents of the files read during one invocation, shared by every stage.
+
+    preload() reads a batch of files concurrently, so that stages which then
+    read them one by one do not pay the filesystem latency of each file in turn.
+    A missing file is cached as None.
+
+    Entries are trusted until invalidate() is called, so code that rewrites a
+    file it (or a later stage) reads must invalidate it.
+    """
+
+    def __init__(self):
+        self._contents: Dict[Path, bytes | None] = {}
+        self._parsed: Dict[Path, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def preload(self, paths: Iterable[Path], jobs: int | None = None) -> None:
+        """Read every path that is not cached yet, concurrently."""
+        with self._lock:
+            pending = list(dict.fromkeys(p for p in paths if p not in self._contents))
+        if not pending:
+            return
+        logger.debug(f"Reading {len(pending)} files")
+        for result in run_in_parallel(self.read_bytes, pending, jobs=jobs):
+            if not result.ok:
+                logger.debug(f"Could not read {result.item}: {result.error}")
+
+    def read_bytes(self, path: Path) -> bytes | None:
+        """The contents of path, or None if it does not exist."""
+        with self._lock:
+            if path in self._contents:
+                count("cache_hits", cache="files")
+                return self._contents[path]
+        count("cache_misses", cache="files")
+        try:
+            with stage("read file", path=str(path)):
+                data: bytes | None = path.read_bytes()
+        except (FileNotFoundError, NotADirectoryError):
+            data = None
+        with self._lock:
+            return self._contents.setdefault(path, data)
+
+    def read_json(self, path: Path) -> Dict[str, Any]:
+        """Parse path like soft_read_json_file, reading it from the cache.
+
+        The file is parsed once and every call returns a copy of the result, so
+        callers may keep or modify what they get.
+        """
+        with self._lock:
+            parsed = self._parsed.get(path)
+        if parsed is None:
+            data = self.read_bytes(path)
+            if data is None:
+                return {}
+            parsed = soft_parse_json(data.decode("utf-8", errors="replace"), path)
+            with self._lock:
+                # Unless the file was invalidated while it was being parsed
+                if self._contents.get(path) is data:
+                    parsed = self._parsed.setdefault(path, parsed)
+        return _copy_json(parsed)
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            self._contents.pop(path, None)
+            self._parsed.pop(path, None)
@@ -0,0 +1,106 @@
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+PYTHON_MARKER_FILES = (
+    "pyproject.toml",
+    "requirements.txt",
+    "Pipfile",
+    "setup.py",
+    "environment.yml",
+    "setup.cfg",
+)
+
+# Files at the top level of a repository that multi cares about
+ROOT_FILES = frozenset(PYTHON_MARKER_FILES + ("ruff.toml", "CLAUDE.md"))
+
+# Directories that are listed, mapped to the file suffix that is recorded
+INDEXED_DIRS = {
+    ".vscode": ".json",
+    ".cursor/rules": ".mdc",
+}
+
+
+class RepoIndex:
+    """A snapshot of the files multi reads from one repository.
+
+    Built with a single os.scandir pass over the repository root, `.vscode` and
+    `.cursor/rules`, recording the stat info of every relevant file and
+    directory. Consumers query the index instead of probing the filesystem one
+    path at a time.
+
+    Keys are POSIX paths relative to the repository root, e.g.
+    ".vscode/settings.json".
+    """
+
+    def __init__(self, root: Path, entries: Dict[str, os.stat_result], exists: bool):
+        self.root = root
+        self.entries = entries
+        self.exists = exists
+
+    @classmethod
+    def scan(cls, root: Path) -> "RepoIndex":
+        entries: Dict[str, os.stat_result] = {}
+        try:
+            with os.scandir(root) as it:
+                for entry in it:
+                    if entry.name in ROOT_FILES and entry.is_file():
+                        entries[entry.name] = entry.stat()
+                    elif entry.name in (".vscode", ".cursor") and entry.is_dir():
+                        entries[entry.name] = entry.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            logger.debug(f"Repository directory {root} does not exist")
+            return cls(root, entries, exists=False)
+
+        for rel_dir, suffix in INDEXED_DIRS.items():
+            # Only descend into directories whose top-level parent was seen above
+            if rel_dir.split("/")[0] not in entries:
+                continue
+            try:
+                with os.scandir(root / rel_dir) as it:
+                    entries[rel_dir] = os.stat(root / rel_dir)
+                    for entry in it:
+                        if entry.name.endswith(suffix) and entry.is_file():
+                            entries[f"{rel_dir}/{entry.name}"] = entry.stat()
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+        return cls(root, entries, exists=True)
+
+    def _relative(self, path: Path | str) -> str:
+        path = Path(path)
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            if path.is_absolute():
+                raise
+            return path.as_posix()
+
+    def __contains__(self, path: Path | str) -> bool:
+        """Whether a path (absolute, or relative to the root) was indexed."""
+        try:
+            return self._relative(path) in self.entries
+        except ValueError:
+            return False
+
+    def stat(self, path: Path | str) -> os.stat_result | None:
+        try:
+            return self.entries.get(self._relative(path))
+        except ValueError:
+            return None
+
+    def files_in(self, rel_dir: str) -> List[Path]:
+        """Absolute paths of the indexed files directly inside rel_dir."""
+        prefix = f"{rel_dir}/"
+        return [
+            self.root / key
+            for key in self.entries
+            if key.startswith(prefix) and "/" not in key[len(prefix) :]
+        ]
+
+    @property
+    def is_python(self) -> bool:
+        return any(marker in self.entries for marker in PYTHON_MARKER_FILES)
@@ -1,23 +1,107 @@
 import logging
+import re
+import subprocess
+import tempfile
 from pathlib import Path
-from typing import Tuple
-
-import git
-from git.exc import InvalidGitRepositoryError
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Tuple
 
 from multi.errors import GitError, RepoNotCleanError
+from multi.parallel import run_in_parallel
 from multi.paths import Paths
+from multi.profiling import stage
+
+if TYPE_CHECKING:
+    from multi.repos import Repository
 
 logger = logging.getLogger(__name__)
 
+# How many offending files to report for a repository that is not clean
+DEFAULT_DIRTY_FILES_LIMIT = 10
+
+_OBJECT_ID_RE = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
 
 def is_git_repo_root(repo_path: Path) -> bool:
     # Will fail for submodules and worktrees, but these aren't used by us
     return (repo_path / ".git").is_dir()
 
 
+def resolve_git_dir(repo_path: Path) -> Path | None:
+    """Find the git directory of a repository without running git.
+
+    Handles both a `.git` directory and a `.git` file containing a
+    `gitdir:` pointer (used by worktrees and submodules). Returns None if
+    neither is found.
+    """
+    dot_git = repo_path / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    try:
+        content = dot_git.read_text().strip()
+    except OSError:
+        return None
+    if not content.startswith("gitdir:"):
+        return None
+    git_dir = Path(content[len("gitdir:") :].strip())
+    if not git_dir.is_absolute():
+        git_dir = repo_path / git_dir
+    return git_dir
+
+
+# HEAD file path -> ((mtime_ns, size, inode), branch)
+_head_cache: Dict[Path, Tuple[Tuple[int, int, int], str]] = {}
+
+
+def read_head_branch(repo_path: Path) -> str | None:
+    """Read the current branch straight from the repository's HEAD file.
+
+    Returns "HEAD" for a detached HEAD, matching get_current_branch, and None
+    if the layout is not understood. Results are cached until the HEAD file
+    changes.
+    """
+    git_dir = resolve_git_dir(repo_path)
+    if git_dir is None:
+        return None
+    head_path = git_dir / "HEAD"
+    try:
+        stat = head_path.stat()
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    cached = _head_cache.get(head_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    try:
+        content = head_path.read_text().strip()
+    except OSError:
+        return None
+    if content.startswith("ref: refs/heads/"):
+        branch = content[len("ref: refs/heads/") :]
+    elif _OBJECT_ID_RE.fullmatch(content):
+        branch = "HEAD"
+    else:
+        return None
+
+    _head_cache[head_path] = (key, branch)
+    return branch
+
+
 def get_current_branch(repo_path: Path) -> str:
-    """Get the current branch name of a git repository."""
+    """Get the current branch name of a git repository.
+
+    The HEAD file is read directly when possible; GitPython is only used as a
+    fallback for layouts read_head_branch does not understand.
+    """
+    branch = read_head_branch(repo_path)
+    if branch is not None:
+        return branch
+
+    logger.debug(f"Falling back to GitPython to read the branch of {repo_path}")
+    import git
+    from git.exc import InvalidGitRepositoryError
+
     try:
         repo = git.Repo(repo_path)
         return repo.active_branch.name
@@ -29,13 +113,30 @@ def get_current_branch(repo_path: Path) -> str:
         return "HEAD"
 
 
-def check_all_on_same_branch(paths: Paths, raise_error: bool = True) -> bool:
-    """Validate that all repositories are on the same branch."""
+def check_all_on_same_branch(
+    paths: Paths,
+    raise_error: bool = True,
+    repos: List["Repository"] | None = None,
+) -> bool:
+    """Validate that all repositories are on the same branch.
+
+    If repos is not given, the repository list is loaded from multi.json.
+    """
     from multi.repos import load_repos
 
-    root_branch = get_current_branch(paths.root_dir)
+    if repos is None:
+        repos = load_repos(paths)
+
+    results = run_in_parallel(
+        get_current_branch, [paths.root_dir] + [repo.path for repo in repos]
+    )
+    for result in results:
+        if not result.ok:
+            raise result.error
+
+    root_branch = results[0].value
     repo_branches = [
-        (repo, get_current_branch(repo.path)) for repo in load_repos(paths)
+        (repo, result.value) for repo, result in zip(repos, results[1:], strict=True)
     ]
     for repo, branch in repo_branches:
         if branch != root_branch:
@@ -47,7 +148,106 @@ def check_all_on_same_branch(paths: Paths, raise_error: bool = True) -> bool:
     return True
 
 
-def check_repo_is_clean(repo_path: Path, raise_error: bool = True) -> bool:
+def _status_entry_path(record: bytes) -> Tuple[str, bool]:
+    """Extract the path from a `git status --porcelain=v2 -z` record.
+
+    Returns the path and whether the record is followed by an extra
+    NUL-terminated original path (renames and copies).
+    """
+    kind = record[:1]
+    if kind == b"1":
+        path = record.split(b" ", 8)[8]
+    elif kind == b"2":
+        return record.split(b" ", 9)[9].decode(errors="replace"), True
+    elif kind == b"u":
+        path = record.split(b" ", 10)[10]
+    else:
+        # "?" untracked and "!" ignored entries are "<kind> <path>"
+        path = record[2:]
+    return path.decode(errors="replace"), False
+
+
+def get_dirty_files(
+    repo_path: Path, limit: int = DEFAULT_DIRTY_FILES_LIMIT
+) -> Tuple[List[str], bool]:
+    """Return up to `limit` paths that make a repository dirty, and whether there are more.
+
+    An empty list means the working directory is clean. The output of
+    `git status --porcelain=v2 -z` is streamed and git is stopped as soon as
+    one entry more than `limit` has been read, so a dirty repository never has
+    its whole working tree reported. Untracked directories are reported as a single
+    entry. git's own core.untrackedCache and core.fsmonitor settings apply as
+    configured for the repository.
+    """
+    limit = max(1, limit)
+    with (
+        stage("git status", repo=repo_path.name, git="status"),
+        tempfile.TemporaryFile() as stderr_file,
+    ):
+        process = subprocess.Popen(
+            ["git", "status", "--porcelain=v2", "-z", "--untracked-files=normal"],
+            cwd=repo_path,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            # Not a pipe: it is only read at the end, and git could fill a pipe
+            # with warnings and block while stdout is being streamed
+            stderr=stderr_file,
+        )
+        dirty_files: List[str] = []
+        buffer = b""
+        skip_next = False
+        stopped_early = False
+        try:
+            while not stopped_early:
+                chunk = process.stdout.read1(65536)
+                if not chunk:
+                    break
+                *records, buffer = (buffer + chunk).split(b"\0")
+                for record in records:
+                    if skip_next:
+                        skip_next = False
+                        continue
+                    if not record or record.startswith(b"#"):
+                        continue
+                    path, skip_next = _status_entry_path(record)
+                    if len(dirty_files) == limit:
+                        stopped_early = True
+                        break
+                    dirty_files.append(path)
+        finally:
+            if stopped_early:
+                process.kill()
+            process.communicate()
+            stderr_file.seek(0)
+            stderr = stderr_file.read()
+
+    if not stopped_early and process.returncode != 0:
+        logger.error("Failed to check working directory status")
+        raise GitError(
+            f"Failed to check working directory status in {repo_path}: {stderr.decode(errors='replace').strip()}"
+        )
+    return dirty_files, stopped_early
+
+
+def format_not_clean_message(
+    repo_path: Path, dirty_files: List[str], truncated: bool = False
+) -> str:
+    shown = ", ".join(dirty_files)
+    if truncated:
+        shown += ", ..."
+    return f"Working directory is not clean in {repo_path}. Please commit or stash changes first.  Changed: {shown}"
+
+
+def check_repo_is_clean(
+    repo_path: Path,
+    raise_error: bool = True,
+    dirty_files_limit: int = DEFAULT_DIRTY_FILES_LIMIT,
+) -> bool:
+    """Check that a repository has no modified, staged or untracked files.
+
+    The error raised for a dirty repository lists up to dirty_files_limit of
+    the files responsible.
+    """
     # Check if this is a git repository
     if not is_git_repo_root(repo_path):
         raise GitError(
@@ -55,55 +255,113 @@ def check_repo_is_clean(repo_path: Path, raise_error: bool = True) -> bool:
         )
 
     # Make sure we have a clean working directory
-    try:
-        repo = git.Repo(repo_path)
-        # is_dirty checks for modified/staged files, untracked_files checks for new files
-        is_clean = not repo.is_dirty(untracked_files=True)
-    except InvalidGitRepositoryError as e:
-        logger.error("Failed to check working directory status")
-        raise GitError("Failed to check working directory status") from e
+    dirty_files, truncated = get_dirty_files(repo_path, limit=dirty_files_limit)
 
-    if not is_clean:
+    if dirty_files:
         if raise_error:
             raise RepoNotCleanError(
-                f"Working directory is not clean in {repo_path}. Please commit or stash changes first."
+                format_not_clean_message(repo_path, dirty_files, truncated)
             )
         return False
     return True
 
 
-def check_all_repos_are_clean(paths: Paths, raise_error: bool = True) -> bool:
-    """Check if all repositories are clean."""
-    from multi.repos import load_repos
+def _common_git_dir(git_dir: Path) -> Path:
+    """The directory holding shared refs (differs from git_dir for worktrees)."""
+    try:
+        common = (git_dir / "commondir").read_text().strip()
+    except OSError:
+        return git_dir
+    common_dir = Path(common)
+    return common_dir if common_dir.is_absolute() else git_dir / common_dir
 
-    # Check root repo
-    if not check_repo_is_clean(paths.root_dir, raise_error):
-        return False
 
-    # Check sub-repos
-    return all(
-        check_repo_is_clean(repo.path, raise_error) for repo in load_repos(paths)
-    )
+# packed-refs path -> ((mtime_ns, size, inode), set of ref names)
+_packed_refs_cache: Dict[Path, Tuple[Tuple[int, int, int], FrozenSet[str]]] = {}
 
 
-def check_branch_existence(repo_path: Path, branch_name: str) -> Tuple[bool, bool]:
+def _read_packed_refs(packed_refs_path: Path) -> FrozenSet[str]:
+    """Parse a packed-refs file once and cache its ref names until it changes."""
     try:
-        repo = git.Repo(repo_path)
-    except InvalidGitRepositoryError as e:
-        logger.error("Failed to check if branch exists")
-        raise GitError("Failed to check if branch exists") from e
+        stat = packed_refs_path.stat()
+    except OSError:
+        return frozenset()
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
 
-    # Check if branch exists locally
-    exists_locally = branch_name in [head.name for head in repo.heads]
+    cached = _packed_refs_cache.get(packed_refs_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
 
-    # Check if branch exists remotely
-    try:
-        remote_refs = [ref.name for ref in repo.remotes.origin.refs]
-        exists_remotely = f"origin/{branch_name}" in remote_refs
-    except Exception:
-        logger.debug(
-            f"Could not check remote branches in {repo_path}, assuming branch doesn't exist remotely"
+    refs = set()
+    with packed_refs_path.open("rb") as f:
+        for line in f:
+            # Lines are "<object id> <ref name>"; skip the header and "^" peel lines
+            if line[:1] in (b"#", b"^"):
+                continue
+            parts = line.rstrip(b"\n").split(b" ", 1)
+            if len(parts) == 2:
+                refs.add(parts[1].decode(errors="replace"))
+    result = frozenset(refs)
+    _packed_refs_cache[packed_refs_path] = (key, result)
+    return result
+
+
+def _rev_parse_verify(repo_path: Path, ref_name: str) -> bool:
+    """Check a ref with a single `git rev-parse --verify` call."""
+    with stage("git rev-parse", repo=repo_path.name, git="rev-parse"):
+        completed = subprocess.run(
+            ["git", "rev-parse", "--verify", "--quiet", "--end-of-options", ref_name],
+            cwd=repo_path,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+        )
+    if completed.returncode == 0:
+        return True
+    if completed.returncode == 1:
+        return False
+    logger.error("Failed to check if branch exists")
+    raise GitError(
+        f"Failed to check if {ref_name} exists in {repo_path}: {completed.stderr.decode(errors='replace').strip()}"
+    )
+
+
+def ref_exists(repo_path: Path, ref_name: str) -> bool:
+    """Check whether a fully qualified ref (e.g. refs/heads/main) exists.
+
+    Loose refs are checked with a single stat and packed refs with a lookup in
+    the cached packed-refs set, so the cost does not grow with the number of
+    refs in the repository. Repositories using the reftable backend, and ref
+    names that are not safe to map onto the filesystem, fall back to one
+    `git rev-parse --verify` call.
+    """
+    git_dir = resolve_git_dir(repo_path)
+    unsafe_name = ".." in ref_name.split("/") or ref_name.startswith("/")
+    if git_dir is None or unsafe_name:
+        return _rev_parse_verify(repo_path, ref_name)
+
+    common_dir = _common_git_dir(git_dir)
+    if (common_dir / "reftable").is_dir():
+        return _rev_parse_verify(repo_path, ref_name)
+
+    if (common_dir / ref_name).is_file():
+        return True
+    return ref_name in _read_packed_refs(common_dir / "packed-refs")
+
+
+def check_branch_existence(
+    repo_path: Path, branch_name: str, remote: str = "origin"
+) -> Tuple[bool, bool]:
+    """Check whether a branch exists locally and on the given remote.
+
+    The remote check looks at the remote-tracking ref, so it reflects the last
+    fetch.
+    """
+    if resolve_git_dir(repo_path) is None:
+        logger.error("Failed to check if branch exists")
+        raise GitError(
+            f"Failed to check if branch exists: {repo_path} is not a git repository"
         )
-        exists_remotely = False
 
+    exists_locally = ref_exists(repo_path, f"refs/heads/{branch_name}")
+    exists_remotely = ref_exists(repo_path, f"refs/remotes/{remote}/{branch_name}")
     return exists_locally, exists_remotely
@@ -1,59 +1,293 @@
+import codecs
+import collections
+import contextlib
 import logging
+import os
 import subprocess
+import sys
+import threading
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Deque, Dict, List, Tuple
 
 import click
 
 from multi.errors import GitError
 from multi.git_helpers import check_all_on_same_branch
-from multi.paths import Paths
-from multi.repos import load_repos
+from multi.parallel import run_in_parallel
+from multi.profiling import stage
+from multi.session import WorkspaceSession, get_session
 
 logger = logging.getLogger(__name__)
 
+# Bytes read from git at a time
+READ_CHUNK_SIZE = 64 * 1024
+# Longer lines are forwarded in pieces, so a single huge line (e.g. a minified
+# file in a diff) is never held in memory whole
+MAX_LINE_LENGTH = 64 * 1024
+# Lines of stderr kept per repository to explain a failure
+STDERR_TAIL_LINES = 5
 
-def run_git_command(repo_path: Path, git_args: List[str]) -> None:
-    """Run a git command in the specified repository."""
+# git subcommands whose output git itself shows in a pager by default
+PAGED_GIT_COMMANDS = frozenset(
+    {"blame", "diff", "grep", "log", "reflog", "shortlog", "show"}
+)
+
+
+def get_pager(
+    git_args: List[str], paginate: bool | None, stdout_isatty: bool
+) -> str | None:
+    """The pager command to show output in, or None to write to the terminal.
+
+    Like git, output is only paged on a terminal: by default for the commands in
+    PAGED_GIT_COMMANDS, always with paginate=True and never with paginate=False.
+    The pager is $GIT_PAGER, $PAGER or less; an empty value or cat disables it.
+    """
+    if not stdout_isatty or paginate is False:
+        return None
+    if paginate is None and git_args[0] not in PAGED_GIT_COMMANDS:
+        return None
+    pager = os.environ.get("GIT_PAGER", os.environ.get("PAGER", "less")).strip()
+    return None if pager in ("", "cat") else pager
+
+
+class GitOutput:
+    """Where the output of every repository goes: the terminal or a pager.
+
+    Writes are serialized, so lines from concurrently running repositories
+    never interleave. Once the pager has exited (the user quit it), write()
+    returns False and the commands still running should be stopped.
+    """
+
+    def __init__(self, pager: str | None = None):
+        self.closed = False
+        self._lock = threading.Lock()
+        self._pager: subprocess.Popen | None = None
+        # Environment for the git processes (None to inherit ours)
+        self.git_env: Dict[str, str] | None = None
+        if pager:
+            # Like git: let less exit on short output and keep colors, and have
+            # git color its output as it would for its own pager
+            env = {"LESS": "FRX", "LV": "-c", **os.environ}
+            self._pager = subprocess.Popen(
+                pager, shell=True, stdin=subprocess.PIPE, bufsize=0, env=env
+            )
+            self.git_env = {**os.environ, "GIT_PAGER_IN_USE": "true"}
+
+    def write(self, line: str, err: bool = False) -> bool:
+        with self._lock:
+            if self.closed:
+                return False
+            if self._pager is None:
+                click.echo(line, err=err)
+                return True
+            try:
+                self._pager.stdin.write(line.encode("utf-8", errors="replace") + b"\n")
+            except (BrokenPipeError, ValueError):
+                self.closed = True
+                return False
+            return True
+
+    def close(self) -> None:
+        """Wait for the user to quit the pager, if there is one."""
+        if self._pager is None:
+            return
+        with self._lock:
+            self.closed = True
+            with contextlib.suppress(BrokenPipeError):
+                self._pager.stdin.close()
+        self._pager.wait()
+
+
+def forward_stream(
+    stream: BinaryIO,
+    prefix: str,
+    output: GitOutput,
+    err: bool = False,
+    tail: Deque[str] | None = None,
+) -> bool:
+    """Forward each line of stream to output as soon as it is complete.
+
+    Reads at most READ_CHUNK_SIZE bytes at a time and holds at most
+    MAX_LINE_LENGTH characters of an unfinished line, so memory stays flat
+    whatever the size of the output. The last lines are also kept in tail,
+    if given. Returns False if output was closed before the stream ended.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+
+    def emit(line: str) -> bool:
+        if tail is not None:
+            tail.append(line)
+        return output.write(f"{prefix}{line}", err=err)
+
+    while True:
+        chunk = stream.read1(READ_CHUNK_SIZE)
+        pending += decoder.decode(chunk, final=not chunk)
+        *lines, pending = pending.split("\n")
+        while len(pending) > MAX_LINE_LENGTH:
+            lines.append(pending[:MAX_LINE_LENGTH])
+            pending = pending[MAX_LINE_LENGTH:]
+        for line in lines:
+            if not emit(line.rstrip("\r")):
+                return False
+        if not chunk:
+            return not pending or emit(pending.rstrip("\r"))
+
+
+def run_git_command(
+    repo_path: Path,
+    git_args: List[str],
+    prefix: str = "",
+    output: GitOutput | None = None,
+) -> None:
+    """Run a git command in the specified repository.
+
+    stdout and stderr are streamed line by line to output (the terminal by
+    default) as the command produces them, each line prefixed with prefix. If
+    the command fails, the GitError includes the last lines of its stderr. If
+    output is closed while it runs (the pager was quit), git is stopped and
+    no error is raised.
+    """
     command_str = " ".join(git_args)
-    logger.info(f"Running 'git {command_str}' in {repo_path}")
+    logger.debug(f"Running 'git {command_str}' in {repo_path}")
 
+    output = output or GitOutput()
+    if output.closed:
+        return
     cmd = ["git"] + git_args
+    with stage(
+        f"git {git_args[0]}", repo=repo_path.name, args=command_str, git=git_args[0]
+    ):
+        _run_and_forward(cmd, repo_path, command_str, prefix, output)
+
+
+def _run_and_forward(
+    cmd: List[str],
+    repo_path: Path,
+    command_str: str,
+    prefix: str,
+    output: GitOutput,
+) -> None:
     try:
-        outputs = subprocess.run(
+        process = subprocess.Popen(
             cmd,
             cwd=repo_path,
-            check=check,
-            capture_output=True,
-            text=True,
-        ).stdout.strip()
-        logger.info(f"Output from {repo_path}:\n{outputs}")
-    except subprocess.CalledProcessError as e:
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=output.git_env,
+        )
+    except OSError as e:
         logger.error(f"Failed to run git command in {repo_path}")
         raise GitError(f"Failed to run git command in {repo_path}") from e
 
+    stderr_tail: Deque[str] = collections.deque(maxlen=STDERR_TAIL_LINES)
+    stderr_thread = threading.Thread(
+        target=forward_stream,
+        args=(process.stderr, prefix, output, True, stderr_tail),
+        daemon=True,
+    )
+    stderr_thread.start()
+    if not forward_stream(process.stdout, prefix, output):
+        # Nobody is reading any more; stop git rather than drain its output
+        process.kill()
+    stderr_thread.join()
+    process.stdout.close()
+    process.stderr.close()
+
+    returncode = process.wait()
+    if returncode != 0 and not output.closed:
+        message = f"'git {command_str}' failed in {repo_path} (exit code {returncode})"
+        details = "\n".join(line for line in stderr_tail if line.strip())
+        if details:
+            message += f":\n{details}"
+        raise GitError(message)
 
-def run_git_in_all_repos(paths: Paths, git_args: List[str]) -> None:
-    """Run git command across all repositories."""
+
+def run_git_in_all_repos(
+    session: WorkspaceSession,
+    git_args: List[str],
+    jobs: int | None = None,
+    fail_fast: bool = False,
+    pager: str | None = None,
+) -> None:
+    """Run git command concurrently across the root repo and all sub-repos.
+
+    Every repository is attempted unless fail_fast is set, in which case
+    repositories that have not started yet are skipped after the first failure.
+    The output of all repositories goes to the terminal, or to pager if given.
+    Raises GitError listing every repository where the command failed, after
+    logging why it failed in each.
+    """
     # First check if all repos are on the same branch
-    check_all_on_same_branch(raise_error=True)
+    check_all_on_same_branch(paths=session.paths, raise_error=True, repos=session.repos)
+
+    targets: List[Tuple[str, Path]] = [(session.root_dir.name, session.root_dir)]
+    targets += [(repo.name, repo.path) for repo in session.repos]
+    width = max(len(name) for name, _ in targets)
 
-    # Run in root repo first
-    run_git_command(paths.root_dir, git_args)
+    output = GitOutput(pager)
+
+    def run(target: Tuple[str, Path]) -> None:
+        name, path = target
+        prefix = click.style(f"{name:<{width}} | ", fg="cyan")
+        run_git_command(path, git_args, prefix=prefix, output=output)
+
+    try:
+        with stage(f"git {git_args[0]} in all repos"):
+            results = run_in_parallel(run, targets, jobs=jobs, fail_fast=fail_fast)
+    finally:
+        output.close()
 
-    # Then run in all sub-repos
-    for repo in load_repos(paths.settings):
-        run_git_command(repo.path, git_args)
+    for result in results:
+        if not result.ok:
+            logger.error(f"{result.item[0]}: {result.error}")
+    failed = [result.item[0] for result in results if not result.ok]
+    skipped = len(targets) - len(results)
+    if failed:
+        message = f"'git {' '.join(git_args)}' failed in {len(failed)} of {len(targets)} repositories: {', '.join(failed)}"
+        if skipped:
+            message += f" ({skipped} skipped)"
+        raise GitError(message)
 
 
-@click.command(name="git")
-@click.argument("git_args", nargs=-1, required=True)
-def git_cmd(git_args: tuple[str, ...]) -> None:
+@click.command(
+    name="git",
+    context_settings={"ignore_unknown_options": True, "allow_interspersed_args": False},
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of repositories to run in parallel (default: CPU count).",
+)
+@click.option(
+    "--fail-fast",
+    is_flag=True,
+    help="Stop starting new repositories after the first failure.",
+)
+@click.option(
+    "--paginate/--no-pager",
+    default=None,
+    help="Show the output in a pager, or never (default: like git, for log, diff, show and similar).",
+)
+@click.argument("git_args", nargs=-1, required=True, type=click.UNPROCESSED)
+def git_cmd(
+    git_args: tuple[str, ...], jobs: int | None, fail_fast: bool, paginate: bool | None
+) -> None:
     """Run a git command across all repositories.
 
     GIT_ARGS: The git command and arguments to run (e.g. 'pull' or 'checkout main')
 
     Example: multi git pull
+             multi git --jobs 8 fetch
              multi git checkout -b feature/new-branch
     """
-    run_git_in_all_repos(list(git_args))
+    run_git_in_all_repos(
+        session=get_session(),
+        git_args=list(git_args),
+        jobs=jobs,
+        fail_fast=fail_fast,
+        pager=get_pager(list(git_args), paginate, sys.stdout.isatty()),
+    )
@@ -1,66 +1,239 @@
 import logging
 from pathlib import Path
+from typing import List, NamedTuple
 
 import click
-import git
 
-from multi.errors import GitError
+from multi.errors import GitError, RepoNotCleanError
 from multi.git_helpers import (
-    check_all_on_same_branch,
-    check_all_repos_are_clean,
+    DEFAULT_DIRTY_FILES_LIMIT,
     check_branch_existence,
+    format_not_clean_message,
+    get_current_branch,
+    get_dirty_files,
+    is_git_repo_root,
 )
-from multi.paths import Paths
-from multi.repos import load_repos
+from multi.parallel import run_in_parallel
+from multi.profiling import stage
+from multi.session import WorkspaceSession, get_session
 
 logger = logging.getLogger(__name__)
 
 
-def create_and_switch_branch(
-    repo_path: Path, branch_name: str, allow_create: bool = True
-) -> None:
-    """Create a branch if it doesn't exist and switch to it."""
-    repo = git.Repo(repo_path)
-
-    # Check if branch exists locally or remotely
-    exists_locally, exists_remotely = check_branch_existence(repo_path, branch_name)
-
-    if exists_locally or exists_remotely:
-        logger.info(f"Branch '{branch_name}' already exists in {repo_path}")
-        repo.git.checkout(branch_name)
-    else:
-        if not allow_create:
-            raise GitError(
-                f"Branch '{branch_name}' does not exist in {repo_path}.  Normally we would create a new branch, but you started with different repos checked out to different branches, so there is no base branch to create from."
-            )
-        # Create a new branch from current HEAD
-        repo.create_head(branch_name).checkout()
-    logger.info(f"✅ Switched to branch '{branch_name}' in {repo_path}")
+class BranchPlan(NamedTuple):
+    """What set-branch found in one repository and what it will do there."""
+
+    name: str
+    path: Path
+    current_branch: str
+    dirty_files: List[str]
+    # Whether the repository has more dirty files than dirty_files lists
+    dirty_files_truncated: bool
+    exists_locally: bool
+    exists_remotely: bool
+    branch_name: str
+    remote: str = "origin"
+
+    @property
+    def is_clean(self) -> bool:
+        return not self.dirty_files
+
+    @property
+    def action(self) -> str:
+        """One of "none" (already on the branch), "checkout" or "create"."""
+        if self.current_branch == self.branch_name:
+            return "none"
+        if self.exists_locally or self.exists_remotely:
+            return "checkout"
+        return "create"
+
 
+def plan_branch_switch(
+    name: str,
+    repo_path: Path,
+    branch_name: str,
+    remote: str = "origin",
+    dirty_files_limit: int = DEFAULT_DIRTY_FILES_LIMIT,
+) -> BranchPlan:
+    """Inspect a repository without modifying it.
+
+    The branch counts as existing remotely if remote has it (as of the last
+    fetch). Up to dirty_files_limit of the files that make the repository
+    dirty are listed.
+    """
+    if not is_git_repo_root(repo_path):
+        raise GitError(
+            f"{repo_path} is not a git repository or has not been initialized properly (no .git folder)"
+        )
+    exists_locally, exists_remotely = check_branch_existence(
+        repo_path, branch_name, remote=remote
+    )
+    dirty_files, dirty_files_truncated = get_dirty_files(
+        repo_path, limit=dirty_files_limit
+    )
+    return BranchPlan(
+        name=name,
+        path=repo_path,
+        current_branch=get_current_branch(repo_path),
+        dirty_files=dirty_files,
+        dirty_files_truncated=dirty_files_truncated,
+        exists_locally=exists_locally,
+        exists_remotely=exists_remotely,
+        branch_name=branch_name,
+        remote=remote,
+    )
+
+
+def _inspect(
+    name: str, repo_path: Path, branch_name: str, remote: str, dirty_files_limit: int
+) -> BranchPlan:
+    with stage("inspect repository", repo=name):
+        return plan_branch_switch(
+            name,
+            repo_path,
+            branch_name,
+            remote=remote,
+            dirty_files_limit=dirty_files_limit,
+        )
+
+
+def validate_branch_plans(plans: List[BranchPlan]) -> bool:
+    """Check that every plan can be applied.
+
+    Returns whether all repositories currently share the root repo's branch.
+    Raises RepoNotCleanError or GitError if the switch must not go ahead.
+    """
+    not_clean = [plan for plan in plans if not plan.is_clean]
+    if not_clean:
+        raise RepoNotCleanError(
+            "\n".join(
+                format_not_clean_message(
+                    plan.path, plan.dirty_files, plan.dirty_files_truncated
+                )
+                for plan in not_clean
+            )
+        )
 
-def set_branch_in_all_repos(root_dir: Path, branch_name: str) -> None:
-    paths = Paths(root_dir)
-    check_all_repos_are_clean(paths=paths, raise_error=True)
-    all_on_same_branch = check_all_on_same_branch(paths=paths, raise_error=False)
+    root_branch = plans[0].current_branch
+    all_on_same_branch = all(plan.current_branch == root_branch for plan in plans)
     if not all_on_same_branch:
         logger.warning(
             "Some repos are not on the same branch as the root repo.  If the branch already exists for all repos, this command will fix the situation."
         )
+        for plan in plans:
+            if plan.action == "create":
+                raise GitError(
+                    f"Branch '{plan.branch_name}' does not exist in {plan.path}.  Normally we would create a new branch, but you started with different repos checked out to different branches, so there is no base branch to create from."
+                )
+    return all_on_same_branch
 
-    create_and_switch_branch(
-        paths.root_dir, branch_name, allow_create=all_on_same_branch
-    )
-    for repo in load_repos(paths=paths):
-        create_and_switch_branch(
-            repo.path, branch_name, allow_create=all_on_same_branch
+
+def apply_branch_plan(plan: BranchPlan) -> None:
+    """Switch a repository to the planned branch, creating it if needed."""
+    if plan.action == "none":
+        logger.info(f"✅ Already on branch '{plan.branch_name}' in {plan.path}")
+        return
+
+    import git
+
+    with stage("switch branch", repo=plan.name, action=plan.action, git="checkout"):
+        repo = git.Repo(plan.path)
+        if plan.action == "checkout" and plan.exists_locally:
+            logger.info(f"Branch '{plan.branch_name}' already exists in {plan.path}")
+            repo.git.checkout(plan.branch_name)
+        elif plan.action == "checkout":
+            logger.info(
+                f"Branch '{plan.branch_name}' exists on {plan.remote} for {plan.path}"
+            )
+            # Explicit, since git only guesses the remote when one remote has the branch
+            repo.git.checkout(
+                "-b", plan.branch_name, "--track", f"{plan.remote}/{plan.branch_name}"
+            )
+        else:
+            # Create a new branch from current HEAD
+            repo.create_head(plan.branch_name).checkout()
+    logger.info(f"✅ Switched to branch '{plan.branch_name}' in {plan.path}")
+
+
+def set_branch_in_all_repos(
+    root_dir: Path,
+    branch_name: str,
+    jobs: int | None = None,
+    remote: str = "origin",
+    session: WorkspaceSession | None = None,
+    dirty_files_limit: int = DEFAULT_DIRTY_FILES_LIMIT,
+) -> None:
+    """Switch the root repo and all sub-repos to branch_name.
+
+    The repositories are those of session if given, such as a long-running
+    server's, and otherwise of get_session(root_dir).
+
+    A branch that only exists on remote is checked out tracking it. Runs in
+    two phases. First every repository is inspected concurrently and the
+    whole plan is validated. Only then are the checkouts applied, also
+    concurrently.
+    """
+    session = session or get_session(root_dir)
+    targets = [(session.root_dir.name, session.root_dir)]
+    targets += [(repo.name, repo.path) for repo in session.repos]
+
+    with stage("plan branch switch"):
+        plan_results = run_in_parallel(
+            lambda target: _inspect(
+                target[0], target[1], branch_name, remote, dirty_files_limit
+            ),
+            targets,
+            jobs=jobs,
+        )
+    for result in plan_results:
+        if not result.ok:
+            raise result.error
+    plans = [result.value for result in plan_results]
+
+    validate_branch_plans(plans)
+
+    with stage("apply branch switch"):
+        apply_results = run_in_parallel(apply_branch_plan, plans, jobs=jobs)
+    failed = [result for result in apply_results if not result.ok]
+    for result in failed:
+        logger.error(f"{result.item.name}: {result.error}")
+    if failed:
+        raise GitError(
+            f"Failed to switch {len(failed)} of {len(plans)} repositories to '{branch_name}': {', '.join(result.item.name for result in failed)}"
         )
 
 
 @click.command(name="set-branch")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of repositories to inspect and switch in parallel (default: CPU count).",
+)
+@click.option(
+    "--remote",
+    default="origin",
+    help="Remote to look for the branch on, in repositories that do not have it yet (default: origin).",
+)
+@click.option(
+    "--max-dirty-files",
+    type=click.IntRange(min=1),
+    default=DEFAULT_DIRTY_FILES_LIMIT,
+    help=f"How many uncommitted files to list for each repository that is not clean (default: {DEFAULT_DIRTY_FILES_LIMIT}).",
+)
 @click.argument("branch_name")
-def set_branch_cmd(branch_name: str) -> None:
+def set_branch_cmd(
+    branch_name: str, jobs: int | None, remote: str, max_dirty_files: int
+) -> None:
     """Create and switch to a branch in all repositories.
 
     BRANCH_NAME: Name of the branch to create and switch to
     """
-    set_branch_in_all_repos(root_dir=Path.cwd(), branch_name=branch_name)
+    set_branch_in_all_repos(
+        root_dir=Path.cwd(),
+        branch_name=branch_name,
+        jobs=jobs,
+        remote=remote,
+        dirty_files_limit=max_dirty_files,
+    )
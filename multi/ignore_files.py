@@ -3,7 +3,7 @@ from pathlib import Path
 from typing import List, Optional
 
 from multi.paths import Paths
-from multi.repos import load_repos
+from multi.repos import Repository, load_repos
 
 logger = logging.getLogger(__name__)
 
@@ -70,18 +70,20 @@ class IgnoreFile:
         self._existing_lines = existing_lines
 
 
-def update_gitignore_with_repos(paths: Paths):
+def update_gitignore_with_repos(paths: Paths, repos: List[Repository] | None = None):
     """Ensure all repos are in gitignore entries."""
-    repos = load_repos(paths=paths)
+    if repos is None:
+        repos = load_repos(paths=paths)
     repo_entries = [f"{repo.name}/" for repo in repos]
     gitignore = IgnoreFile(paths.gitignore_path)
     gitignore.add_lines_if_missing(repo_entries, "# Ignore repository directories")
     logger.debug("Updated .gitignore with new repositories")
 
 
-def update_ignore_with_repos(paths: Paths):
+def update_ignore_with_repos(paths: Paths, repos: List[Repository] | None = None):
     """Update .ignore to allow searching in gitignored directories."""
-    repos = load_repos(paths=paths)
+    if repos is None:
+        repos = load_repos(paths=paths)
     repo_entries = [f"!{repo.name}/" for repo in repos]
     vscode_ignore = IgnoreFile(paths.vscode_ignore_path)
     vscode_ignore.add_lines_if_missing(
@@ -98,6 +100,7 @@ def update_gitignore_with_vscode_files(paths: Paths):
         ".vscode/settings.json",
         ".vscode/tasks.json",
         ".vscode/extensions.json",
+        ".vscode/.multi-manifest.json",
     ]
     gitignore = IgnoreFile(paths.gitignore_path)
     gitignore.add_lines_if_missing(vscode_entries, "# Generated files")
@@ -7,14 +7,19 @@ import click
 
 from multi.git_helpers import is_git_repo_root
 from multi.ignore_files import update_gitignore_with_vscode_files
+from multi.paths import Paths
 from multi.rules import Rule
+from multi.session import get_session
 from multi.sync import sync
 
-init_readme_template = (files("multi") / "resources" / "init_readme.md").read_text()
-
 logger = logging.getLogger(__name__)
 
 
+def read_init_readme_template() -> str:
+    """The README.md template, read only when a README is created."""
+    return (files("multi") / "resources" / "init_readme.md").read_text()
+
+
 def collect_repo_urls() -> tuple[list[str], list[str]]:
     """Interactively collect repository URLs and descriptions from the user."""
     urls = []
@@ -83,16 +88,16 @@ def create_repo_directories_rule(urls: list[str], descriptions: list[str]) -> No
         body=body,
     )
 
-    # Ensure .cursor directory exists
+    # Ensure .cursor/rules directory exists
     cursor_dir = Path.cwd() / ".cursor"
-    cursor_dir.mkdir(exist_ok=True)
+    (cursor_dir / "rules").mkdir(parents=True, exist_ok=True)
 
     # Write the rule file
     rule_path = cursor_dir / "rules" / "repo-directories.mdc"
     rule_path.write_text(rule.render())
 
 
-def init_git_repo() -> None:
+def init_git_repo(paths: Paths) -> None:
     """Initialize a git repository if one doesn't exist."""
     import git
 
@@ -101,7 +106,7 @@ def init_git_repo() -> None:
         git.Repo.init(paths.root_dir)
 
 
-def commit_changes() -> None:
+def commit_changes(paths: Paths) -> None:
     """Stage and commit all changes."""
     import git
 
@@ -110,7 +115,7 @@ def commit_changes() -> None:
     repo.index.commit("Multi init: Configure multi workspace")
 
 
-def create_readme(urls: list[str]) -> None:
+def create_readme(urls: list[str], paths: Paths) -> None:
     """Create a README.md file if it doesn't exist."""
     readme_path = paths.root_dir / "README.md"
     if readme_path.exists():
@@ -142,7 +147,7 @@ def create_readme(urls: list[str]) -> None:
     workspace_name = paths.root_dir.name
 
     # Format and write the README
-    readme_content = init_readme_template.format(
+    readme_content = read_init_readme_template().format(
         __name__=workspace_name, __repo_list__=repo_list
     )
     readme_path.write_text(readme_content)
@@ -176,18 +181,21 @@ def init_cmd():
         create_repo_directories_rule(urls, descriptions)
         logger.info("Created repository documentation rule")
 
+    # multi.json now exists, so the workspace root resolves to this directory
+    paths = get_session().paths
+
     # Initialize git repo if needed
-    init_git_repo()
+    init_git_repo(paths)
 
     # Create README.md if it doesn't exist
-    create_readme(urls)
+    create_readme(urls, paths)
 
     # Update gitignore to include vscode files
-    update_gitignore_with_vscode_files()
+    update_gitignore_with_vscode_files(paths)
 
     # Run sync
-    sync(ensure_on_same_branch=False)
+    sync(root_dir=paths.root_dir, ensure_on_same_branch=False)
 
     # Commit changes
-    commit_changes()
+    commit_changes(paths)
     logger.info("✅ Workspace initialized successfully")
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable
+
+from multi._version import __version__
+from multi.utils import soft_read_json_file, write_json_file
+
+logger = logging.getLogger(__name__)
+
+MISSING_FILE_DIGEST = "missing"
+
+# Returns the contents of a file, or None if it does not exist
+ReadBytes = Callable[[Path], bytes | None]
+
+
+def _read_bytes(path: Path) -> bytes | None:
+    try:
+        return path.read_bytes()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def hash_file(path: Path, read_bytes: ReadBytes = _read_bytes) -> str:
+    """SHA-256 of a file's contents, or MISSING_FILE_DIGEST if it does not exist."""
+    data = read_bytes(path)
+    if data is None:
+        return MISSING_FILE_DIGEST
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_inputs(
+    root_dir: Path,
+    input_paths: Iterable[Path],
+    state: Any = None,
+    read_bytes: ReadBytes = _read_bytes,
+) -> str:
+    """Combine the contents of input_paths and some JSON-serializable state into one digest.
+
+    Paths are recorded relative to root_dir, so moving the whole workspace does
+    not invalidate the manifest. The multi version is included so upgrading
+    multi always regenerates the files. Files are read with read_bytes, which
+    lets callers supply already-read contents.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"multi {__version__}\n".encode())
+    for path in input_paths:
+        try:
+            name = path.relative_to(root_dir).as_posix()
+        except ValueError:
+            name = str(path)
+        digest.update(f"{name}\0{hash_file(path, read_bytes)}\n".encode())
+    digest.update(json.dumps(state, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class MergeManifest:
+    """Digests of the inputs and output of every file generated in the root .vscode.
+
+    Each entry maps a generated file name (e.g. "settings.json") to the digest
+    of everything it was merged from and the digest of the file that was
+    written. A merge can be skipped when both still match.
+    """
+
+    def __init__(self, path: Path, read_bytes: ReadBytes = _read_bytes):
+        self.path = path
+        self.read_bytes = read_bytes
+        self._entries: Dict[str, Dict[str, str]] | None = None
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, str]]:
+        if self._entries is None:
+            data = soft_read_json_file(self.path)
+            entries = data.get("files", {}) if isinstance(data, dict) else {}
+            self._entries = entries if isinstance(entries, dict) else {}
+        return self._entries
+
+    def is_up_to_date(self, output_path: Path, inputs_digest: str) -> bool:
+        """Whether output_path was generated from inputs_digest and not modified since."""
+        entry = self.entries.get(output_path.name)
+        if not isinstance(entry, dict) or entry.get("inputs") != inputs_digest:
+            return False
+        return entry.get("output") == hash_file(output_path, self.read_bytes)
+
+    def record(self, output_path: Path, inputs_digest: str) -> None:
+        """Record that output_path was just generated from inputs_digest and save."""
+        self.entries[output_path.name] = {
+            "inputs": inputs_digest,
+            "output": hash_file(output_path, self.read_bytes),
+        }
+        write_json_file(
+            self.path,
+            {"files": self.entries},
+            header_comment="This file is generated by multi. Do not edit directly.",
+        )
@@ -0,0 +1,312 @@
+import contextlib
+import logging
+import math
+import os
+import re
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from multi.profiling import CounterKey, StageRecord, recording, stage
+from multi.session import WorkspaceSession
+from multi.utils import write_file_if_changed
+
+logger = logging.getLogger(__name__)
+
+# Overrides the "metrics" section of multi.json; an empty value turns metrics off
+METRICS_ENV_VAR = "MULTI_METRICS_TEXTFILE"
+
+# Upper bounds of the duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Every metric written to the textfile: name -> (type, help)
+METRIC_FAMILIES = {
+    "multi_commands_total": ("counter", "Commands run, by result."),
+    "multi_command_duration_seconds": (
+        "histogram",
+        "Wall-clock time of each command.",
+    ),
+    "multi_last_run_timestamp_seconds": (
+        "gauge",
+        "Unix time at which the command last finished.",
+    ),
+    "multi_merge_duration_seconds": (
+        "histogram",
+        "Time taken by each .vscode merge, including the up-to-date check.",
+    ),
+    "multi_repos_processed_total": (
+        "counter",
+        "Repositories (and workspace roots) each command worked on.",
+    ),
+    "multi_cache_hits_total": ("counter", "Lookups answered from a cache."),
+    "multi_cache_misses_total": ("counter", "Lookups a cache could not answer."),
+    "multi_files_written_total": ("counter", "Files rewritten with new content."),
+    "multi_bytes_written_total": ("counter", "Bytes of the files rewritten."),
+    "multi_git_subprocesses_total": ("counter", "git processes started."),
+    "multi_git_subprocess_duration_seconds": (
+        "histogram",
+        "Wall-clock time of each git process.",
+    ),
+}
+
+_HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+# A sample name and its (label, value) pairs
+SampleKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+Samples = Dict[SampleKey, float]
+
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$")
+_LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def metrics_textfile(session: WorkspaceSession) -> Path | None:
+    """Where to write metrics for this workspace, or None if they are off.
+
+    Set by METRICS_ENV_VAR or by "metrics": {"textfile": PATH} in multi.json,
+    relative to the workspace root.
+    """
+    if METRICS_ENV_VAR in os.environ:
+        value = os.environ[METRICS_ENV_VAR]
+        return Path(value).expanduser() if value else None
+    try:
+        metrics_settings = session.settings.get("metrics")
+    except Exception:
+        # Outside a workspace, or multi.json is broken; the command reports that
+        return None
+    if metrics_settings is None:
+        return None
+    if not isinstance(metrics_settings, Mapping) or not isinstance(
+        metrics_settings.get("textfile", ""), str
+    ):
+        raise ValueError('"metrics" must be an object with a "textfile" path')
+    if not metrics_settings.get("textfile"):
+        return None
+    return session.root_dir / Path(metrics_settings["textfile"]).expanduser()
+
+
+def _family(sample_name: str) -> str | None:
+    if sample_name in METRIC_FAMILIES:
+        return sample_name
+    for suffix in _HISTOGRAM_SUFFIXES:
+        base = sample_name.removesuffix(suffix)
+        if base != sample_name and METRIC_FAMILIES.get(base, ("",))[0] == "histogram":
+            return base
+    return None
+
+
+def _add(samples: Samples, name: str, labels: Dict[str, str], amount: float) -> None:
+    key = (name, tuple(labels.items()))
+    samples[key] = samples.get(key, 0) + amount
+
+
+def _observe(samples: Samples, name: str, labels: Dict[str, str], value: float) -> None:
+    """Add one observation to a histogram."""
+    for bound in DURATION_BUCKETS:
+        bucket_labels = {**labels, "le": f"{bound:g}"}
+        _add(samples, f"{name}_bucket", bucket_labels, 1 if value <= bound else 0)
+    _add(samples, f"{name}_bucket", {**labels, "le": "+Inf"}, 1)
+    _add(samples, f"{name}_sum", labels, value)
+    _add(samples, f"{name}_count", labels, 1)
+
+
+def collect_samples(
+    command: str,
+    records: List[StageRecord],
+    counters: Dict[CounterKey, float],
+    duration: float,
+    failed: bool,
+    finished_at: float,
+) -> Samples:
+    """The samples one run of command adds to the textfile."""
+    labels = {"command": command}
+    samples: Samples = {}
+    _add(
+        samples,
+        "multi_commands_total",
+        {**labels, "result": "failure" if failed else "success"},
+        1,
+    )
+    _observe(samples, "multi_command_duration_seconds", labels, duration)
+    samples[("multi_last_run_timestamp_seconds", tuple(labels.items()))] = round(
+        finished_at, 3
+    )
+
+    repos = {
+        record.attributes["repo"] for record in records if "repo" in record.attributes
+    }
+    _add(samples, "multi_repos_processed_total", labels, len(repos))
+    for record in records:
+        if "merger" in record.attributes:
+            _observe(
+                samples,
+                "multi_merge_duration_seconds",
+                {**labels, "file": record.attributes["merger"]},
+                record.duration,
+            )
+        if "git" in record.attributes:
+            git_labels = {**labels, "subcommand": record.attributes["git"]}
+            _add(samples, "multi_git_subprocesses_total", git_labels, 1)
+            _observe(
+                samples,
+                "multi_git_subprocess_duration_seconds",
+                git_labels,
+                record.duration,
+            )
+    for (name, counter_labels), amount in counters.items():
+        _add(samples, f"multi_{name}_total", {**labels, **dict(counter_labels)}, amount)
+    return samples
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda match: "\n" if match[1] == "n" else match[1], value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def parse_textfile(text: str) -> Samples:
+    """Read back the samples of a textfile written by format_textfile.
+
+    Samples of metrics multi no longer writes are dropped.
+    """
+    samples: Samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE_RE.match(line)
+        if line.startswith("#") or not match or _family(match[1]) is None:
+            continue
+        labels = tuple(
+            (name, _unescape(value))
+            for name, value in _LABEL_RE.findall(match[2] or "")
+        )
+        try:
+            samples[(match[1], labels)] = float(match[3])
+        except ValueError:
+            continue
+    return samples
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _sort_key(key: SampleKey) -> Tuple:
+    name, labels = key
+    # Keep each histogram's buckets in order, followed by its sum and count
+    without_le = tuple(label for label in labels if label[0] != "le")
+    le = dict(labels).get("le")
+    bound = math.inf if le in (None, "+Inf") else float(le)
+    suffix = next(
+        (i for i, suffix in enumerate(_HISTOGRAM_SUFFIXES) if name.endswith(suffix)), 0
+    )
+    return (without_le, suffix, bound)
+
+
+def format_textfile(samples: Samples) -> str:
+    """Samples in the Prometheus text format read by node-exporter's textfile collector."""
+    lines = []
+    for family, (metric_type, help_text) in METRIC_FAMILIES.items():
+        keys = sorted(
+            (key for key in samples if _family(key[0]) == family), key=_sort_key
+        )
+        if not keys:
+            continue
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        for key in keys:
+            name, labels = key
+            label_text = ",".join(
+                f'{label}="{_escape(value)}"' for label, value in labels
+            )
+            if label_text:
+                name = f"{name}{{{label_text}}}"
+            lines.append(f"{name} {_format_value(samples[key])}")
+    return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on path's lock file, where the platform supports it."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f"{path.name}.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def update_textfile(path: Path, samples: Samples) -> None:
+    """Add samples to the counters and histograms already in path.
+
+    Gauges are replaced. The file is rewritten atomically under a lock, so
+    concurrent invocations do not lose each other's counts and the textfile
+    collector never reads a partial file.
+    """
+    with _locked(path):
+        try:
+            current = parse_textfile(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            current = {}
+        for key, value in samples.items():
+            if METRIC_FAMILIES.get(key[0], ("",))[0] == "gauge":
+                current[key] = value
+            else:
+                current[key] = current.get(key, 0) + value
+        write_file_if_changed(path, format_textfile(current))
+
+
+class CommandOutcome:
+    """Set failed on the object command_metrics yields if the command fails."""
+
+    failed = False
+
+
+@contextlib.contextmanager
+def command_metrics(
+    session: WorkspaceSession, command: str
+) -> Iterator[CommandOutcome]:
+    """Record the block's stages and counts and add them to the metrics textfile.
+
+    Does nothing but look up the textfile setting when metrics are off.
+    """
+    outcome = CommandOutcome()
+    try:
+        path = metrics_textfile(session)
+    except ValueError as e:
+        # Like a textfile that cannot be written, this should not fail the command
+        logger.error(f"Metrics are off: {e}")
+        path = None
+    if path is None:
+        yield outcome
+        return
+
+    start = time.perf_counter()
+    with recording() as recorder:
+        try:
+            yield outcome
+        except BaseException:
+            outcome.failed = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            samples = collect_samples(
+                command,
+                recorder.records,
+                recorder.counters,
+                duration,
+                outcome.failed,
+                time.time(),
+            )
+            try:
+                with stage("write metrics"):
+                    update_textfile(path, samples)
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {path}: {e}")
@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+import click
+
+from multi.cli_helpers import common_command_wrapper
+from multi.errors import GitError
+from multi.parallel import run_in_parallel
+from multi.profiling import stage
+from multi.repos import Repository
+from multi.session import WorkspaceSession, get_session
+
+logger = logging.getLogger(__name__)
+
+# Overrides "objectCache" in multi.json; an empty value turns the cache off
+OBJECT_CACHE_ENV_VAR = "MULTI_OBJECT_CACHE"
+
+# Mirrors keep every branch and tag, but not the remote's other refs (such as
+# pull requests), which can be many and are not needed by clones
+_MIRROR_REFSPEC = "+refs/heads/*:refs/heads/*"
+
+
+def default_object_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "multi" / "objects"
+
+
+def object_cache_dir(session: WorkspaceSession) -> Path | None:
+    """The shared object cache directory, or None if the cache is off.
+
+    Set by OBJECT_CACHE_ENV_VAR or by "objectCache" in multi.json: true for
+    the default directory, or a directory relative to the workspace root.
+    """
+    if OBJECT_CACHE_ENV_VAR in os.environ:
+        value = os.environ[OBJECT_CACHE_ENV_VAR]
+        return Path(value).expanduser() if value else None
+    setting = session.settings.get("objectCache")
+    if setting is None or setting is False:
+        return None
+    if setting is True:
+        return default_object_cache_dir()
+    if not isinstance(setting, str) or not setting:
+        raise ValueError('"objectCache" must be true, false or a directory')
+    return session.root_dir / Path(setting).expanduser()
+
+
+def mirror_path(cache_dir: Path, url: str, filter: str | None = None) -> Path:
+    """Where the mirror of url is kept in cache_dir.
+
+    Partial mirrors, cloned with filter, are kept apart from full ones: a full
+    clone that borrowed from a partial mirror would be missing objects.
+    """
+    key = url if filter is None else f"{url}\n{filter}"
+    return cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.git"
+
+
+def mirror_of(cache_dir: Path, repo: Repository) -> Path | None:
+    """Where the mirror repo's clones borrow from is kept, or None for shallow clones.
+
+    A mirror has every commit, so a shallow clone, which only wants the last
+    few, would download far more for the mirror than for itself.
+    """
+    if repo.clone_options.depth:
+        return None
+    return mirror_path(cache_dir, repo.url, repo.clone_options.filter)
+
+
+def _git(*args: str) -> str:
+    completed = subprocess.run(
+        ["git", *args],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise GitError(completed.stderr.strip() or f"git {args[0]} failed")
+    return completed.stdout.strip()
+
+
+def update_mirror(path: Path, url: str | None = None, filter: str | None = None) -> str:
+    """Create the bare mirror of url at path, or fetch into it if it exists.
+
+    With filter, a new mirror is a partial clone, and later fetches keep
+    using the same filter.
+
+    Workspace clones borrow objects from mirrors through alternates, so objects
+    must never disappear from them: mirrors are fetched without --prune and
+    never garbage collected. A new mirror is cloned next to path and renamed
+    into place, so concurrent syncs of several workspaces cannot leave a
+    half-cloned mirror behind.
+
+    Returns a short description of what was done.
+    """
+    if path.exists():
+        with stage("update mirror", mirror=path.name, git="fetch"):
+            _git("--git-dir", str(path), "fetch", "--quiet", "--tags", "origin")
+        return "updated"
+    if url is None:
+        raise GitError(f"No mirror at {path}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+    try:
+        with stage("create mirror", mirror=path.name, git="clone"):
+            filter_args = [f"--filter={filter}"] if filter else []
+            _git("clone", "--bare", "--quiet", *filter_args, url, str(temp_path))
+        _git(
+            "--git-dir",
+            str(temp_path),
+            "config",
+            "remote.origin.fetch",
+            _MIRROR_REFSPEC,
+        )
+        _git("--git-dir", str(temp_path), "config", "gc.auto", "0")
+        try:
+            temp_path.rename(path)
+        except OSError:
+            if not path.exists():
+                raise
+            # Another workspace created it first
+            return "already created"
+    finally:
+        shutil.rmtree(temp_path, ignore_errors=True)
+    return "created"
+
+
+def reference_args(cache_dir: Path | None, repo: Repository) -> List[str]:
+    """git clone arguments that borrow objects from repo's mirror.
+
+    The mirror is created first if it does not exist. The clone that follows
+    only downloads what the mirror is missing, so a cold cache costs about
+    one download of the repository. If creating the mirror fails, or repo is
+    cloned shallow, the repository is cloned from the remote as usual.
+    """
+    if cache_dir is None:
+        return []
+    path = mirror_of(cache_dir, repo)
+    if path is None:
+        logger.debug(f"Not using the object cache for {repo.name}, a shallow clone")
+        return []
+    if not path.exists():
+        try:
+            update_mirror(path, repo.url, repo.clone_options.filter)
+        except (GitError, OSError) as e:
+            logger.warning(f"Could not add {repo.name} to the object cache: {e}")
+            return []
+    return [f"--reference-if-able={path}"]
+
+
+def update_object_cache(session: WorkspaceSession, jobs: int | None = None) -> None:
+    """Create or update the mirror of every repository in multi.json.
+
+    Mirrors already in the cache, such as those of other workspaces, are
+    updated as well. Repositories cloned shallow have no mirror.
+    """
+    cache_dir = object_cache_dir(session)
+    if cache_dir is None:
+        raise click.UsageError(
+            f'The object cache is off. Set "objectCache" in multi.json or {OBJECT_CACHE_ENV_VAR}.'
+        )
+
+    mirrors: Dict[Path, Repository | None] = {}
+    for repo in session.repos:
+        path = mirror_of(cache_dir, repo)
+        if path is not None:
+            mirrors[path] = repo
+    for path in sorted(cache_dir.glob("*.git")):
+        mirrors.setdefault(path, None)
+    names = {path: repo.url if repo else path.name for path, repo in mirrors.items()}
+    logger.info(f"Updating {len(mirrors)} mirrors in {cache_dir}...")
+
+    def update(path: Path) -> str:
+        repo = mirrors[path]
+        if repo is None:
+            return update_mirror(path)
+        return update_mirror(path, repo.url, repo.clone_options.filter)
+
+    results = run_in_parallel(update, list(mirrors), jobs=jobs)
+
+    for result in results:
+        if result.ok:
+            logger.info(f"✅ {names[result.item]}: {result.value}")
+        else:
+            logger.error(f"{names[result.item]}: {result.error}")
+    failed = [names[result.item] for result in results if not result.ok]
+    if failed:
+        raise GitError(
+            f"Failed to update {len(failed)} of {len(results)} mirrors: {', '.join(failed)}"
+        )
+
+
+@click.group(name="cache")
+def cache_cmd():
+    """Manage the object cache shared by workspaces."""
+
+
+@click.command(name="update")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of mirrors to update in parallel (default: CPU count).",
+)
+def update_cmd(jobs: int | None):
+    """Fetch the latest objects into every mirror in the object cache.
+
+    Mirrors of this workspace's repositories are created if they are missing.
+    """
+    update_object_cache(session=get_session(), jobs=jobs)
+
+
+# Add subcommands
+cache_cmd.add_command(common_command_wrapper(update_cmd))
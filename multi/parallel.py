@@ -0,0 +1,79 @@
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Any, Callable, Generic, List, NamedTuple, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class TaskResult(NamedTuple, Generic[T, R]):
+    """The outcome of running a task for one item."""
+
+    item: T
+    value: R | None
+    error: BaseException | None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Skipped(Exception):
+    """Raised for tasks that were not started because an earlier task failed."""
+
+
+def default_jobs() -> int:
+    """The default number of parallel workers (the CPU count)."""
+    return os.cpu_count() or 1
+
+
+def run_in_parallel(
+    func: Callable[[T], R],
+    items: Sequence[T],
+    jobs: int | None = None,
+    fail_fast: bool = False,
+) -> List[TaskResult[T, R]]:
+    """Run func for every item on a bounded thread pool.
+
+    Exceptions are collected per item rather than raised. Results are returned in
+    the same order as items. With fail_fast, tasks that have not started yet when
+    the first error occurs are cancelled and left out of the results.
+    """
+    jobs = max(1, min(jobs or default_jobs(), len(items) or 1))
+    stop = threading.Event()
+
+    def guarded(item: T) -> R:
+        if stop.is_set():
+            raise _Skipped()
+        try:
+            return func(item)
+        except BaseException:
+            if fail_fast:
+                stop.set()
+            raise
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="multi") as pool:
+        # Each task runs in a copy of the caller's context, so stages started by
+        # the task nest under the caller's current stage
+        futures = [
+            pool.submit(contextvars.copy_context().run, guarded, item) for item in items
+        ]
+        if fail_fast:
+            _, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in pending:
+                future.cancel()
+
+    results: List[TaskResult[Any, Any]] = []
+    for item, future in zip(items, futures, strict=True):
+        if future.cancelled():
+            continue
+        error = future.exception()
+        if isinstance(error, _Skipped):
+            continue
+        results.append(TaskResult(item, None if error else future.result(), error))
+    return results
@@ -2,7 +2,7 @@ import logging
 import os
 from pathlib import Path
 
-from multi.settings import Settings
+from multi.settings import Settings, settings_cache
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +48,10 @@ class Paths:
     def vscode_extensions_path(self) -> Path:
         return self.root_vscode_dir / "extensions.json"
 
+    @property
+    def vscode_manifest_path(self) -> Path:
+        return self.root_vscode_dir / ".multi-manifest.json"
+
     def _get_root(self, start_dir: Path) -> Path:
         """Get the root directory by finding the first parent directory containing multi.json.
 
@@ -64,9 +68,10 @@ class Paths:
                 return current
 
             if current.parent == current:  # Reached root directory
-                msg = "Could not find multi.json in any parent directory"
-                logger.error(msg)
-                raise FileNotFoundError(msg)
+                # Reported by the command wrapper, which may look more than once
+                raise FileNotFoundError(
+                    "Could not find multi.json in any parent directory"
+                )
 
             current = current.parent
 
@@ -82,4 +87,4 @@ class Paths:
 
     @property
     def settings(self) -> Settings:
-        return Settings.from_multi_json_file(self.multi_json_path)
+        return settings_cache.get(self.multi_json_path)
@@ -0,0 +1,209 @@
+import contextlib
+import contextvars
+import io
+import itertools
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+import click
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_PATH = "multi.pstats"
+# Functions listed in the --profile summary
+PROFILE_TOP_N = 25
+
+
+class StageRecord(NamedTuple):
+    """One completed run of a named stage.
+
+    Stages nest: parent_id is the span_id of the stage that was running when
+    this one started, in this thread or in the thread that submitted its task
+    to run_in_parallel.
+    """
+
+    name: str
+    start: float
+    end: float
+    thread_id: int
+    thread_name: str
+    span_id: int
+    parent_id: int | None
+    attributes: Dict[str, Any]
+    # The name of the exception that ended the stage, if any
+    error: str | None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+# A counter name and its sorted (label, value) pairs
+CounterKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class StageRecorder:
+    """Collects the stages completed and the counts made while it is active, from any thread."""
+
+    def __init__(self):
+        self.records: List[StageRecord] = []
+        self.counters: Dict[CounterKey, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, record: StageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def add_count(self, key: CounterKey, amount: float) -> None:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+
+# Recorders currently collecting stages. Empty unless something (e.g. --profile)
+# is recording, in which case stage() does nothing but check this list.
+_recorders: List[StageRecorder] = []
+
+_span_ids = itertools.count(1)
+_current_span: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+    "multi_current_span", default=None
+)
+
+
+@contextlib.contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[None]:
+    """Time the enclosed block (or decorated function) as a named stage.
+
+    Stages are reported by --profile and written as spans by --trace, with
+    attributes (e.g. repo=...) attached to the span. When nothing is recording
+    this only checks whether a recorder is active.
+    """
+    if not _recorders:
+        yield
+        return
+    span_id = next(_span_ids)
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    error = None
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        _current_span.reset(token)
+        thread = threading.current_thread()
+        record = StageRecord(
+            name,
+            start,
+            end,
+            thread.ident or threading.get_ident(),
+            thread.name,
+            span_id,
+            parent_id,
+            attributes,
+            error,
+        )
+        for recorder in list(_recorders):
+            recorder.add(record)
+
+
+def count(name: str, amount: float = 1, **labels: str) -> None:
+    """Add amount to a named counter, e.g. count("cache_hits", cache="files").
+
+    Counters are reported as metrics. Like stage(), this only checks whether a
+    recorder is active when nothing is recording.
+    """
+    if not _recorders:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    for recorder in list(_recorders):
+        recorder.add_count(key, amount)
+
+
+@contextlib.contextmanager
+def recording() -> Iterator[StageRecorder]:
+    """Collect every stage completed and every count made inside the block."""
+    recorder = StageRecorder()
+    _recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorders.remove(recorder)
+
+
+def format_stages(records: List[StageRecord]) -> str:
+    """A table of stages in the order they first started, with count, total and max.
+
+    Stages that ran concurrently (e.g. one clone per repository) are summed,
+    so their total can exceed the wall-clock time of the command.
+    """
+    by_name: Dict[str, List[float]] = {}
+    for record in sorted(records, key=lambda record: record.start):
+        by_name.setdefault(record.name, []).append(record.duration)
+    width = max((len(name) for name in by_name), default=0)
+    lines = [f"{'stage':<{width}}  {'count':>5}  {'total ms':>10}  {'max ms':>10}"]
+    for name, durations in by_name.items():
+        lines.append(
+            f"{name:<{width}}  {len(durations):>5}  "
+            f"{sum(durations) * 1000:>10.1f}  {max(durations) * 1000:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+_profiling = False
+
+
+@contextlib.contextmanager
+def profile_command(path: Path | str) -> Iterator[None]:
+    """Run the block under cProfile and report where its time went.
+
+    Writes the raw profile to path (readable with `python -m pstats`) and
+    prints the stage timings and the slowest functions to stderr. cProfile only
+    sees the calling thread; work done on the thread pool shows up in the
+    stage timings. Nested uses (a group and its subcommand both given
+    --profile) only profile the outermost one; the command wrapper keeps a
+    group's profile open until its subcommand has finished.
+    """
+    global _profiling
+    if _profiling:
+        yield
+        return
+    # Imported here so that commands run without --profile do not load them
+    import cProfile
+    import pstats
+
+    path = Path(path)
+    _profiling = True
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        with recording() as recorder:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+    finally:
+        _profiling = False
+        elapsed = time.perf_counter() - start
+        try:
+            profiler.dump_stats(path)
+        except OSError as e:
+            logger.error(f"Could not write profile to {path}: {e}")
+        else:
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(
+                PROFILE_TOP_N
+            )
+            click.echo(
+                f"\nProfile written to {path} (inspect with `python -m pstats {path}`)",
+                err=True,
+            )
+            click.echo(f"Wall clock: {elapsed * 1000:.1f} ms\n", err=True)
+            click.echo(format_stages(recorder.records), err=True)
+            click.echo(f"\n{summary.getvalue().strip()}", err=True)
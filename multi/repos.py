@@ -1,7 +1,75 @@
-from typing import Any, List
+from collections.abc import Mapping
+from functools import cached_property
+from typing import Any, List, NamedTuple
 
 from multi.errors import NoRepositoriesError
+from multi.fs_index import RepoIndex
 from multi.paths import Paths
+from multi.profiling import stage
+from multi.settings import Settings
+
+
+class CloneOptions(NamedTuple):
+    """How a repository is cloned, from the "clone" objects in multi.json."""
+
+    # A partial clone filter, e.g. "blob:none" or "tree:0"
+    filter: str | None = None
+    depth: int | None = None
+    single_branch: bool = False
+    no_tags: bool = False
+
+    @classmethod
+    def from_settings(cls, *configs: Mapping[str, Any] | None) -> "CloneOptions":
+        """Combine clone configs, later ones overriding earlier ones key by key."""
+        fields = {
+            "filter": ("filter", str),
+            "depth": ("depth", int),
+            "singleBranch": ("single_branch", bool),
+            "noTags": ("no_tags", bool),
+        }
+        values = {}
+        for config in configs:
+            if config is None:
+                continue
+            if not isinstance(config, Mapping):
+                raise ValueError('"clone" in multi.json must be an object.')
+            for key, value in config.items():
+                if key not in fields:
+                    raise ValueError(
+                        f'Unknown clone option "{key}" in multi.json (expected one of: {", ".join(fields)}).'
+                    )
+                field, expected_type = fields[key]
+                if value is not None and (
+                    not isinstance(value, expected_type)
+                    or (expected_type is int and isinstance(value, bool))
+                ):
+                    raise ValueError(
+                        f'Clone option "{key}" in multi.json must be a {expected_type.__name__}.'
+                    )
+                if key == "depth" and value is not None and value < 1:
+                    raise ValueError(
+                        'Clone option "depth" in multi.json must be at least 1.'
+                    )
+                values[field] = value
+        return cls(**values)
+
+    @property
+    def fetches_one_branch(self) -> bool:
+        """Whether other branches are left out of the clone (--depth implies --single-branch)."""
+        return self.single_branch or self.depth is not None
+
+    def git_args(self) -> List[str]:
+        """The options for `git clone`."""
+        args = []
+        if self.filter:
+            args.append(f"--filter={self.filter}")
+        if self.depth is not None:
+            args.append(f"--depth={self.depth}")
+        if self.single_branch:
+            args.append("--single-branch")
+        if self.no_tags:
+            args.append("--no-tags")
+        return args
 
 
 class Repository:
@@ -13,9 +81,17 @@ class Repository:
         path: Local filesystem path where the repository is/will be cloned.
         skip: Whether to skip this repository for certain operations (default: False).
               Other attributes may be dynamically added from the config.
+        clone_options: How to clone it: the repo's "clone" object applied over
+              clone_defaults (the workspace's "clone" object).
     """
 
-    def __init__(self, url: str, paths: Paths, **kwargs: Any):
+    def __init__(
+        self,
+        url: str,
+        paths: Paths,
+        clone_defaults: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ):
         """Initialize Repository, deriving name and path, and setting other attributes from kwargs."""
         self.url = url
         # Derive name and path from URL
@@ -28,6 +104,9 @@ class Repository:
 
         # Set 'skip' attribute, defaulting to False if not provided in kwargs
         self.skip_vscode = kwargs.pop("skipVSCode", False)
+        self.clone_options = CloneOptions.from_settings(
+            clone_defaults, kwargs.pop("clone", None)
+        )
 
         # Set any other attributes passed in kwargs (top-level keys from repo config)
         for key, value in kwargs.items():
@@ -43,20 +122,18 @@ class Repository:
             return NotImplemented
         return self.url == other.url
 
+    @cached_property
+    def index(self) -> RepoIndex:
+        """Index of the repository's files, scanned on first access."""
+        with stage("scan repo", repo=self.name):
+            return RepoIndex.scan(self.path)
+
     @property
     def is_python(self) -> bool:
-        python_files = [
-            "pyproject.toml",
-            "requirements.txt",
-            "Pipfile",
-            "setup.py",
-            "environment.yml",
-            "setup.cfg",
-        ]
-        return any((self.path / file).exists() for file in python_files)
+        return self.index.is_python
 
 
-def load_repos(paths: Paths) -> List[Repository]:
+def load_repos(paths: Paths, settings: Settings | None = None) -> List[Repository]:
     """Load repository information from the "repos" key in multi.json settings.
 
     Each repository config in the list should be an object. Example:
@@ -66,16 +143,21 @@ def load_repos(paths: Paths) -> List[Repository]:
                 "url": "https://github.com/user/repo",
                 "name": "repo", // Optional, defaults to the last part of the URL
                 "skip": false, // Optional, defaults to false
+                "clone": {"filter": "blob:none"}, // Optional, overrides the top-level "clone"
                 "custom_setting": "value" // Other top-level settings become attributes
             }
         ]
     }
+
+    If settings is not given, they are read from paths.settings.
     """
-    repo_configs_list = paths.settings.get("repos", [])
+    if settings is None:
+        settings = paths.settings
+    repo_configs_list = settings.get("repos", [])
 
     result = []
     for config_dict in repo_configs_list:
-        if not isinstance(config_dict, dict):
+        if not isinstance(config_dict, Mapping):
             raise ValueError("Each repository config in multi.json must be an object.")
 
         if "url" not in config_dict:
@@ -84,7 +166,9 @@ def load_repos(paths: Paths) -> List[Repository]:
             )
 
         # Directly pass the config_dict; __init__ will handle parsing.
-        result.append(Repository(**config_dict, paths=paths))
+        result.append(
+            Repository(**config_dict, paths=paths, clone_defaults=settings.get("clone"))
+        )
 
     if not result:
         raise NoRepositoriesError("No repositories found in multi.json settings.")
@@ -0,0 +1,283 @@
+import contextlib
+import inspect
+import json
+import logging
+import sys
+import traceback
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict
+
+import click
+
+from multi.errors import GitError, NoRepositoriesError, RulesError
+from multi.git_helpers import get_current_branch, is_git_repo_root
+from multi.git_set_branch import set_branch_in_all_repos
+from multi.metrics import command_metrics
+from multi.parallel import run_in_parallel
+from multi.session import WorkspaceSession, get_session
+from multi.sync_claude import convert_all_cursor_rules
+from multi.sync_ruff import sync_all_ruff_configs
+from multi.sync_vscode_helpers import read_merge_inputs
+from multi.watch import MERGERS, create_watcher, watched_dirs
+
+logger = logging.getLogger(__name__)
+
+# Error codes from the JSON-RPC 2.0 specification
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+# Start of the range reserved for implementation-defined server errors
+SERVER_ERROR = -32000
+
+# Errors that describe the state of the workspace rather than a bug in multi
+WORKSPACE_ERRORS = (GitError, NoRepositoriesError, RulesError)
+
+
+class JsonRpcError(Exception):
+    """An error reported to the client in the response to a request."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def read_message(stream: BinaryIO) -> bytes | None:
+    """Read one Content-Length framed message body, or None at end of input.
+
+    Uses the framing of the Language Server Protocol, so the extension can use
+    the vscode-jsonrpc stream readers and writers.
+    """
+    content_length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.rstrip(b"\r\n")
+        if not line:
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            content_length = int(value.strip())
+    if content_length is None:
+        raise JsonRpcError(INVALID_REQUEST, "Missing Content-Length header")
+    body = stream.read(content_length)
+    if len(body) < content_length:
+        return None
+    return body
+
+
+def write_message(stream: BinaryIO, message: Any) -> None:
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    stream.flush()
+
+
+def _error_response(request_id: Any, error: JsonRpcError) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": error.code, "message": error.message},
+    }
+
+
+class WorkspaceServer:
+    """Serves sync requests for one workspace, keeping its state between requests.
+
+    The session (parsed settings, repo list, file indexes and file contents)
+    is reused by every request. A watcher on the workspace's source
+    directories reports what changed between requests, and only those entries
+    are dropped from the session. A change to multi.json starts a new session.
+    """
+
+    def __init__(self, root_dir: Path):
+        self.session = WorkspaceSession(root_dir)
+        self.watcher = create_watcher(watched_dirs(self.session))
+        self.running = True
+        self.methods: Dict[str, Callable[..., Any]] = {
+            "syncVscode": self.sync_vscode,
+            "syncClaude": self.sync_claude,
+            "syncRuff": self.sync_ruff,
+            "status": self.status,
+            "setBranch": self.set_branch,
+            "shutdown": self.shutdown,
+        }
+
+    def refresh(self) -> None:
+        """Drop whatever the session cached about files changed since the last call."""
+        changed = set()
+        while more := self.watcher.wait(0):
+            changed |= more
+        if not changed:
+            return
+        logger.debug(f"{len(changed)} paths changed since the last request")
+        if self.session.paths.multi_json_path in changed:
+            self.session = WorkspaceSession(self.session.root_dir)
+            self.watcher.set_dirs(watched_dirs(self.session))
+        else:
+            self.session.invalidate(changed)
+
+    def handle(self, message: Any) -> Any:
+        """Handle a request, notification or batch; returns the response to send."""
+        if isinstance(message, list):
+            if not message:
+                return _error_response(
+                    None, JsonRpcError(INVALID_REQUEST, "Empty batch")
+                )
+            responses = [self.handle(item) for item in message]
+            return [response for response in responses if response is not None] or None
+
+        request_id = message.get("id") if isinstance(message, dict) else None
+        try:
+            if not isinstance(message, dict) or not isinstance(
+                message.get("method"), str
+            ):
+                raise JsonRpcError(INVALID_REQUEST, "Invalid request")
+            result = self.call(message["method"], message.get("params"))
+        except JsonRpcError as e:
+            return _error_response(request_id, e)
+        if "id" not in message:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def call(self, method_name: str, params: Any) -> Any:
+        method = self.methods.get(method_name)
+        if method is None:
+            raise JsonRpcError(METHOD_NOT_FOUND, f"Unknown method: {method_name}")
+        args, kwargs = [], {}
+        if isinstance(params, list):
+            args = params
+        elif isinstance(params, dict):
+            kwargs = params
+        elif params is not None:
+            raise JsonRpcError(INVALID_PARAMS, "params must be an array or object")
+        try:
+            inspect.signature(method).bind(*args, **kwargs)
+        except TypeError as e:
+            raise JsonRpcError(INVALID_PARAMS, f"{method_name}: {e}") from e
+
+        self.refresh()
+        # Each request is counted as a command of its own, e.g. "multi serve syncVscode"
+        with command_metrics(self.session, f"multi serve {method_name}"):
+            try:
+                return method(*args, **kwargs)
+            except JsonRpcError:
+                raise
+            except WORKSPACE_ERRORS as e:
+                raise JsonRpcError(SERVER_ERROR, str(e)) from e
+            except Exception as e:
+                logger.debug(traceback.format_exc())
+                raise JsonRpcError(INTERNAL_ERROR, f"{type(e).__name__}: {e}") from e
+
+    def sync_vscode(self, kind: str | None = None, force: bool = False) -> Dict:
+        """Merge one .vscode file (settings, launch, tasks or extensions) or all."""
+        if kind is not None and kind not in MERGERS:
+            raise JsonRpcError(
+                INVALID_PARAMS,
+                f"Unknown kind {kind!r}, expected one of {', '.join(MERGERS)}",
+            )
+        kinds = list(MERGERS) if kind is None else [kind]
+        mergers = [MERGERS[k](session=self.session, force=force) for k in kinds]
+        read_merge_inputs(self.session, mergers)
+        written = []
+        for merger_kind, merger in zip(kinds, mergers, strict=True):
+            if merger.merge():
+                written.append(merger_kind)
+        return {"written": written}
+
+    def sync_claude(self) -> None:
+        convert_all_cursor_rules(session=self.session)
+
+    def sync_ruff(self) -> None:
+        sync_all_ruff_configs(session=self.session)
+
+    def status(self) -> Dict:
+        """The branch of the root and of every cloned repository."""
+        session = self.session
+        targets = [(session.root_dir.name, session.root_dir)]
+        targets += [(repo.name, repo.path) for repo in session.repos]
+
+        def describe(target):
+            name, path = target
+            cloned = is_git_repo_root(path)
+            branch = get_current_branch(path) if cloned else None
+            return {"name": name, "path": str(path), "cloned": cloned, "branch": branch}
+
+        results = run_in_parallel(describe, targets)
+        for result in results:
+            if not result.ok:
+                raise result.error
+        root, *repos = [result.value for result in results]
+        return {
+            "root": root,
+            "repos": repos,
+            "onSameBranch": all(
+                repo["branch"] == root["branch"] for repo in repos if repo["cloned"]
+            ),
+        }
+
+    def set_branch(self, branch: str) -> None:
+        set_branch_in_all_repos(
+            root_dir=self.session.root_dir, branch_name=branch, session=self.session
+        )
+
+    def shutdown(self) -> None:
+        """Stop serving once the response to this request has been sent."""
+        self.running = False
+
+    def close(self) -> None:
+        self.watcher.close()
+
+
+def serve(root_dir: Path, stdin: BinaryIO, stdout: BinaryIO) -> None:
+    """Answer JSON-RPC requests from stdin until it is closed or shutdown is called."""
+    server = WorkspaceServer(root_dir)
+    logger.info(f"Serving {server.session.root_dir} over stdio ({server.watcher.name})")
+    try:
+        while server.running:
+            try:
+                body = read_message(stdin)
+            except (JsonRpcError, ValueError) as e:
+                write_message(
+                    stdout, _error_response(None, JsonRpcError(PARSE_ERROR, str(e)))
+                )
+                continue
+            if body is None:
+                break
+            try:
+                message = json.loads(body)
+            except ValueError as e:
+                response = _error_response(None, JsonRpcError(PARSE_ERROR, str(e)))
+            else:
+                response = server.handle(message)
+            if response is not None:
+                write_message(stdout, response)
+    finally:
+        server.close()
+
+
+@click.command(name="serve")
+@click.option(
+    "--stdio",
+    is_flag=True,
+    help="Communicate over stdin and stdout (the only supported transport).",
+)
+def serve_cmd(stdio: bool) -> None:
+    """Run a JSON-RPC server for editor integrations.
+
+    The server keeps the workspace loaded between requests, so each sync
+    only pays for the files that changed. Logs are written to stderr.
+    """
+    if not stdio:
+        raise click.UsageError("Only --stdio is supported")
+    stdout = sys.stdout.buffer
+    # Anything printed by the sync code must not corrupt the protocol stream
+    with contextlib.redirect_stdout(sys.stderr):
+        serve(get_session().root_dir, stdin=sys.stdin.buffer, stdout=stdout)
+
+
+# Metrics are recorded for each request by WorkspaceServer.call; a single
+# outcome for the server's whole lifetime would say nothing useful
+serve_cmd.records_own_metrics = True
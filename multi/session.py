@@ -0,0 +1,106 @@
+import logging
+from functools import cached_property
+from pathlib import Path
+from typing import Iterable, List
+
+import click
+
+from multi.file_cache import FileCache
+from multi.fs_index import RepoIndex
+from multi.manifest import MergeManifest
+from multi.paths import Paths
+from multi.profiling import stage
+from multi.repos import Repository, load_repos
+from multi.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_SESSIONS_META_KEY = "multi.sessions"
+
+
+class WorkspaceSession:
+    """State shared by every stage of a single CLI invocation.
+
+    The session owns the workspace Paths, the parsed Settings and the list of
+    Repository objects. Each is resolved lazily on first access (so commands like
+    `init` can create multi.json first) and then reused by every stage.
+    """
+
+    def __init__(self, target_dir: Path | str):
+        self.target_dir = Path(target_dir)
+
+    @cached_property
+    def paths(self) -> Paths:
+        return Paths(self.target_dir)
+
+    @property
+    def root_dir(self) -> Path:
+        return self.paths.root_dir
+
+    @cached_property
+    def root_index(self) -> RepoIndex:
+        """Index of the workspace root's files, scanned on first access."""
+        return RepoIndex.scan(self.root_dir)
+
+    @cached_property
+    def settings(self) -> Settings:
+        with stage("load settings"):
+            return self.paths.settings
+
+    @cached_property
+    def repos(self) -> List[Repository]:
+        settings = self.settings
+        with stage("load repos"):
+            repos = load_repos(self.paths, settings=settings)
+        logger.debug(f"Loaded {len(repos)} repositories from multi.json")
+        return repos
+
+    @cached_property
+    def files(self) -> FileCache:
+        """Contents of the files read by the stages of this invocation."""
+        return FileCache()
+
+    @cached_property
+    def manifest(self) -> MergeManifest:
+        """Digests of the generated .vscode files, shared by every merger."""
+        return MergeManifest(
+            self.paths.vscode_manifest_path, read_bytes=self.files.read_bytes
+        )
+
+    def invalidate(self, changed: Iterable[Path]) -> None:
+        """Forget what was cached about paths that changed on disk.
+
+        Used by long-lived sessions. Drops the cached contents of each path and
+        the index of the repository (or workspace root) containing it. A change
+        to multi.json is not handled here; it needs a new session.
+        """
+        repos = self.__dict__.get("repos", [])
+        for path in changed:
+            self.files.invalidate(path)
+            if path == self.paths.vscode_manifest_path:
+                self.__dict__.pop("manifest", None)
+            repo = next((r for r in repos if path.is_relative_to(r.path)), None)
+            if repo is not None:
+                repo.__dict__.pop("index", None)
+            else:
+                self.__dict__.pop("root_index", None)
+
+
+def get_session(root_dir: Path | str | None = None) -> WorkspaceSession:
+    """Get the session for root_dir (defaults to the current directory).
+
+    Inside a Click command the session is stored on the context, so every
+    command, subcommand and stage of one invocation shares the same instance.
+    Outside of Click a new session is returned.
+    """
+    target_dir = Path(root_dir) if root_dir is not None else Path.cwd()
+
+    ctx = click.get_current_context(silent=True)
+    if ctx is None:
+        return WorkspaceSession(target_dir)
+
+    # Context.meta is shared between a context and all of its children
+    sessions = ctx.meta.setdefault(_SESSIONS_META_KEY, {})
+    if target_dir not in sessions:
+        sessions[target_dir] = WorkspaceSession(target_dir)
+    return sessions[target_dir]
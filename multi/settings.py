@@ -1,8 +1,12 @@
 import json
 import logging
+import threading
+from collections.abc import Mapping
 from pathlib import Path
-from typing import Any, Dict, Self
+from types import MappingProxyType
+from typing import Any, Dict, Self, Tuple
 
+from multi.profiling import count
 from multi.utils import apply_defaults_to_structure
 
 logger = logging.getLogger(__name__)
@@ -13,11 +17,34 @@ default_settings = {
 }
 
 
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts to read-only mappings and lists to tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
 class Settings:
-    """A lazy-loading settings class that reads from multi.json only when accessed."""
+    """Immutable settings parsed from multi.json.
+
+    Instances are shared across the whole process by the settings cache, so the
+    underlying structure is frozen: dicts become read-only mappings and lists
+    become tuples.
+    """
+
+    __slots__ = ("_dict",)
 
     def __init__(self, dict: Dict[str, Any]):
-        self.dict = dict
+        object.__setattr__(self, "_dict", _freeze(dict))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Settings objects are immutable")
+
+    @property
+    def dict(self) -> Mapping[str, Any]:
+        return self._dict
 
     @classmethod
     def from_multi_json_file(cls, multi_json_file: Path) -> Self:
@@ -28,8 +55,52 @@ class Settings:
 
     def __getitem__(self, key: str) -> Any:
         """Support dictionary-style access to settings."""
-        return self.dict[key]
+        return self._dict[key]
 
     def get(self, key: str, default: Any = None) -> Any:
         """Get a setting with a default value if it doesn't exist."""
-        return self.dict.get(key, default)
+        return self._dict.get(key, default)
+
+
+class SettingsCache:
+    """Process-wide cache of parsed multi.json files.
+
+    Entries are keyed on the resolved file path and validated against the file's
+    (mtime, size, inode), so the same Settings object is returned until the file
+    changes on disk.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Path, Tuple[Tuple[int, int, int], Settings]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, multi_json_file: Path) -> Settings:
+        path = multi_json_file.resolve()
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                count("cache_hits", cache="settings")
+                return entry[1]
+            self.misses += 1
+        count("cache_misses", cache="settings")
+
+        logger.debug(f"Parsing {path}")
+        settings = Settings.from_multi_json_file(path)
+        with self._lock:
+            self._entries[path] = (key, settings)
+        return settings
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+settings_cache = SettingsCache()
@@ -2,27 +2,93 @@ import logging
 from pathlib import Path
 
 import click
-import git
-from git.exc import GitCommandError
 
 from multi.cli_helpers import common_command_wrapper
-from multi.git_helpers import get_current_branch
+from multi.errors import GitError
+from multi.git_helpers import get_current_branch, read_head_branch
 from multi.ignore_files import (
     update_gitignore_with_repos,
     update_ignore_with_repos,
 )
-from multi.paths import Paths
-from multi.repos import load_repos
+from multi.object_cache import object_cache_dir, reference_args
+from multi.parallel import run_in_parallel
+from multi.profiling import stage
+from multi.repos import Repository
+from multi.session import WorkspaceSession, get_session
 from multi.sync_claude import convert_all_cursor_rules, convert_claude_cmd
 from multi.sync_ruff import sync_all_ruff_configs, sync_ruff_cmd
 from multi.sync_vscode import merge_vscode_configs, vscode_cmd
+from multi.watch import watch_workspace
 
 logger = logging.getLogger(__name__)
 
 
-def clone_repos(paths: Paths, ensure_on_same_branch: bool = True):
-    """Clone all repositories from the repos.json file."""
-    repos = load_repos(paths=paths)
+def clone_repo(
+    repo: Repository, branch: str | None = None, object_cache: Path | None = None
+) -> str:
+    """Clone a single repository and check out branch if it exists.
+
+    With an object_cache directory, objects already in the repository's mirror
+    there are borrowed instead of downloaded.
+
+    Returns a short description of what was done, used for the clone summary.
+    """
+    import git
+    from git.exc import GitCommandError
+
+    options = repo.clone_options
+    clone_args = options.git_args() + reference_args(object_cache, repo)
+    logger.debug(
+        f"Cloning {repo.name} ({' '.join(clone_args) if clone_args else 'full clone'})..."
+    )
+
+    # First clone the default branch
+    with stage(
+        "clone repository", repo=repo.name, options=" ".join(clone_args), git="clone"
+    ):
+        cloned_repo = git.Repo.clone_from(repo.url, repo.path, multi_options=clone_args)
+    if not branch:
+        return "cloned"
+
+    # Then checkout the same branch as parent repo if it exists
+    try:
+        if options.fetches_one_branch and read_head_branch(repo.path) != branch:
+            # The clone only has the default branch; fetch this one as well
+            fetch_args = [f"--depth={options.depth}"] if options.depth else []
+            if options.no_tags:
+                fetch_args.append("--no-tags")
+            with stage("fetch branch", repo=repo.name, branch=branch, git="fetch"):
+                cloned_repo.git.fetch(
+                    "origin",
+                    f"+refs/heads/{branch}:refs/remotes/origin/{branch}",
+                    *fetch_args,
+                )
+            # So that checkout finds it and later fetches keep it up to date
+            cloned_repo.git.remote("set-branches", "--add", "origin", branch)
+        with stage("check out branch", repo=repo.name, branch=branch, git="checkout"):
+            cloned_repo.git.checkout(branch)
+    except GitCommandError:
+        logger.warning(
+            f"Branch {branch} not found in {repo.name}, staying on default branch."
+        )
+        return f"cloned, staying on default branch ({branch} not found)"
+    return f"cloned and checked out branch {branch}"
+
+
+@stage("clone repos")
+def clone_repos(
+    session: WorkspaceSession,
+    ensure_on_same_branch: bool = True,
+    jobs: int | None = None,
+):
+    """Clone all missing repositories from multi.json.
+
+    Clones run concurrently on up to `jobs` workers (default: CPU count). Errors
+    are collected per repository and reported in a summary once every clone has
+    finished.
+    """
+    paths = session.paths
+    repos = session.repos
 
     # Get the current branch of the parent repo
     current_branch = (
@@ -31,56 +97,90 @@ def clone_repos(paths: Paths, ensure_on_same_branch: bool = True):
     if ensure_on_same_branch:
         logger.info(f"Current branch: {current_branch}")
 
-    for repo_config in repos:
-        if repo_config.path.exists():
-            logger.debug(f"{repo_config.name} already exists, skipping...")
+    missing_repos = []
+    for repo in repos:
+        if repo.path.exists():
+            logger.debug(f"{repo.name} already exists, skipping...")
             continue
+        missing_repos.append(repo)
 
-        logger.debug(f"Cloning {repo_config.name}...")
+    object_cache = object_cache_dir(session) if missing_repos else None
+    results = run_in_parallel(
+        lambda repo: clone_repo(repo, branch=current_branch, object_cache=object_cache),
+        missing_repos,
+        jobs=jobs,
+    )
 
-        # First clone the default branch
-        cloned_repo = git.Repo.clone_from(repo_config.url, repo_config.path)
+    update_gitignore_with_repos(paths=paths, repos=repos)
+    update_ignore_with_repos(paths=paths, repos=repos)
 
-        # Then checkout the same branch as parent repo if it exists
-        if current_branch:
-            try:
-                cloned_repo.git.checkout(current_branch)
-                logger.info(
-                    f"✅ Cloned {repo_config.name} and checked out branch {current_branch}"
-                )
-            except GitCommandError:
-                logger.warning(
-                    f"Branch {current_branch} not found in {repo_config.name}, staying on default branch."
-                )
+    if not results:
+        return
 
-    update_gitignore_with_repos(paths=paths)
-    update_ignore_with_repos(paths=paths)
+    logger.info("Clone summary:")
+    for result in results:
+        if result.ok:
+            logger.info(f"✅ {result.item.name}: {result.value}")
+        else:
+            logger.error(f"{result.item.name}: {result.error}")
 
+    failed = [result.item.name for result in results if not result.ok]
+    if failed:
+        raise GitError(
+            f"Failed to clone {len(failed)} of {len(results)} repositories: {', '.join(failed)}"
+        )
 
-def sync(root_dir: Path, ensure_on_same_branch: bool = True):
+
+@stage("sync")
+def sync(root_dir: Path, ensure_on_same_branch: bool = True, jobs: int | None = None):
     """Run all sync operations."""
     logger.info("Syncing...")
 
-    paths = Paths(root_dir)
-    clone_repos(paths=paths, ensure_on_same_branch=ensure_on_same_branch)
-    merge_vscode_configs(root_dir=root_dir)
-    convert_all_cursor_rules(root_dir=root_dir)
-    sync_all_ruff_configs(root_dir=root_dir)
+    session = get_session(root_dir)
+    clone_repos(session=session, ensure_on_same_branch=ensure_on_same_branch, jobs=jobs)
+    sync_generated_files(session=session, jobs=jobs)
 
     logger.info("✅ Sync complete")
 
 
+def sync_generated_files(session: WorkspaceSession, jobs: int | None = None):
+    """Regenerate every file derived from the repos: .vscode, CLAUDE.md and ruff.toml."""
+    merge_vscode_configs(session=session, jobs=jobs)
+    convert_all_cursor_rules(session=session)
+    sync_all_ruff_configs(session=session)
+
+
 @click.group(name="sync", invoke_without_command=True)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of repositories to clone and read in parallel (default: CPU count).",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="After syncing, keep re-merging whenever a repo's config files change.",
+)
 @click.pass_context
-def sync_cmd(ctx: click.Context):
+def sync_cmd(ctx: click.Context, jobs: int | None, watch: bool):
     """Sync development environment and configurations.
 
     If no subcommand is given, performs complete sync:
     1. Clones/updates all repositories
     2. Merges VSCode configurations
+
+    With --watch, multi then keeps running and only re-runs the merges and
+    conversions affected by each change.
     """
+    if watch and ctx.invoked_subcommand is not None:
+        raise click.UsageError("--watch cannot be combined with a subcommand")
     if ctx.invoked_subcommand is None:
-        sync(root_dir=Path.cwd())
+        root_dir = Path.cwd()
+        sync(root_dir=root_dir, jobs=jobs)
+        if watch:
+            watch_workspace(root_dir=root_dir)
 
 
 # Add subcommands
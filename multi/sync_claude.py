@@ -1,27 +1,40 @@
 import logging
 from pathlib import Path
+from typing import List
 
 import click
 
-from multi.paths import Paths
-from multi.repos import load_repos
+from multi.fs_index import RepoIndex
+from multi.profiling import stage
 from multi.rules import Rule
+from multi.session import WorkspaceSession, get_session
+from multi.utils import write_file_if_changed
 
 logger = logging.getLogger(__name__)
 
 
-def convert_cursor_rules_to_claude_md(cursor_dir: Path) -> None:
-    """Convert cursor rules in a directory to a CLAUDE.md file."""
+def convert_cursor_rules_to_claude_md(
+    cursor_dir: Path, index: RepoIndex | None = None
+) -> None:
+    """Convert cursor rules in a directory to a CLAUDE.md file.
+
+    If an index of the directory's repository is given, rule files and
+    CLAUDE.md are looked up in it instead of on the filesystem.
+    """
     rules_dir = cursor_dir / "rules"
     # Place CLAUDE.md at the same level as .cursor directory, not inside it
     claude_md_path = cursor_dir.parent / "CLAUDE.md"
 
-    if not rules_dir.exists():
+    if index is None:
+        index = RepoIndex.scan(cursor_dir.parent)
+
+    if rules_dir not in index:
         logger.debug(f"No rules directory found at {rules_dir}")
         return
 
     rules = []
-    for rule_file in rules_dir.glob("*.mdc"):
+    rule_files: List[Path] = index.files_in(".cursor/rules")
+    for rule_file in rule_files:
         try:
             content = rule_file.read_text(encoding="utf-8")
             rule = Rule.parse(content)
@@ -33,7 +46,7 @@ def convert_cursor_rules_to_claude_md(cursor_dir: Path) -> None:
     if not rules:
         logger.debug(f"No valid cursor rules found in {rules_dir}")
         # Remove CLAUDE.md if it exists but no rules found
-        if claude_md_path.exists():
+        if claude_md_path in index:
             claude_md_path.unlink()
             logger.debug(f"Removed empty CLAUDE.md from {claude_md_path.parent}")
         return
@@ -46,29 +59,31 @@ def convert_cursor_rules_to_claude_md(cursor_dir: Path) -> None:
         content_parts.append(rule.body.strip())
 
     combined_content = "".join(content_parts)
-    claude_md_path.write_text(combined_content, encoding="utf-8")
+    if not write_file_if_changed(claude_md_path, combined_content):
+        logger.debug(f"CLAUDE.md at {claude_md_path} is already up to date")
+        return
 
     logger.info(f"✅ Generated CLAUDE.md with {len(rules)} rules at {claude_md_path}")
 
 
-def convert_all_cursor_rules(root_dir: Path) -> None:
+@stage("convert cursor rules")
+def convert_all_cursor_rules(session: WorkspaceSession) -> None:
     """Convert cursor rules to CLAUDE.md files for all repositories."""
     logger.info("Converting cursor rules to CLAUDE.md files...")
 
     # Check root directory for .cursor
-    root_cursor_dir = root_dir / ".cursor"
-    if root_cursor_dir.exists():
+    root_cursor_dir = session.root_dir / ".cursor"
+    if root_cursor_dir in session.root_index:
         logger.debug(f"Processing root cursor directory: {root_cursor_dir}")
-        convert_cursor_rules_to_claude_md(root_cursor_dir)
+        convert_cursor_rules_to_claude_md(root_cursor_dir, index=session.root_index)
 
     # Check each sub-repository for .cursor
-    paths = Paths(root_dir)
-    repos = load_repos(paths=paths)
-    for repo in repos:
+    for repo in session.repos:
         cursor_dir = repo.path / ".cursor"
-        if cursor_dir.exists():
+        if cursor_dir in repo.index:
             logger.debug(f"Processing cursor directory for {repo.name}: {cursor_dir}")
-            convert_cursor_rules_to_claude_md(cursor_dir)
+            with stage("convert repo rules", repo=repo.name):
+                convert_cursor_rules_to_claude_md(cursor_dir, index=repo.index)
         else:
             logger.debug(f"No cursor directory found for {repo.name}")
 
@@ -85,4 +100,4 @@ def convert_claude_cmd():
     3. Generate CLAUDE.md files alongside each .cursor directory
     """
     logger.info("Converting cursor rules to CLAUDE.md files...")
-    convert_all_cursor_rules(Path.cwd())
+    convert_all_cursor_rules(session=get_session())
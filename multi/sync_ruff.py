@@ -1,20 +1,25 @@
 import logging
-import shutil
 from pathlib import Path
 
 import click
 
+from multi.fs_index import RepoIndex
 from multi.paths import Paths
-from multi.repos import load_repos
+from multi.profiling import stage
+from multi.session import WorkspaceSession, get_session
+from multi.utils import write_file_if_changed
 
 logger = logging.getLogger(__name__)
 
 
-def copy_ruff_config_from_repo(repo_path: Path, paths: Paths) -> bool:
+def copy_ruff_config_from_repo(
+    repo_path: Path, paths: Paths, index: RepoIndex | None = None
+) -> bool:
     """Copy ruff.toml from a repository to the root directory.
 
     Args:
         repo_path: Path to the repository to check for ruff.toml
+        index: Index of the repository's files, scanned if not given
 
     Returns:
         True if a ruff.toml file was found and copied, False otherwise
@@ -22,20 +27,26 @@ def copy_ruff_config_from_repo(repo_path: Path, paths: Paths) -> bool:
     ruff_config_path = repo_path / "ruff.toml"
     root_ruff_path = paths.root_dir / "ruff.toml"
 
-    if not ruff_config_path.exists():
+    if index is None:
+        index = RepoIndex.scan(repo_path)
+
+    if ruff_config_path not in index:
         logger.debug(f"No ruff.toml found in {repo_path}")
         return False
 
     try:
-        shutil.copy2(ruff_config_path, root_ruff_path)
-        logger.info(f"✅ Copied ruff.toml from {repo_path.name} to root")
+        if write_file_if_changed(root_ruff_path, ruff_config_path.read_bytes()):
+            logger.info(f"✅ Copied ruff.toml from {repo_path.name} to root")
+        else:
+            logger.debug(f"Root ruff.toml already matches {repo_path.name}")
         return True
     except Exception as e:
         logger.warning(f"Failed to copy ruff.toml from {repo_path}: {e}")
         return False
 
 
-def sync_all_ruff_configs(root_dir: Path) -> None:
+@stage("sync ruff configs")
+def sync_all_ruff_configs(session: WorkspaceSession) -> None:
     """Copy ruff.toml files from all repositories to the root directory.
 
     This will search all sub-repositories for ruff.toml files and copy the first
@@ -45,14 +56,13 @@ def sync_all_ruff_configs(root_dir: Path) -> None:
     logger.info("Syncing ruff configuration files...")
 
     # Check each sub-repository for ruff.toml
-    paths = Paths(root_dir)
-    repos = load_repos(paths=paths)
+    paths = session.paths
     configs_found = 0
 
-    for repo in repos:
-        if repo.path.exists():
+    for repo in session.repos:
+        if repo.index.exists:
             logger.debug(f"Checking {repo.name} for ruff.toml")
-            if copy_ruff_config_from_repo(repo.path, paths=paths):
+            if copy_ruff_config_from_repo(repo.path, paths=paths, index=repo.index):
                 configs_found += 1
         else:
             logger.debug(f"Repository {repo.name} not found at {repo.path}")
@@ -61,7 +71,7 @@ def sync_all_ruff_configs(root_dir: Path) -> None:
         logger.info("No ruff.toml files found in any repository")
         # Remove root ruff.toml if it exists but no configs found
         root_ruff_path = paths.root_dir / "ruff.toml"
-        if root_ruff_path.exists():
+        if root_ruff_path in session.root_index:
             root_ruff_path.unlink()
             logger.info(
                 "Removed existing ruff.toml from root (no source configs found)"
@@ -82,4 +92,4 @@ def sync_ruff_cmd():
     3. If multiple ruff.toml files exist, the last one processed will be used
     """
     logger.info("Syncing ruff configuration files...")
-    sync_all_ruff_configs(root_dir=Path.cwd())
+    sync_all_ruff_configs(session=get_session())
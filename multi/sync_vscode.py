@@ -1,47 +1,62 @@
 import logging
-from pathlib import Path
 
 import click
 
 from multi.cli_helpers import common_command_wrapper
+from multi.profiling import stage
+from multi.session import WorkspaceSession, get_session
 from multi.sync_vscode_extensions import (
+    ExtensionsFileMerger,
     merge_extensions_cmd,
-    merge_extensions_json,
 )
-from multi.sync_vscode_launch import merge_launch_cmd, merge_launch_json
-from multi.sync_vscode_settings import merge_settings_cmd, merge_settings_json
-from multi.sync_vscode_tasks import merge_tasks_cmd, merge_tasks_json
+from multi.sync_vscode_helpers import force_option, read_merge_inputs
+from multi.sync_vscode_launch import LaunchFileMerger, merge_launch_cmd
+from multi.sync_vscode_settings import SettingsFileMerger, merge_settings_cmd
+from multi.sync_vscode_tasks import TasksFileMerger, merge_tasks_cmd
 
 logger = logging.getLogger(__name__)
 
 
-def merge_vscode_configs(root_dir: Path):
+@stage("merge vscode configs")
+def merge_vscode_configs(
+    session: WorkspaceSession, force: bool = False, jobs: int | None = None
+):
     logger.info("Merging .vscode configuration files from all repositories...")
 
-    # Merge settings.json
-    merge_settings_json(root_dir=root_dir)
+    mergers = [
+        SettingsFileMerger(session=session, force=force),
+        LaunchFileMerger(session=session, force=force),
+        TasksFileMerger(session=session, force=force),
+        ExtensionsFileMerger(session=session, force=force),
+    ]
 
-    # Merge launch.json
-    merge_launch_json(root_dir=root_dir)
+    # Read the sources of all four files for every repo in one concurrent pass
+    read_merge_inputs(session, mergers, jobs=jobs)
 
-    # Merge tasks.json
-    merge_tasks_json(root_dir=root_dir)
-
-    # Merge extensions.json
-    merge_extensions_json(root_dir=root_dir)
+    # Merge settings.json, launch.json, tasks.json and extensions.json
+    for merger in mergers:
+        merger.merge()
 
     logger.info("Done merging .vscode configuration files!")
 
 
 @click.group(name="vscode", invoke_without_command=True)
+@force_option
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of files to read in parallel (default: CPU count).",
+)
 @click.pass_context
-def vscode_cmd(ctx: click.Context):
+def vscode_cmd(ctx: click.Context, force: bool, jobs: int | None):
     """Manage VSCode configuration files across repositories.
 
     If no subcommand is given, merges all (settings, launch, tasks, extensions).
     """
     if ctx.invoked_subcommand is None:
-        merge_vscode_configs(root_dir=Path.cwd())
+        merge_vscode_configs(session=get_session(), force=force, jobs=jobs)
 
 
 # Add subcommands
@@ -4,8 +4,8 @@ from typing import Any, Dict
 
 import click
 
-from multi.paths import Paths
-from multi.sync_vscode_helpers import VSCodeFileMerger
+from multi.session import get_session
+from multi.sync_vscode_helpers import VSCodeFileMerger, force_option
 
 logger = logging.getLogger(__name__)
 
@@ -35,13 +35,14 @@ class ExtensionsFileMerger(VSCodeFileMerger):
         return merged_json
 
 
-def merge_extensions_json(root_dir: Path) -> None:
-    merger = ExtensionsFileMerger(paths=Paths(root_dir))
+def merge_extensions_json(root_dir: Path, force: bool = False) -> None:
+    merger = ExtensionsFileMerger(session=get_session(root_dir), force=force)
     merger.merge()
 
 
 @click.command(name="extensions")
-def merge_extensions_cmd():
+@force_option
+def merge_extensions_cmd(force: bool):
     """Merge extensions.json files from all repositories into the root .vscode directory.
 
     This command will:
@@ -49,4 +50,4 @@ def merge_extensions_cmd():
     2. Remove duplicate recommendations while preserving order.
     """
     logger.info("Merging extensions.json files from all repositories...")
-    merge_extensions_json(Path.cwd())
+    merge_extensions_json(Path.cwd(), force=force)
@@ -1,18 +1,25 @@
 import logging
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Dict, List
-
-from multi.paths import Paths
-from multi.repos import Repository, load_repos
-from multi.utils import (
-    apply_defaults_to_structure,
-    soft_read_json_file,
-    write_json_file,
-)
+from typing import Any, Dict, Hashable, List, Set
+
+import click
+
+from multi.manifest import hash_inputs
+from multi.parallel import run_in_parallel
+from multi.profiling import count, stage
+from multi.repos import Repository
+from multi.session import WorkspaceSession
+from multi.utils import apply_defaults_to_structure, write_json_file
 
 logger = logging.getLogger(__name__)
 
+force_option = click.option(
+    "--force",
+    is_flag=True,
+    help="Merge even if no input has changed since the last merge.",
+)
+
 
 def prefix_repo_name_to_path(path: str, repo_name: str) -> str:
     if f"${{workspaceFolder}}/{repo_name}" in path:
@@ -27,6 +34,9 @@ def prefix_repo_name_to_path_recursive(value: Any, repo_name: str) -> Any:
     """
     Recursively adjust workspace folder paths in values.
 
+    Containers without any path to adjust are returned as they are rather than
+    copied, so only the dicts and lists along changed paths are rebuilt.
+
     Args:
         value: The value to process
         repo_name: Name of the repository to add to workspace folder paths
@@ -34,34 +44,169 @@ def prefix_repo_name_to_path_recursive(value: Any, repo_name: str) -> Any:
     if isinstance(value, str) and "${workspaceFolder}" in value:
         return prefix_repo_name_to_path(value, repo_name)
     elif isinstance(value, dict):
-        return {
-            k: prefix_repo_name_to_path_recursive(v, repo_name)
-            for k, v in value.items()
-        }
+        result = None
+        for k, v in value.items():
+            new_v = prefix_repo_name_to_path_recursive(v, repo_name)
+            if new_v is not v:
+                if result is None:
+                    result = value.copy()
+                result[k] = new_v
+        return value if result is None else result
     elif isinstance(value, list):
-        return [prefix_repo_name_to_path_recursive(item, repo_name) for item in value]
+        result = None
+        for i, item in enumerate(value):
+            new_item = prefix_repo_name_to_path_recursive(item, repo_name)
+            if new_item is not item:
+                if result is None:
+                    result = value.copy()
+                result[i] = new_item
+        return value if result is None else result
     return value
 
 
+# Types whose values are their own equality key
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def _equality_key(value: Any) -> Hashable:
+    """A hashable key that is equal for two JSON values exactly when they are ==.
+
+    Dicts and lists are converted recursively, tagged with their type so that,
+    like ==, a list never matches a tuple. Scalars are used as they are, which
+    keeps Python's equality rules (1 == 1.0 == True). Raises TypeError for
+    values that cannot be hashed.
+    """
+    if type(value) in _SCALAR_TYPES:
+        return value
+    if isinstance(value, dict):
+        return (
+            dict,
+            frozenset(
+                [
+                    (k, v if type(v) in _SCALAR_TYPES else _equality_key(v))
+                    for k, v in value.items()
+                ]
+            ),
+        )
+    if isinstance(value, list):
+        return (
+            list,
+            tuple(
+                [
+                    item if type(item) in _SCALAR_TYPES else _equality_key(item)
+                    for item in value
+                ]
+            ),
+        )
+    hash(value)
+    return value
+
+
+def _equality_index(items: List[Any]) -> Set[Hashable] | None:
+    """The equality keys of items, or None if some item cannot be hashed."""
+    scalar_types = _SCALAR_TYPES
+    try:
+        # Scalars are checked inline since they are by far the most common items
+        return {
+            item if type(item) in scalar_types else _equality_key(item)
+            for item in items
+        }
+    except TypeError:
+        return None
+
+
+class _OwnedNodes:
+    """The dicts and lists created by one merge, which it may modify in place.
+
+    deep_merge never modifies its inputs: a dict or list from base or override
+    is copied the first time something changes inside it, and the copy is owned.
+    When the same merge state is reused for the next repo, owned nodes are
+    updated in place instead of being copied again. Subtrees nobody touched stay
+    shared with the inputs.
+
+    Nodes are kept referenced so their ids cannot be reused. The equality index
+    of each owned list is kept too, so unions do not rebuild it.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[int, Any] = {}
+        self.list_indexes: Dict[int, Set[Hashable]] = {}
+
+    def __contains__(self, node: Any) -> bool:
+        return self._nodes.get(id(node)) is node
+
+    def add(self, node: Any) -> Any:
+        self._nodes[id(node)] = node
+        return node
+
+
+def _list_union(
+    existing: List[Any], new: List[Any], owned: _OwnedNodes | None = None
+) -> List[Any]:
+    """Append the items of new that are not equal to any item already in existing.
+
+    Only existing is deduplicated against, so repeated items within new are all
+    kept. Lookups go through a hash index of existing, falling back to a linear
+    scan if some item cannot be hashed. An owned existing list is extended in
+    place, otherwise a new list is returned.
+    """
+    in_place = owned is not None and existing in owned
+    index = owned.list_indexes.get(id(existing)) if in_place else None
+    if index is None:
+        index = _equality_index(existing)
+
+    additions: List[Any] = []
+    addition_keys: List[Hashable] = []
+    if index is not None:
+        scalar_types = _SCALAR_TYPES
+        try:
+            for item in new:
+                key = item if type(item) in scalar_types else _equality_key(item)
+                if key not in index:
+                    additions.append(item)
+                    addition_keys.append(key)
+        except TypeError:
+            index = None
+    if index is None:
+        additions = [item for item in new if item not in existing]
+
+    if in_place:
+        existing.extend(additions)
+        result = existing
+    else:
+        result = existing + additions
+        if owned is None:
+            return result
+        owned.add(result)
+    if index is not None:
+        index.update(addition_keys)
+        owned.list_indexes[id(result)] = index
+    else:
+        owned.list_indexes.pop(id(result), None)
+    return result
+
+
 def _deep_merge_recursive(
     base: Dict[str, Any],
     override: Dict[str, Any],
     skip_keys: List[str] | None = None,
+    owned: _OwnedNodes | None = None,
 ) -> Dict[str, Any]:
-    merged = base.copy()
+    if owned is None:
+        owned = _OwnedNodes()
+    merged = base if base in owned else owned.add(base.copy())
 
     for key, value in override.items():
         # Skip keys that we don't want to merge
         if skip_keys is not None and key in skip_keys:
             continue
 
-        if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
-            merged[key] = _deep_merge_recursive(merged[key], value, skip_keys)
-        elif (
-            key in merged and isinstance(merged[key], list) and isinstance(value, list)
-        ):
+        existing = merged.get(key)
+        if isinstance(value, dict) and isinstance(existing, dict):
+            merged[key] = _deep_merge_recursive(existing, value, skip_keys, owned)
+        elif isinstance(value, list) and isinstance(existing, list):
             # For lists, concatenate and remove duplicates while preserving order
-            merged[key] = merged[key] + [x for x in value if x not in merged[key]]
+            merged[key] = _list_union(existing, value, owned)
         else:
             merged[key] = value
 
@@ -73,19 +218,48 @@ def deep_merge(
     override: Dict[str, Any],
     repo_name: str | None = None,
     skip_keys: List[str] | None = None,
+    owned: _OwnedNodes | None = None,
 ) -> Dict[str, Any]:
+    """Merge override into base without modifying either.
+
+    The result shares every subtree that the merge did not change with its
+    inputs. Pass the same owned state to a sequence of merges that feed each
+    result into the next one so the accumulated result is updated in place.
+    """
     effective_override = override
     # Adjust workspace folder paths in the override value if repo_name is provided
     if repo_name:
         effective_override = prefix_repo_name_to_path_recursive(override, repo_name)
 
     # Perform the primary merge of base and (processed) override
-    return _deep_merge_recursive(base, effective_override, skip_keys)
+    return _deep_merge_recursive(base, effective_override, skip_keys, owned)
+
+
+def read_merge_inputs(
+    session: WorkspaceSession,
+    mergers: List["VSCodeFileMerger"],
+    jobs: int | None = None,
+) -> None:
+    """Scan every repo and read every file the mergers use, concurrently.
+
+    The results land in the repos' indexes and the session's file cache, so
+    the mergers then run without waiting on the filesystem one file at a time.
+    """
+    with stage("read merge inputs"):
+        run_in_parallel(lambda repo: repo.index, session.repos, jobs=jobs)
+        session.files.preload(
+            [path for merger in mergers for path in merger.get_read_paths()],
+            jobs=jobs,
+        )
 
 
 class VSCodeFileMerger(ABC):
-    def __init__(self, paths: Paths):
-        self.paths = paths
+    def __init__(self, session: WorkspaceSession, force: bool = False):
+        self.session = session
+        self.paths = session.paths
+        self.force = force
+        # Nodes of the merged JSON that the current merge created and may update in place
+        self._owned_nodes = _OwnedNodes()
 
     @abstractmethod
     def _get_destination_json_path(self) -> Path:
@@ -112,6 +286,41 @@ class VSCodeFileMerger(ABC):
         """
         return None
 
+    def _get_input_paths(self) -> List[Path]:
+        """
+        Get every file the merged output is built from.
+        multi.json is always included, which also covers skip lists and repo options.
+        Subclasses can extend this with files they read in addition to the sources.
+        """
+        input_paths = [self.paths.multi_json_path]
+        for repo in self.session.repos:
+            if not repo.skip_vscode:
+                input_paths.append(self._get_source_json_path(repo.path))
+        return input_paths
+
+    def _get_input_state(self) -> Dict[str, Any]:
+        """
+        Get any other (JSON-serializable) state the merged output depends on.
+        Subclasses can extend this, for example with facts detected from the repos.
+        """
+        return {"root_dir": str(self.paths.root_dir)}
+
+    def _get_inputs_digest(self) -> str:
+        return hash_inputs(
+            self.paths.root_dir,
+            self._get_input_paths(),
+            self._get_input_state(),
+            read_bytes=self.session.files.read_bytes,
+        )
+
+    def get_read_paths(self) -> List[Path]:
+        """Every file merge() may read, so they can be read ahead of time."""
+        return self._get_input_paths() + [self._get_destination_json_path()]
+
+    def _read_json(self, path: Path) -> Dict[str, Any]:
+        """Parse a JSON(C) file through the session's file cache."""
+        return self.session.files.read_json(path)
+
     def _merge_repo_json(
         self,
         merged_json: Dict[str, Any],
@@ -129,7 +338,9 @@ class VSCodeFileMerger(ABC):
         if defaults:
             effective_repo_json = apply_defaults_to_structure(repo_json, defaults)
 
-        return deep_merge(merged_json, effective_repo_json, repo.name, skip_keys)
+        return deep_merge(
+            merged_json, effective_repo_json, repo.name, skip_keys, self._owned_nodes
+        )
 
     def _post_process_json(self, merged_json: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -138,32 +349,59 @@ class VSCodeFileMerger(ABC):
         """
         return merged_json
 
-    def merge(self) -> None:
+    def merge(self) -> bool:
         """
         Merges JSON files from all repositories into a single destination file.
+
+        Returns whether the destination file was rewritten.
         """
         destination_path = self._get_destination_json_path()
-        destination_path.unlink(missing_ok=True)
+        with stage(f"merge {destination_path.name}", merger=destination_path.name):
+            return self._merge(destination_path)
 
-        merged_json: Dict[str, Any] = {}
-        repos_list = load_repos(self.paths)
+    def _merge(self, destination_path: Path) -> bool:
+        # Does nothing if merge_vscode_configs already read everything
+        read_merge_inputs(self.session, [self])
+        manifest = self.session.manifest
+        if not self.force:
+            if manifest.is_up_to_date(destination_path, self._get_inputs_digest()):
+                count("cache_hits", cache="merge manifest")
+                logger.info(f"{destination_path.name} is up to date, skipping merge")
+                return False
+            count("cache_misses", cache="merge manifest")
 
-        for repo_item in repos_list:
+        self._owned_nodes = _OwnedNodes()
+        merged_json: Dict[str, Any] = {}
+        for repo_item in self.session.repos:
             if repo_item.skip_vscode:
                 logger.debug(f"Skipping {repo_item.name} for {destination_path.name}")
                 continue
 
-            repo_json_path = self._get_source_json_path(repo_item.path)
-            repo_json_content = soft_read_json_file(repo_json_path)
+            with stage("merge repo", repo=repo_item.name):
+                repo_json_path = self._get_source_json_path(repo_item.path)
+                repo_json_content = (
+                    self._read_json(repo_json_path)
+                    if repo_json_path in repo_item.index
+                    else {}
+                )
 
-            merged_json = self._merge_repo_json(
-                merged_json, repo_json_content, repo_item
-            )
+                merged_json = self._merge_repo_json(
+                    merged_json, repo_json_content, repo_item
+                )
 
         merged_json = self._post_process_json(merged_json)
-        write_json_file(
-            destination_path,
-            merged_json,
-            header_comment="This file is generated by multi. Do not edit directly.",
-        )
-        logger.info(f"Successfully merged files into {destination_path.name}")
+        with stage(f"write {destination_path.name}"):
+            written = write_json_file(
+                destination_path,
+                merged_json,
+                header_comment="This file is generated by multi. Do not edit directly.",
+            )
+        self.session.files.invalidate(destination_path)
+        # Inputs are hashed again because merging can rewrite them (the settings
+        # merger folds each repo's settings.shared.json into its settings.json)
+        manifest.record(destination_path, self._get_inputs_digest())
+        if written:
+            logger.info(f"Successfully merged files into {destination_path.name}")
+        else:
+            logger.info(f"{destination_path.name} is already up to date")
+        return written
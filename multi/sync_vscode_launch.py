@@ -5,10 +5,11 @@ from typing import Any, Dict, List
 
 import click
 
-from multi.paths import Paths
 from multi.repos import Repository
+from multi.session import get_session
 from multi.sync_vscode_helpers import (
     VSCodeFileMerger,
+    force_option,
     prefix_repo_name_to_path,
 )
 
@@ -36,9 +37,6 @@ def get_required_launch_configurations(launch_json: Dict[str, Any]) -> List[str]
 
 
 class LaunchFileMerger(VSCodeFileMerger):
-    def __init__(self, paths: Paths):
-        self.paths = paths
-
     def _get_destination_json_path(self) -> Path:
         return self.paths.vscode_launch_path
 
@@ -87,13 +85,14 @@ class LaunchFileMerger(VSCodeFileMerger):
         return merged_json
 
 
-def merge_launch_json(root_dir: Path) -> None:
-    merger = LaunchFileMerger(paths=Paths(root_dir))
+def merge_launch_json(root_dir: Path, force: bool = False) -> None:
+    merger = LaunchFileMerger(session=get_session(root_dir), force=force)
     merger.merge()
 
 
 @click.command(name="launch")
-def merge_launch_cmd():
+@force_option
+def merge_launch_cmd(force: bool):
     """Merge launch.json files from all repositories into the root .vscode directory.
 
     This command will:
@@ -102,4 +101,4 @@ def merge_launch_cmd():
     3. Preserve existing compounds by renaming conflicts.
     """
     logger.info("Merging launch.json files from all repositories...")
-    merge_launch_json(root_dir=Path.cwd())
+    merge_launch_json(root_dir=Path.cwd(), force=force)
@@ -4,10 +4,10 @@ from typing import Any, Dict, List
 
 import click
 
-from multi.paths import Paths
-from multi.repos import Repository, load_repos
-from multi.sync_vscode_helpers import VSCodeFileMerger, deep_merge
-from multi.utils import soft_read_json_file
+from multi.repos import Repository
+from multi.session import get_session
+from multi.sync_vscode_helpers import VSCodeFileMerger, deep_merge, force_option
+from multi.utils import write_json_file
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,25 @@ class SettingsFileMerger(VSCodeFileMerger):
 
     def _get_skip_keys(self, repo: Repository) -> List[str] | None:
         """Return the list of settings keys to skip during merge."""
-        return self.paths.settings["vscode"].get("skipSettings", [])
+        return self.session.settings["vscode"].get("skipSettings", [])
+
+    def _get_input_paths(self) -> List[Path]:
+        input_paths = super()._get_input_paths()
+        for repo in self.session.repos:
+            if not repo.skip_vscode:
+                input_paths.append(
+                    self.paths.get_vscode_config_dir(repo.path) / "settings.shared.json"
+                )
+        input_paths.append(self.paths.vscode_settings_shared_path)
+        return input_paths
+
+    def _get_input_state(self) -> Dict[str, Any]:
+        state = super()._get_input_state()
+        # Python repos are added to python.autoComplete.extraPaths
+        state["python_repos"] = [
+            repo.name for repo in self.session.repos if repo.is_python
+        ]
+        return state
 
     def _merge_repo_json(
         self,
@@ -40,8 +58,8 @@ class SettingsFileMerger(VSCodeFileMerger):
             self.paths.get_vscode_config_dir(repo.path) / "settings.json"
         )
         merged_with_shared = False
-        if shared_settings_path.exists():
-            shared_settings = soft_read_json_file(shared_settings_path)
+        if shared_settings_path in repo.index:
+            shared_settings = self._read_json(shared_settings_path)
             if shared_settings:
                 repo_json = deep_merge(shared_settings, repo_json, repo.name)
                 merged_with_shared = True
@@ -50,16 +68,15 @@ class SettingsFileMerger(VSCodeFileMerger):
                     f"settings.shared.json for {repo.name} exists but is empty or invalid, skipping merge."
                 )
         if merged_with_shared:
-            from multi.utils import write_json_file
-
             write_json_file(repo_settings_path, repo_json)
+            self.session.files.invalidate(repo_settings_path)
         return super()._merge_repo_json(merged_json, repo_json, repo)
 
     def _post_process_json(self, merged_json: Dict[str, Any]) -> Dict[str, Any]:
         # Merge in settings.shared.json
         shared_settings_path = self.paths.vscode_settings_shared_path
-        if shared_settings_path.exists():
-            shared_settings = soft_read_json_file(shared_settings_path)
+        if shared_settings_path in self.session.root_index:
+            shared_settings = self._read_json(shared_settings_path)
             merged_json = deep_merge(merged_json, shared_settings)
         else:
             logger.debug(
@@ -67,8 +84,9 @@ class SettingsFileMerger(VSCodeFileMerger):
             )
 
         # Add Python paths for autocomplete
-        repos = load_repos(self.paths)
-        python_paths_to_add = [repo.name for repo in repos if repo.is_python]
+        python_paths_to_add = [
+            repo.name for repo in self.session.repos if repo.is_python
+        ]
         if python_paths_to_add:
             logger.info("Adding Python paths for autocomplete")
             current_extra_paths = merged_json.setdefault(
@@ -81,14 +99,14 @@ class SettingsFileMerger(VSCodeFileMerger):
         return merged_json
 
 
-def merge_settings_json(root_dir: Path) -> None:
-    paths = Paths(root_dir)
-    merger = SettingsFileMerger(paths=paths)
+def merge_settings_json(root_dir: Path, force: bool = False) -> None:
+    merger = SettingsFileMerger(session=get_session(root_dir), force=force)
     merger.merge()
 
 
 @click.command(name="settings")
-def merge_settings_cmd():
+@force_option
+def merge_settings_cmd(force: bool):
     """Merge settings.json files from all repositories into the root .vscode directory.
 
     This command will:
@@ -97,4 +115,4 @@ def merge_settings_cmd():
     3. Configure Python autocomplete paths.
     """
     logger.info("Merging settings.json files from all repositories...")
-    merge_settings_json(root_dir=Path.cwd())
+    merge_settings_json(root_dir=Path.cwd(), force=force)
@@ -5,9 +5,9 @@ from typing import Any, Dict, List
 
 import click
 
-from multi.paths import Paths
 from multi.repos import Repository
-from multi.sync_vscode_helpers import VSCodeFileMerger
+from multi.session import get_session
+from multi.sync_vscode_helpers import VSCodeFileMerger, force_option
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +26,6 @@ def get_required_tasks(tasks_json: Dict[str, Any]) -> List[str]:
 
 
 class TasksFileMerger(VSCodeFileMerger):
-    def __init__(self, paths: Paths):
-        self.paths = paths
-
     def _get_destination_json_path(self) -> Path:
         return self.paths.vscode_tasks_path
 
@@ -74,13 +71,14 @@ class TasksFileMerger(VSCodeFileMerger):
         return merged_json
 
 
-def merge_tasks_json(root_dir: Path) -> None:
-    merger = TasksFileMerger(paths=Paths(root_dir))
+def merge_tasks_json(root_dir: Path, force: bool = False) -> None:
+    merger = TasksFileMerger(session=get_session(root_dir), force=force)
     merger.merge()
 
 
 @click.command(name="tasks")
-def merge_tasks_cmd():
+@force_option
+def merge_tasks_cmd(force: bool):
     """Merge tasks.json files from all repositories into the root .vscode directory.
 
     This command will:
@@ -90,4 +88,4 @@ def merge_tasks_cmd():
     4. Preserve existing tasks by renaming conflicts.
     """
     logger.info("Merging tasks.json files from all repositories...")
-    merge_tasks_json(root_dir=Path.cwd())
+    merge_tasks_json(root_dir=Path.cwd(), force=force)
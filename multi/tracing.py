@@ -0,0 +1,227 @@
+import contextlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import click
+
+from multi._version import __version__
+from multi.profiling import StageRecord, recording, stage
+
+logger = logging.getLogger(__name__)
+
+# Traces written to a path with this suffix use the OTLP JSON format, one
+# export request per line like the OpenTelemetry Collector's file exporter.
+# Any other path gets a Chrome trace.
+OTLP_SUFFIX = ".jsonl"
+
+# OTLP span kind and status codes
+_SPAN_KIND_INTERNAL = 1
+_STATUS_CODE_ERROR = 2
+
+
+def _thread_numbers(records: List[StageRecord]) -> Dict[int, int]:
+    """Small, stable thread numbers in the order threads first started a stage."""
+    numbers: Dict[int, int] = {}
+    for record in sorted(records, key=lambda record: record.start):
+        numbers.setdefault(record.thread_id, len(numbers) + 1)
+    return numbers
+
+
+def chrome_trace(
+    records: List[StageRecord], origin: float, process_name: str
+) -> Dict[str, Any]:
+    """Records as a Chrome trace (chrome://tracing, https://ui.perfetto.dev).
+
+    Each stage is a complete ("X") event, timed in µs from origin (a
+    time.perf_counter() value). A stage whose parent ran on another thread is
+    linked to it by a flow arrow, so work handed to the thread pool can be
+    followed back to the stage that started it.
+    """
+    pid = os.getpid()
+    tids = _thread_numbers(records)
+    by_id = {record.span_id: record for record in records}
+
+    def micros(seconds: float) -> float:
+        return round((seconds - origin) * 1_000_000, 3)
+
+    events: List[Dict[str, Any]] = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": 0,
+            "args": {"name": process_name},
+        }
+    ]
+    thread_names = {record.thread_id: record.thread_name for record in records}
+    for thread_id, tid in tids.items():
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": thread_names[thread_id]},
+            }
+        )
+
+    for record in sorted(records, key=lambda record: record.start):
+        args = {**record.attributes, "span_id": record.span_id}
+        if record.parent_id is not None:
+            args["parent_id"] = record.parent_id
+        if record.error:
+            args["error"] = record.error
+        tid = tids[record.thread_id]
+        events.append(
+            {
+                "name": record.name,
+                "cat": "multi",
+                "ph": "X",
+                "ts": micros(record.start),
+                "dur": round(record.duration * 1_000_000, 3),
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            }
+        )
+        parent = by_id.get(record.parent_id) if record.parent_id else None
+        if parent and parent.thread_id != record.thread_id:
+            flow = {"name": "task", "cat": "multi", "id": record.span_id, "pid": pid}
+            events.append(
+                {
+                    **flow,
+                    "ph": "s",
+                    "ts": micros(record.start),
+                    "tid": tids[parent.thread_id],
+                }
+            )
+            events.append(
+                {**flow, "ph": "f", "bp": "e", "ts": micros(record.start), "tid": tid}
+            )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # int64 values are strings in the protobuf JSON mapping
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _otlp_value(value)} for key, value in attributes.items()
+    ]
+
+
+def otlp_trace(
+    records: List[StageRecord], origin: float, origin_unix_ns: int
+) -> Dict[str, Any]:
+    """Records as an OTLP/JSON ExportTraceServiceRequest.
+
+    origin (a time.perf_counter() value) and origin_unix_ns are the same
+    instant, which converts the stages' monotonic times to Unix time.
+    """
+    trace_id = os.urandom(16).hex()
+
+    def unix_ns(seconds: float) -> str:
+        return str(origin_unix_ns + round((seconds - origin) * 1_000_000_000))
+
+    spans = []
+    for record in sorted(records, key=lambda record: record.start):
+        span: Dict[str, Any] = {
+            "traceId": trace_id,
+            "spanId": f"{record.span_id:016x}",
+            "name": record.name,
+            "kind": _SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": unix_ns(record.start),
+            "endTimeUnixNano": unix_ns(record.end),
+            "attributes": _otlp_attributes(
+                {**record.attributes, "thread.name": record.thread_name}
+            ),
+        }
+        if record.parent_id is not None:
+            span["parentSpanId"] = f"{record.parent_id:016x}"
+        if record.error:
+            span["status"] = {"code": _STATUS_CODE_ERROR, "message": record.error}
+        spans.append(span)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _otlp_attributes(
+                        {
+                            "service.name": "multi",
+                            "service.version": __version__,
+                            "process.pid": os.getpid(),
+                        }
+                    )
+                },
+                "scopeSpans": [{"scope": {"name": "multi"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def write_trace(
+    path: Path,
+    records: List[StageRecord],
+    origin: float,
+    origin_unix_ns: int,
+    process_name: str,
+) -> None:
+    """Write records to path, as OTLP JSON lines or a Chrome trace (see OTLP_SUFFIX).
+
+    OTLP traces are appended, so one file can collect several runs.
+    """
+    if path.suffix == OTLP_SUFFIX:
+        with path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(otlp_trace(records, origin, origin_unix_ns)) + "\n")
+    else:
+        path.write_text(
+            json.dumps(chrome_trace(records, origin, process_name)), encoding="utf-8"
+        )
+
+
+_tracing = False
+
+
+@contextlib.contextmanager
+def trace_command(path: Path | str, name: str) -> Iterator[None]:
+    """Record the block as a span called name, with every stage nested under it.
+
+    The spans are written to path when the block ends, even if it raised. Like
+    profile_command, nested uses only trace the outermost one.
+    """
+    global _tracing
+    if _tracing:
+        yield
+        return
+
+    path = Path(path)
+    _tracing = True
+    origin_unix_ns = time.time_ns()
+    origin = time.perf_counter()
+    try:
+        with recording() as recorder:
+            with stage(name):
+                yield
+    finally:
+        _tracing = False
+        try:
+            write_trace(path, recorder.records, origin, origin_unix_ns, name)
+        except OSError as e:
+            logger.error(f"Could not write trace to {path}: {e}")
+        else:
+            click.echo(
+                f"\nTrace of {len(recorder.records)} spans written to {path}", err=True
+            )
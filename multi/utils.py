@@ -1,75 +1,134 @@
 import json
 import logging
+import os
+import re
+import tempfile
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+from multi.profiling import count
 
 logger = logging.getLogger(__name__)
 
+# Read once at import, since os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_file_if_changed(path: Path, content: str | bytes) -> bool:
+    """Atomically replace path with content, unless it already holds exactly that.
+
+    The new content is written to a temporary file in the same directory,
+    fsynced and moved into place with os.replace, so readers (and file
+    watchers) only ever see the old file or the complete new one. The parent
+    directory is created if needed.
+
+    Returns:
+        True if the file was written, False if it was already up to date.
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    try:
+        if path.read_bytes() == data:
+            logger.debug(f"{path} is unchanged, not rewriting it")
+            return False
+        mode = path.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+
+    # We make sure the parent exists because in the tests we are destroying the root directory every time, so create=True is not enough.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_name, mode)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    count("files_written")
+    count("bytes_written", len(data))
+    return True
+
 
 def write_json_file(
     path: Path, data: Dict[str, Any], header_comment: str | None = None
-):
-    """Write a JSON file, creating the directory if it doesn't exist.
+) -> bool:
+    """Write a JSON file if its content changed, creating the directory if it doesn't exist.
 
     Args:
         path: The path to write the JSON file to.
         data: The data to write as JSON.
         header_comment: Optional comment to add at the top of the file (for JSONC files).
+
+    Returns:
+        True if the file was written, False if it already had this content.
+    """
+    content = json.dumps(data, indent=4)
+    if header_comment:
+        content = f"// {header_comment}\n{content}"
+    return write_file_if_changed(path, content)
+
+
+_JSONC_TOKEN_RE = re.compile(
+    r"""
+    (?P<string>"[^"\\]*(?:\\.[^"\\]*)*")
+    | (?P<line_comment>//[^\n]*)
+    | (?P<block_comment>/\*[^*]*\*+(?:[^/*][^*]*\*+)*/)
+    # A comma followed only by whitespace and comments before a closing bracket.
+    # The block comment form above cannot run past the first `*/`, so the
+    # lookahead never skips over real content.
+    | (?P<trailing_comma>,(?=(?:\s|//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/)*[\]}]))
+    """,
+    re.VERBOSE,
+)
+
+
+def _replace_jsonc_token(match: re.Match) -> str:
+    kind = match.lastgroup
+    if kind == "string":
+        return match.group()
+    if kind == "block_comment":
+        # Keep newlines so line numbers in parse errors match the original file
+        return "\n" * match.group().count("\n") or " "
+    return ""
+
+
+def strip_jsonc(text: str) -> str:
+    """Convert JSONC (JSON with comments, as used by VS Code) to plain JSON.
+
+    Removes `//` line comments, `/* */` block comments and trailing commas
+    before `]` or `}`, leaving string contents untouched. Runs in a single
+    linear pass over the text.
     """
+    return _JSONC_TOKEN_RE.sub(_replace_jsonc_token, text)
 
-    # We make sure the parent exists because in the tests we are destroying the root directory every time, so create=True is not enough.
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w") as f:
-        if header_comment:
-            f.write(f"// {header_comment}\n")
-        json.dump(data, f, indent=4)
+
+def soft_parse_json(text: str, path: Path) -> Dict[str, Any]:
+    """Parse the JSONC contents of path, returning an empty dict if they are invalid."""
+    try:
+        return json.loads(strip_jsonc(text))
+    except Exception as e:
+        logger.warning(f"Could not parse {path}: {str(e)}, skipping...")
+    return {}
 
 
 def soft_read_json_file(path: Path) -> Dict[str, Any]:
     """Load a JSON file if it exists, otherwise return an empty dict.
-    Handles comments by removing anything after // that's not in a string."""
-    if path.exists():
-        try:
-            with path.open("r") as f:
-                lines = []
-                for line in f:
-                    processed_line = ""
-                    in_string = False
-                    string_char = None  # Track whether we're in ' or " string
-                    i = 0
-                    while i < len(line):
-                        char = line[i]
-
-                        # Handle string boundaries
-                        if char in ['"', "'"] and (i == 0 or line[i - 1] != "\\"):
-                            if not in_string:
-                                in_string = True
-                                string_char = char
-                            elif (
-                                string_char == char
-                            ):  # Make sure we match the same quote type
-                                in_string = False
-                                string_char = None
-
-                        # Look for comments outside of strings
-                        if (
-                            not in_string
-                            and char == "/"
-                            and i + 1 < len(line)
-                            and line[i + 1] == "/"
-                        ):
-                            break
-
-                        processed_line += char
-                        i += 1
-
-                    lines.append(processed_line)
-
-                content = "".join(lines)
-                return json.loads(content)
-        except Exception as e:
-            logger.warning(f"Could not parse {path}: {str(e)}, skipping...")
-    return {}
+    Accepts JSONC: comments and trailing commas are removed before parsing."""
+    try:
+        with path.open("r") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Could not read {path}: {str(e)}, skipping...")
+        return {}
+    return soft_parse_json(text, path)
 
 
 def _is_list_default_convention(value: Any) -> bool:
@@ -80,6 +139,21 @@ def _is_list_default_convention(value: Any) -> bool:
     return isinstance(value, list) and len(value) == 1 and isinstance(value[0], dict)
 
 
+def _apply_defaults_to_list_items(target: List[Any], item_defaults: Any) -> List[Any]:
+    """Apply item_defaults to each dict in target, copying target only if one changes."""
+    result = None
+    for i, item in enumerate(target):
+        # Only apply defaults to items that are already dicts
+        if not isinstance(item, dict):
+            continue
+        new_item = apply_defaults_to_structure(item, item_defaults)
+        if new_item is not item:
+            if result is None:
+                result = target.copy()
+            result[i] = new_item
+    return target if result is None else result
+
+
 def apply_defaults_to_structure(target: Any, defaults_definition: Any) -> Any:
     """Apply defaults from defaults_definition to target structure.
 
@@ -88,7 +162,9 @@ def apply_defaults_to_structure(target: Any, defaults_definition: Any) -> Any:
         defaults_definition: The default values to apply
 
     Returns:
-        The target structure with defaults applied for missing keys
+        The target structure with defaults applied for missing keys. target is
+        never modified: containers are copied only along the paths where a
+        default was added, and returned unchanged otherwise.
     """
     # If defaults_definition is None, return target as-is
     if defaults_definition is None:
@@ -97,14 +173,7 @@ def apply_defaults_to_structure(target: Any, defaults_definition: Any) -> Any:
     # Handle the list default convention ([{"key": "value"}])
     if _is_list_default_convention(defaults_definition):
         if isinstance(target, list):
-            item_defaults = defaults_definition[0]
-            # Only apply defaults to items that are already dicts
-            return [
-                apply_defaults_to_structure(item, item_defaults)
-                if isinstance(item, dict)
-                else item
-                for item in target
-            ]
+            return _apply_defaults_to_list_items(target, defaults_definition[0])
         elif target is None:
             # Target is None, return empty list
             return []
@@ -119,14 +188,9 @@ def apply_defaults_to_structure(target: Any, defaults_definition: Any) -> Any:
         and "apply_to_list_items" in defaults_definition
     ):
         if isinstance(target, list):
-            item_defaults = defaults_definition["apply_to_list_items"]
-            # Only apply defaults to items that are already dicts
-            return [
-                apply_defaults_to_structure(item, item_defaults)
-                if isinstance(item, dict)
-                else item
-                for item in target
-            ]
+            return _apply_defaults_to_list_items(
+                target, defaults_definition["apply_to_list_items"]
+            )
         elif target is None:
             # Target is None, return empty list
             return []
@@ -137,18 +201,21 @@ def apply_defaults_to_structure(target: Any, defaults_definition: Any) -> Any:
     # If defaults_definition is a dict
     if isinstance(defaults_definition, dict):
         if isinstance(target, dict):
-            # Both are dicts, merge them
-            result = target.copy()
+            # Both are dicts, merge them. target is only copied once a value changes.
+            result = None
             for key, default_value in defaults_definition.items():
-                if key in result:
+                if key in target:
                     # Recursively apply defaults to the existing value
-                    result[key] = apply_defaults_to_structure(
-                        result[key], default_value
-                    )
+                    value = apply_defaults_to_structure(target[key], default_value)
+                    if value is target[key]:
+                        continue
                 else:
                     # Key doesn't exist in target, use the default
-                    result[key] = apply_defaults_to_structure(None, default_value)
-            return result
+                    value = apply_defaults_to_structure(None, default_value)
+                if result is None:
+                    result = target.copy()
+                result[key] = value
+            return target if result is None else result
         elif target is None:
             # Target is None, apply defaults to empty dict
             return apply_defaults_to_structure({}, defaults_definition)
@@ -0,0 +1,405 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from multi.fs_index import PYTHON_MARKER_FILES
+from multi.session import WorkspaceSession
+from multi.sync_claude import convert_cursor_rules_to_claude_md
+from multi.sync_ruff import sync_all_ruff_configs
+from multi.sync_vscode_extensions import ExtensionsFileMerger
+from multi.sync_vscode_helpers import VSCodeFileMerger, read_merge_inputs
+from multi.sync_vscode_launch import LaunchFileMerger
+from multi.sync_vscode_settings import SettingsFileMerger
+from multi.sync_vscode_tasks import TasksFileMerger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE_SECONDS = 0.3
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Which merger each watched .vscode file feeds, in the order they are run
+MERGERS: Dict[str, type[VSCodeFileMerger]] = {
+    "settings": SettingsFileMerger,
+    "launch": LaunchFileMerger,
+    "tasks": TasksFileMerger,
+    "extensions": ExtensionsFileMerger,
+}
+REPO_VSCODE_SOURCES = {
+    "settings.json": "settings",
+    "settings.shared.json": "settings",
+    "launch.json": "launch",
+    "tasks.json": "tasks",
+    "extensions.json": "extensions",
+}
+# In the root .vscode only the shared settings are a source, the rest is generated
+ROOT_VSCODE_SOURCES = {"settings.shared.json": "settings"}
+
+
+def watched_dirs(session: WorkspaceSession) -> List[Path]:
+    """Directories whose entries are watched, whether or not they exist yet."""
+    dirs = []
+    for base in [session.root_dir] + [repo.path for repo in session.repos]:
+        dirs += [base, base / ".vscode", base / ".cursor", base / ".cursor" / "rules"]
+    return dirs
+
+
+class WatchPlan(NamedTuple):
+    """The work needed to bring the generated files up to date after some changes."""
+
+    merger_kinds: List[str]
+    cursor_dirs: List[Path]
+    ruff: bool
+    # multi.json changed: everything is re-synced and the watched dirs rebuilt
+    reload: bool
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.merger_kinds or self.cursor_dirs or self.ruff or self.reload)
+
+
+def plan_changes(session: WorkspaceSession, changed: Iterable[Path]) -> WatchPlan:
+    """Map changed paths to the mergers and converters they affect."""
+    kinds: Set[str] = set()
+    cursor_dirs: Dict[Path, None] = {}
+    ruff = reload = False
+    repo_paths = [repo.path for repo in session.repos]
+
+    for path in changed:
+        if path == session.paths.multi_json_path:
+            reload = True
+            continue
+        base = next((p for p in repo_paths if path.is_relative_to(p)), None)
+        is_root = base is None
+        if is_root:
+            base = session.root_dir
+        try:
+            rel = path.relative_to(base)
+        except ValueError:
+            continue
+
+        parts = rel.parts
+        if len(parts) == 2 and parts[0] == ".vscode":
+            sources = ROOT_VSCODE_SOURCES if is_root else REPO_VSCODE_SOURCES
+            if parts[1] in sources:
+                kinds.add(sources[parts[1]])
+        elif parts[:2] == (".cursor", "rules") and path.suffix == ".mdc":
+            cursor_dirs[base / ".cursor"] = None
+        elif rel == Path("ruff.toml") and not is_root:
+            ruff = True
+        elif len(parts) == 1 and parts[0] in PYTHON_MARKER_FILES and not is_root:
+            # Whether a repo is a Python repo decides python.autoComplete.extraPaths
+            kinds.add("settings")
+
+    return WatchPlan(
+        merger_kinds=[kind for kind in MERGERS if kind in kinds],
+        cursor_dirs=list(cursor_dirs),
+        ruff=ruff,
+        reload=reload,
+    )
+
+
+def run_plan(session: WorkspaceSession, plan: WatchPlan) -> None:
+    """Run only the mergers and converters in plan."""
+    if plan.reload:
+        # Imported here since multi.sync imports this module for `sync --watch`
+        from multi.sync import sync_generated_files
+
+        sync_generated_files(session)
+        return
+
+    if plan.merger_kinds:
+        mergers = [MERGERS[kind](session=session) for kind in plan.merger_kinds]
+        read_merge_inputs(session, mergers)
+        for merger in mergers:
+            merger.merge()
+    for cursor_dir in plan.cursor_dirs:
+        convert_cursor_rules_to_claude_md(cursor_dir)
+    if plan.ruff:
+        sync_all_ruff_configs(session)
+
+
+class Watcher(ABC):
+    """Reports changes to the entries of a set of directories."""
+
+    name = ""
+
+    def __init__(self, dirs: Iterable[Path]):
+        self.dirs = list(dirs)
+
+    @abstractmethod
+    def wait(self, timeout: float | None) -> Set[Path]:
+        """Block until something changes or timeout passes; return the changed paths."""
+
+    def set_dirs(self, dirs: Iterable[Path]) -> None:
+        self.dirs = list(dirs)
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release the resources held by the watcher."""
+
+
+def _snapshot(dirs: Iterable[Path]) -> Dict[Path, Tuple[int, int, int]]:
+    entries = {}
+    for directory in dirs:
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries[Path(entry.path)] = (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                        stat.st_ino,
+                    )
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return entries
+
+
+class PollingWatcher(Watcher):
+    """Finds changes by comparing stat snapshots of the watched directories."""
+
+    name = "polling"
+
+    def __init__(self, dirs: Iterable[Path], interval: float = DEFAULT_POLL_INTERVAL):
+        super().__init__(dirs)
+        self.interval = interval
+        self._snapshot = _snapshot(self.dirs)
+
+    def set_dirs(self, dirs: Iterable[Path]) -> None:
+        super().set_dirs(dirs)
+        self._snapshot = _snapshot(self.dirs)
+
+    def wait(self, timeout: float | None) -> Set[Path]:
+        # Snapshots are compared before the first sleep, so wait(0) is a poll
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = _snapshot(self.dirs)
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(
+                self.interval if remaining is None else min(self.interval, remaining)
+            )
+
+    def close(self) -> None:
+        pass
+
+
+# From <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_WATCH_MASK = (
+    _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify() -> ctypes.CDLL | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
+
+
+class InotifyWatcher(Watcher):
+    """Receives change events from the Linux kernel through inotify.
+
+    Each watched directory that exists gets a watch. When a directory is created
+    or removed the watches are refreshed, and the entries of newly watched
+    directories are reported as changed, since they may have been written
+    before their watch was added. A queue overflow is reported as a change to
+    every watched directory.
+    """
+
+    name = "inotify"
+
+    def __init__(self, dirs: Iterable[Path], libc: ctypes.CDLL):
+        super().__init__(dirs)
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self._watches: Dict[int, Path] = {}
+        self._pending: Set[Path] = set()
+        self._refresh()
+        # Only directories that appear later may hold entries we have not seen
+        self._pending.clear()
+
+    def set_dirs(self, dirs: Iterable[Path]) -> None:
+        super().set_dirs(dirs)
+        for wd in list(self._watches):
+            self._libc.inotify_rm_watch(self._fd, wd)
+        self._watches.clear()
+        self._refresh()
+        self._pending.clear()
+
+    def _refresh(self) -> None:
+        """Add watches for watched directories that exist but are not watched yet."""
+        watched = set(self._watches.values())
+        for directory in self.dirs:
+            if directory in watched or not directory.is_dir():
+                continue
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), _IN_WATCH_MASK | _IN_ONLYDIR
+            )
+            if wd < 0:
+                logger.debug(f"Could not watch {directory}")
+                continue
+            self._watches[wd] = directory
+            self._pending.update(_snapshot([directory]))
+
+    def wait(self, timeout: float | None) -> Set[Path]:
+        if self._pending:
+            changed, self._pending = self._pending, set()
+            return changed
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: Set[Path] = set()
+        refresh = False
+        while True:
+            try:
+                buffer = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+                offset += _EVENT_HEADER.size
+                name = buffer[offset : offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & _IN_Q_OVERFLOW:
+                    logger.debug(
+                        "inotify queue overflowed, treating all dirs as changed"
+                    )
+                    changed.update(_snapshot(self.dirs))
+                    changed.update(self.dirs)
+                    continue
+                if mask & _IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    refresh = True
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                path = directory / os.fsdecode(name) if name else directory
+                changed.add(path)
+                if mask & _IN_ISDIR:
+                    refresh = True
+
+        if refresh:
+            self._refresh()
+            changed |= self._pending
+            self._pending = set()
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def create_watcher(
+    dirs: Iterable[Path], poll_interval: float = DEFAULT_POLL_INTERVAL
+) -> Watcher:
+    """An inotify watcher where available, otherwise a polling one."""
+    libc = _load_inotify()
+    if libc is not None:
+        try:
+            return InotifyWatcher(dirs, libc)
+        except OSError as e:
+            logger.debug(f"inotify is not available ({e}), falling back to polling")
+    return PollingWatcher(dirs, interval=poll_interval)
+
+
+def collect_changes(
+    watcher: Watcher, timeout: float | None, debounce: float = DEFAULT_DEBOUNCE_SECONDS
+) -> Set[Path]:
+    """Wait up to timeout for a change, then coalesce changes until it is quiet.
+
+    Changes keep being collected until none arrive for debounce seconds, so a
+    burst of saves (e.g. a branch checkout) comes back as one set.
+    """
+    changed = watcher.wait(timeout)
+    if not changed:
+        return changed
+    while True:
+        more = watcher.wait(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def watch_workspace(
+    root_dir: Path,
+    debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    stop: threading.Event | None = None,
+) -> None:
+    """Re-run the affected mergers and converters whenever a source file changes.
+
+    Runs until interrupted (or until stop is set). Each batch of changes is
+    handled with a fresh session, so nothing read earlier is reused.
+    """
+    session = WorkspaceSession(root_dir)
+    watcher = create_watcher(watched_dirs(session), poll_interval=poll_interval)
+    logger.info(
+        f"👀 Watching {len(session.repos)} repositories for changes ({watcher.name}). "
+        "Press Ctrl+C to stop."
+    )
+    try:
+        while stop is None or not stop.is_set():
+            changed = collect_changes(watcher, timeout=0.5, debounce=debounce)
+            if not changed:
+                continue
+
+            session = WorkspaceSession(root_dir)
+            plan = plan_changes(session, changed)
+            if plan.is_empty:
+                continue
+            logger.debug(f"{len(changed)} changed paths: {plan}")
+            try:
+                run_plan(session, plan)
+                if plan.reload:
+                    watcher.set_dirs(watched_dirs(session))
+            except Exception as e:
+                # Keep watching, the next save may fix whatever went wrong
+                logger.error(f"Sync after changes failed: {e}")
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+    finally:
+        watcher.close()
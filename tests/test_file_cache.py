@@ -0,0 +1,73 @@
+import collections
+import json
+from pathlib import Path
+
+from multi import file_cache
+from multi.file_cache import FileCache
+from multi.session import WorkspaceSession
+from multi.sync_vscode import merge_vscode_configs
+
+
+def test_file_cache_reads_once_until_invalidated(tmp_path, monkeypatch):
+    """Test that cached contents are reused until the file is invalidated."""
+    path = tmp_path / "settings.json"
+    path.write_text('{"a": 1, // comment\n}')
+    missing = tmp_path / "missing.json"
+    cache = FileCache()
+
+    cache.preload([path, missing, path])
+    path.write_text('{"a": 2}')
+    assert cache.read_json(path) == {"a": 1}
+    assert cache.read_bytes(missing) is None
+    assert cache.read_json(missing) == {}
+
+    # Every read_json returns a new object
+    first = cache.read_json(path)
+    first["a"] = 3
+    assert cache.read_json(path) == {"a": 1}
+
+    nested = tmp_path / "launch.json"
+    nested.write_text('{"configurations": [{"name": "a"}]}')
+    parses = collections.Counter()
+    original_parse = file_cache.soft_parse_json
+
+    def counting_parse(text, path):
+        parses[path] += 1
+        return original_parse(text, path)
+
+    monkeypatch.setattr(file_cache, "soft_parse_json", counting_parse)
+    cache.read_json(nested)["configurations"][0]["name"] = "b"
+    cache.read_json(nested)["configurations"].append({})
+    assert cache.read_json(nested) == {"configurations": [{"name": "a"}]}
+    assert parses[nested] == 1
+
+    cache.invalidate(path)
+    assert cache.read_json(path) == {"a": 2}
+
+
+def test_merge_vscode_configs_reads_each_file_once(setup_git_repos, monkeypatch):
+    """Test that the four mergers share one read of every source file."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    for repo_path in sub_repo_dirs:
+        vscode_dir = repo_path / ".vscode"
+        vscode_dir.mkdir(exist_ok=True)
+        for name in ("settings", "launch", "tasks", "extensions"):
+            (vscode_dir / f"{name}.json").write_text(json.dumps({}))
+
+    reads = collections.Counter()
+    original_read_bytes = Path.read_bytes
+
+    def counting_read_bytes(self):
+        reads[self] += 1
+        return original_read_bytes(self)
+
+    monkeypatch.setattr(Path, "read_bytes", counting_read_bytes)
+
+    merge_vscode_configs(WorkspaceSession(root_repo_path))
+
+    sources = [
+        repo_path / ".vscode" / f"{name}.json"
+        for repo_path in sub_repo_dirs
+        for name in ("settings", "launch", "tasks", "extensions")
+    ]
+    assert [reads[path] for path in sources] == [1] * len(sources)
@@ -0,0 +1,37 @@
+from multi.fs_index import RepoIndex
+
+
+def test_repo_index_records_relevant_files(tmp_path):
+    """Test that a single scan records markers, .vscode JSON and cursor rules."""
+    (tmp_path / "pyproject.toml").write_text("")
+    (tmp_path / "ruff.toml").write_text("")
+    (tmp_path / "unrelated.txt").write_text("")
+    (tmp_path / ".vscode").mkdir()
+    (tmp_path / ".vscode" / "settings.json").write_text("{}")
+    (tmp_path / ".vscode" / "notes.md").write_text("")
+    (tmp_path / ".cursor" / "rules").mkdir(parents=True)
+    (tmp_path / ".cursor" / "rules" / "a.mdc").write_text("")
+    (tmp_path / ".cursor" / "rules" / "b.txt").write_text("")
+
+    index = RepoIndex.scan(tmp_path)
+
+    assert index.exists
+    assert index.is_python
+    assert tmp_path / "ruff.toml" in index
+    assert "unrelated.txt" not in index
+    assert tmp_path / ".vscode" / "settings.json" in index
+    assert ".vscode/notes.md" not in index
+    assert ".vscode/launch.json" not in index
+    assert index.stat(".vscode/settings.json").st_size == 2
+    assert index.files_in(".cursor/rules") == [tmp_path / ".cursor" / "rules" / "a.mdc"]
+    # Paths outside the repository are never in the index
+    assert tmp_path.parent / "ruff.toml" not in index
+
+
+def test_repo_index_for_missing_directory(tmp_path):
+    """Test that scanning a directory that does not exist yields an empty index."""
+    index = RepoIndex.scan(tmp_path / "missing")
+
+    assert not index.exists
+    assert not index.is_python
+    assert index.files_in(".cursor/rules") == []
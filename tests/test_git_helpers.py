@@ -1,10 +1,15 @@
+import git
+import pytest
+
+from multi.errors import RepoNotCleanError
 from multi.git_helpers import (
     check_all_on_same_branch,
-    check_all_repos_are_clean,
     check_branch_existence,
     check_repo_is_clean,
     get_current_branch,
+    get_dirty_files,
     is_git_repo_root,
+    read_head_branch,
 )
 from multi.paths import Paths
 
@@ -36,6 +41,31 @@ def test_get_current_branch(setup_git_repos):
         assert get_current_branch(sub_repo) == "main"
 
 
+def test_read_head_branch_detached_and_worktree(setup_git_repos, tmp_path):
+    """Test reading HEAD directly for detached HEADs and linked worktrees."""
+    root_repo, sub_repos = setup_git_repos
+    repo = git.Repo(sub_repos[0])
+
+    assert read_head_branch(sub_repos[0]) == "main"
+
+    # Detached HEAD
+    repo.git.checkout(repo.head.commit.hexsha)
+    assert read_head_branch(sub_repos[0]) == "HEAD"
+    assert get_current_branch(sub_repos[0]) == "HEAD"
+    repo.git.checkout("main")
+    assert read_head_branch(sub_repos[0]) == "main"
+
+    # A linked worktree has a .git file with a gitdir: pointer
+    worktree_path = tmp_path / "worktree"
+    repo.git.worktree("add", "-b", "feature/worktree", str(worktree_path))
+    assert (worktree_path / ".git").is_file()
+    assert read_head_branch(worktree_path) == "feature/worktree"
+    assert get_current_branch(worktree_path) == "feature/worktree"
+
+    # Directories that are not repositories are left to the GitPython fallback
+    assert read_head_branch(tmp_path) is None
+
+
 def test_check_all_on_same_branch(setup_git_repos):
     """Test check_all_on_same_branch validates all repos are on the same branch."""
     root_repo, _ = setup_git_repos
@@ -59,15 +89,6 @@ def test_check_repo_is_clean(setup_git_repos):
     assert check_repo_is_clean(sub_repos[0], raise_error=False) is False
 
 
-def test_check_all_repos_are_clean(setup_git_repos):
-    """Test check_all_repos_are_clean validates all repos are clean."""
-    root_repo, _ = setup_git_repos
-    paths = Paths(root_repo)
-
-    # All repos should be clean after setup
-    assert check_all_repos_are_clean(paths) is True
-
-
 def test_check_branch_existence(setup_git_repos_with_remotes):
     """Test check_branch_existence correctly detects local and remote branches."""
     root_repo, _ = setup_git_repos_with_remotes
@@ -83,3 +104,82 @@ def test_check_branch_existence(setup_git_repos_with_remotes):
     )
     assert exists_locally is False
     assert exists_remotely is False
+
+
+def test_get_dirty_files(setup_git_repos):
+    """Test that get_dirty_files reports modified, staged, renamed and new files."""
+    _, sub_repos = setup_git_repos
+    repo_path = sub_repos[0]
+    repo = git.Repo(repo_path)
+    assert get_dirty_files(repo_path) == ([], False)
+
+    (repo_path / "README.md").write_text("modified")
+    (repo_path / "new file.txt").write_text("untracked")
+    (repo_path / "staged.txt").write_text("staged")
+    repo.index.add(["staged.txt"])
+    assert sorted(get_dirty_files(repo_path)[0]) == [
+        "README.md",
+        "new file.txt",
+        "staged.txt",
+    ]
+
+    # Renames are reported once, under the new name
+    repo.git.checkout("--", "README.md")
+    repo.git.mv("README.md", "MOVED.md")
+    assert "MOVED.md" in get_dirty_files(repo_path)[0]
+    assert "README.md" not in get_dirty_files(repo_path)[0]
+
+
+def test_get_dirty_files_stops_at_limit(setup_git_repos):
+    """Test that only up to `limit` dirty files are reported."""
+    root_repo, sub_repos = setup_git_repos
+    for i in range(50):
+        (sub_repos[0] / f"untracked{i}.txt").write_text("x")
+
+    dirty_files, truncated = get_dirty_files(sub_repos[0], limit=1)
+    assert len(dirty_files) == 1 and truncated
+    dirty_files, truncated = get_dirty_files(sub_repos[0], limit=5)
+    assert len(dirty_files) == 5 and truncated
+
+
+def test_exactly_limit_dirty_files_are_not_truncated(setup_git_repos):
+    """Test that "..." is only added when there are more dirty files than shown."""
+    _, sub_repos = setup_git_repos
+    for i in range(3):
+        (sub_repos[0] / f"untracked{i}.txt").write_text("x")
+
+    dirty_files, truncated = get_dirty_files(sub_repos[0], limit=3)
+    assert len(dirty_files) == 3 and not truncated
+    with pytest.raises(RepoNotCleanError) as excinfo:
+        check_repo_is_clean(sub_repos[0], dirty_files_limit=3)
+    assert not str(excinfo.value).endswith("...")
+
+    (sub_repos[0] / "untracked3.txt").write_text("x")
+    with pytest.raises(RepoNotCleanError, match=r", \.\.\.$"):
+        check_repo_is_clean(sub_repos[0], dirty_files_limit=3)
+
+
+def test_check_branch_existence_packed_refs_and_other_remote(
+    setup_git_repos_with_remotes,
+):
+    """Test branch lookup for packed refs and remotes other than origin."""
+    root_repo, _ = setup_git_repos_with_remotes
+    repo = git.Repo(root_repo)
+    repo.create_head("feature/packed")
+    repo.git.pack_refs("--all")
+    assert not (root_repo / ".git" / "refs" / "heads" / "feature" / "packed").exists()
+
+    assert check_branch_existence(root_repo, "feature/packed") == (True, False)
+    assert check_branch_existence(root_repo, "feature") == (False, False)
+
+    # A second remote pointing at the same bare repository
+    repo.create_remote("upstream", repo.remotes.origin.url)
+    repo.remotes.upstream.fetch()
+    assert check_branch_existence(root_repo, "main", remote="upstream") == (
+        True,
+        True,
+    )
+    assert check_branch_existence(root_repo, "main", remote="missing") == (
+        True,
+        False,
+    )
@@ -0,0 +1,183 @@
+import collections
+import logging
+import signal
+import subprocess
+import tracemalloc
+
+import click
+import git
+import pytest
+
+from multi.errors import GitError
+from multi.git_run import (
+    MAX_LINE_LENGTH,
+    GitOutput,
+    forward_stream,
+    get_pager,
+    run_git_command,
+    run_git_in_all_repos,
+)
+from multi.session import WorkspaceSession
+
+
+class _Lines:
+    """A GitOutput stand-in that keeps what is written, up to a number of lines."""
+
+    def __init__(self, limit=None):
+        self.lines = []
+        self.limit = limit
+
+    def write(self, line, err=False):
+        if self.limit is not None and len(self.lines) >= self.limit:
+            return False
+        self.lines.append(line)
+        return True
+
+
+class _ChunkedStream:
+    """A binary stream whose read1() returns the given chunks one by one."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read1(self, size):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+def test_run_git_in_all_repos_prefixes_output(setup_git_repos, capsys):
+    """Test that output from every repo is streamed with the repo name prefix."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    session = WorkspaceSession(root_repo_path)
+
+    run_git_in_all_repos(session, ["rev-parse", "--abbrev-ref", "HEAD"], jobs=3)
+
+    lines = click.unstyle(capsys.readouterr().out).splitlines()
+    names = [root_repo_path.name] + [sub_dir.name for sub_dir in sub_repo_dirs]
+    assert sorted(line.split("|")[0].strip() for line in lines) == sorted(names)
+    assert all(line.split("|")[1].strip() == "main" for line in lines)
+
+
+def test_run_git_in_all_repos_reports_failures(setup_git_repos, capsys, caplog):
+    """Test that failures are aggregated and stderr is forwarded with a prefix."""
+    root_repo_path, _ = setup_git_repos
+    session = WorkspaceSession(root_repo_path)
+
+    with caplog.at_level(logging.ERROR, logger="multi.git_run"):
+        with pytest.raises(GitError, match="failed in 3 of 3 repositories"):
+            run_git_in_all_repos(session, ["rev-parse", "--verify", "missing"], jobs=2)
+
+    err_lines = click.unstyle(capsys.readouterr().err).splitlines()
+    assert any(line.startswith("repo0 ") for line in err_lines)
+    # Each repository's failure is logged with the end of its stderr
+    assert any(
+        record.getMessage().startswith("repo0: ")
+        and "fatal: Needed a single revision" in record.getMessage()
+        for record in caplog.records
+    )
+
+
+def test_run_git_in_all_repos_fail_fast(setup_git_repos):
+    """Test that fail_fast stops starting repositories after the first failure."""
+    root_repo_path, _ = setup_git_repos
+    session = WorkspaceSession(root_repo_path)
+
+    with pytest.raises(
+        GitError, match=r"failed in 1 of 3 repositories: root \(2 skipped\)"
+    ):
+        run_git_in_all_repos(
+            session, ["rev-parse", "--verify", "missing"], jobs=1, fail_fast=True
+        )
+
+
+def test_forward_stream_splits_lines_with_bounded_memory():
+    """Test line splitting across chunks, and that huge lines are cut up."""
+    output = _Lines()
+    tail = collections.deque(maxlen=2)
+    # "é" is split across two reads
+    chunks = [b"first\r\nsecond caf\xc3", b"\xa9\nthird", b" and last"]
+
+    assert forward_stream(_ChunkedStream(chunks), "> ", output, tail=tail)
+    assert output.lines == ["> first", "> second café", "> third and last"]
+    assert list(tail) == ["second café", "third and last"]
+
+    size = 20 * MAX_LINE_LENGTH
+    chunks = [b"x" * 4096] * (size // 4096)
+    output = _Lines()
+    tracemalloc.start()
+    try:
+        forward_stream(_ChunkedStream(chunks), "", output)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert [len(line) for line in output.lines] == [MAX_LINE_LENGTH] * 20
+    # The forwarded lines themselves account for most of the peak
+    assert peak < size + 4 * MAX_LINE_LENGTH
+
+
+def test_forward_stream_stops_when_output_closes():
+    """Test that forwarding stops as soon as the output stops accepting lines."""
+    stream = _ChunkedStream(b"line %d\n" % i for i in range(1000))
+
+    assert not forward_stream(stream, "", _Lines(limit=3))
+    assert len(stream.chunks) == 996
+
+
+def test_get_pager(monkeypatch):
+    """Test that output is paged like git would page it."""
+    monkeypatch.delenv("GIT_PAGER", raising=False)
+    monkeypatch.setenv("PAGER", "more")
+
+    assert get_pager(["log"], None, stdout_isatty=True) == "more"
+    assert get_pager(["log"], None, stdout_isatty=False) is None
+    assert get_pager(["log"], False, stdout_isatty=True) is None
+    assert get_pager(["pull"], None, stdout_isatty=True) is None
+    assert get_pager(["pull"], True, stdout_isatty=True) == "more"
+    monkeypatch.setenv("GIT_PAGER", "cat")
+    assert get_pager(["log"], True, stdout_isatty=True) is None
+
+
+def test_run_git_in_all_repos_with_pager(setup_git_repos, tmp_path):
+    """Test that every repository's output goes through the pager."""
+    root_repo_path, _ = setup_git_repos
+    paged = tmp_path / "paged.txt"
+
+    run_git_in_all_repos(
+        WorkspaceSession(root_repo_path),
+        ["rev-parse", "--abbrev-ref", "HEAD"],
+        pager=f"cat > '{paged}'",
+    )
+
+    lines = click.unstyle(paged.read_text()).splitlines()
+    assert sorted(line.split("|")[0].strip() for line in lines) == sorted(
+        [root_repo_path.name, "repo0", "repo1"]
+    )
+
+
+def test_quitting_the_pager_stops_git(setup_git_repos, monkeypatch, capsys, caplog):
+    """Test that nothing more is run or reported once the pager has exited."""
+    root_repo_path, _ = setup_git_repos
+    (root_repo_path / "big.txt").write_text("line\n" * 2_000_000)
+    git.Repo(root_repo_path).index.add(["big.txt"])
+    git_processes = []
+    popen = subprocess.Popen
+
+    def record_popen(args, **kwargs):
+        process = popen(args, **kwargs)
+        if args[0] == "git":
+            git_processes.append(process)
+        return process
+
+    monkeypatch.setattr(subprocess, "Popen", record_popen)
+    output = GitOutput("head -n 1 > /dev/null")
+
+    # git is killed once the pager has gone, and that is not a failure
+    run_git_command(root_repo_path, ["show", ":big.txt"], output=output)
+    assert output.closed
+    assert [process.returncode for process in git_processes] == [-signal.SIGKILL]
+
+    # Later commands are not started, so their failures are not reported either
+    run_git_command(root_repo_path, ["rev-parse", "--verify", "missing"], output=output)
+    output.close()
+    assert len(git_processes) == 1
+    assert capsys.readouterr().err == ""
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
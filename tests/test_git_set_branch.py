@@ -1,7 +1,9 @@
 import git
 import pytest
+from click.testing import CliRunner
 
-from multi.errors import RepoNotCleanError
+from multi.cli import main
+from multi.errors import GitError, RepoNotCleanError
 from multi.git_set_branch import set_branch_in_all_repos
 
 
@@ -64,6 +66,21 @@ def test_set_branch_with_uncommitted_changes(setup_git_repos):
     )  # or "master" depending on git version
 
 
+def test_set_branch_max_dirty_files(setup_git_repos, monkeypatch):
+    """Test that --max-dirty-files caps the files listed for a dirty repository."""
+    root_repo_path, _ = setup_git_repos
+    for i in range(5):
+        (root_repo_path / f"untracked{i}.txt").write_text("uncommitted change")
+    monkeypatch.chdir(root_repo_path)
+
+    result = CliRunner().invoke(
+        main, ["set-branch", "--max-dirty-files", "2", "feature/new-branch"]
+    )
+
+    assert result.exit_code == 1
+    assert "Changed: untracked0.txt, untracked1.txt, ...\n" in result.output
+
+
 def test_set_branch_with_remote_branch(setup_git_repos_with_remotes):
     """Test switching to a branch that exists only on remote."""
     root_repo_path, sub_repo_paths = setup_git_repos_with_remotes
@@ -83,3 +100,51 @@ def test_set_branch_with_remote_branch(setup_git_repos_with_remotes):
 
     # Verify we're on the branch
     assert root_repo.active_branch.name == branch_name
+
+
+def test_set_branch_with_branch_on_another_remote(
+    setup_git_repos_with_remotes, tmp_path, monkeypatch
+):
+    """Test --remote for a branch that only exists on a remote not called origin."""
+    root_repo_path, _ = setup_git_repos_with_remotes
+    branch_name = "feature/upstream-branch"
+    root_repo = git.Repo(root_repo_path)
+    upstream_path = tmp_path / "upstream.git"
+    git.Repo.init(upstream_path, bare=True)
+    upstream = root_repo.create_remote("upstream", str(upstream_path))
+    root_repo.create_head(branch_name)
+    upstream.push(refspec=f"{branch_name}:{branch_name}")
+    root_repo.delete_head(branch_name, force=True)
+    upstream.fetch()
+    monkeypatch.chdir(root_repo_path)
+
+    result = CliRunner().invoke(
+        main,
+        ["set-branch", "--remote", "upstream", branch_name],
+        catch_exceptions=False,
+    )
+
+    assert result.exit_code == 0, result.output
+    assert root_repo.active_branch.name == branch_name
+    assert root_repo.active_branch.tracking_branch().name == f"upstream/{branch_name}"
+
+
+def test_set_branch_validates_plan_before_switching(setup_git_repos):
+    """Test that nothing is switched if any repository fails validation."""
+    root_repo_path, sub_repo_paths = setup_git_repos
+    branch_name = "feature/only-in-root"
+
+    # Put repo0 on a different branch so there is no common base branch
+    sub_repo = git.Repo(sub_repo_paths[0])
+    sub_repo.create_head("other").checkout()
+
+    # The branch exists in the root repo but not in the sub-repos
+    root_repo = git.Repo(root_repo_path)
+    root_repo.create_head(branch_name)
+
+    with pytest.raises(GitError, match="does not exist"):
+        set_branch_in_all_repos(root_dir=root_repo_path, branch_name=branch_name)
+
+    # The root repo could have switched, but the plan was rejected as a whole
+    assert root_repo.active_branch.name == "main"
+    assert sub_repo.active_branch.name == "other"
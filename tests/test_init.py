@@ -0,0 +1,31 @@
+import json
+
+import git
+from click.testing import CliRunner
+
+from multi.cli import main
+
+
+def test_init_creates_and_syncs_workspace(
+    setup_git_repos_with_remotes, tmp_path, monkeypatch
+):
+    """Test the interactive init flow end to end with file:// remotes."""
+    _, sub_repo_dirs = setup_git_repos_with_remotes
+    remotes_root = sub_repo_dirs[0].parent.parent / "remotes"
+    urls = [(remotes_root / f"{d.name}.git").as_uri() for d in sub_repo_dirs]
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.chdir(workspace)
+
+    answers = [urls[0], "The first repo", urls[1], "The second repo", ""]
+    result = CliRunner().invoke(main, ["init"], input="\n".join(answers) + "\n")
+
+    assert result.exit_code == 0, result.output
+    assert json.loads((workspace / "multi.json").read_text()) == {
+        "repos": [{"url": url} for url in urls]
+    }
+    assert "`repo0`: The first repo" in (workspace / "CLAUDE.md").read_text()
+    assert f"# {workspace.name}" in (workspace / "README.md").read_text()
+    for url in urls:
+        assert (workspace / url.split("/")[-1] / "README.md").exists()
+    assert not git.Repo(workspace).is_dirty(untracked_files=True)
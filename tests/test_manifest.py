@@ -0,0 +1,110 @@
+import json
+
+from multi.file_cache import FileCache
+from multi.session import WorkspaceSession
+from multi.sync_vscode import merge_vscode_configs
+from multi.sync_vscode_settings import SettingsFileMerger, merge_settings_json
+from multi.utils import soft_read_json_file
+
+
+def _count_merges(monkeypatch):
+    """Count the repo JSON files parsed by any merger."""
+    calls = []
+    original = FileCache.read_json
+
+    def counting_read(self, path):
+        calls.append(path)
+        return original(self, path)
+
+    monkeypatch.setattr(FileCache, "read_json", counting_read)
+    return calls
+
+
+def test_merge_is_skipped_when_inputs_are_unchanged(setup_git_repos, monkeypatch):
+    """Test that a second merge with the same inputs does not re-merge."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    repo0_vscode = sub_repo_dirs[0] / ".vscode"
+    repo0_vscode.mkdir(exist_ok=True)
+    (repo0_vscode / "settings.json").write_text(json.dumps({"editor.tabSize": 2}))
+    (repo0_vscode / "extensions.json").write_text(
+        json.dumps({"recommendations": ["ms-python.python"]})
+    )
+    reads = _count_merges(monkeypatch)
+
+    merge_vscode_configs(WorkspaceSession(root_repo_path))
+    assert reads
+    manifest_path = root_repo_path / ".vscode" / ".multi-manifest.json"
+    assert set(soft_read_json_file(manifest_path)["files"]) == {
+        "settings.json",
+        "launch.json",
+        "tasks.json",
+        "extensions.json",
+    }
+
+    reads.clear()
+    merge_vscode_configs(WorkspaceSession(root_repo_path))
+    assert reads == []
+
+    # --force merges regardless of the manifest, but identical output is not rewritten
+    merged_path = root_repo_path / ".vscode" / "settings.json"
+    inode = merged_path.stat().st_ino
+    merge_vscode_configs(WorkspaceSession(root_repo_path), force=True)
+    assert reads
+    assert merged_path.stat().st_ino == inode
+
+
+def test_merge_reruns_when_an_input_changes(setup_git_repos):
+    """Test that changing a source, multi.json or the output triggers a merge."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    repo1_vscode = sub_repo_dirs[1] / ".vscode"
+    repo1_vscode.mkdir(exist_ok=True)
+    repo1_settings = repo1_vscode / "settings.json"
+    repo1_settings.write_text(json.dumps({"editor.tabSize": 2}))
+    merged_path = root_repo_path / ".vscode" / "settings.json"
+
+    merge_settings_json(root_repo_path)
+    assert soft_read_json_file(merged_path)["editor.tabSize"] == 2
+
+    # A changed source file
+    repo1_settings.write_text(json.dumps({"editor.tabSize": 4}))
+    merge_settings_json(root_repo_path)
+    assert soft_read_json_file(merged_path)["editor.tabSize"] == 4
+
+    # A new root settings.shared.json
+    (root_repo_path / ".vscode" / "settings.shared.json").write_text(
+        json.dumps({"editor.rulers": [100]})
+    )
+    merge_settings_json(root_repo_path)
+    assert soft_read_json_file(merged_path)["editor.rulers"] == [100]
+
+    # A new skip list in multi.json
+    multi_json_path = root_repo_path / "multi.json"
+    multi_json = json.loads(multi_json_path.read_text())
+    multi_json["vscode"] = {"skipSettings": ["editor.tabSize"]}
+    multi_json_path.write_text(json.dumps(multi_json))
+    merge_settings_json(root_repo_path)
+    assert "editor.tabSize" not in soft_read_json_file(merged_path)
+
+    # A hand-edited output is regenerated
+    merged_path.write_text("{}")
+    merge_settings_json(root_repo_path)
+    assert soft_read_json_file(merged_path)["editor.rulers"] == [100]
+
+
+def test_repo_shared_settings_do_not_defeat_the_manifest(setup_git_repos):
+    """Test that rewriting a repo's settings.json during a merge is recorded."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    repo0_vscode = sub_repo_dirs[0] / ".vscode"
+    repo0_vscode.mkdir(exist_ok=True)
+    (repo0_vscode / "settings.json").write_text(json.dumps({"editor.tabSize": 2}))
+    (repo0_vscode / "settings.shared.json").write_text(
+        json.dumps({"files.trimTrailingWhitespace": True})
+    )
+    session = WorkspaceSession(root_repo_path)
+    merge_settings_json(root_repo_path)
+
+    manifest = WorkspaceSession(root_repo_path).manifest
+    merger = SettingsFileMerger(session=session)
+    assert manifest.is_up_to_date(
+        session.paths.vscode_settings_path, merger._get_inputs_digest()
+    )
@@ -0,0 +1,159 @@
+import io
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from multi.cli import main
+from multi.metrics import (
+    METRICS_ENV_VAR,
+    collect_samples,
+    metrics_textfile,
+    parse_textfile,
+    update_textfile,
+)
+from multi.profiling import recording, stage
+from multi.serve import write_message
+from multi.session import WorkspaceSession
+
+
+def test_textfile_accumulates_runs(tmp_path):
+    """Test that counters and histograms add up across runs and gauges are replaced."""
+    with recording() as recorder:
+        with stage("merge settings.json", merger="settings.json"):
+            pass
+        with stage("git status", repo="repo0", git="status"):
+            pass
+    path = tmp_path / "multi.prom"
+
+    for finished_at in (1000.0, 2000.0):
+        samples = collect_samples(
+            "multi sync",
+            recorder.records,
+            {("bytes_written", ()): 512, ("cache_hits", (("cache", "files"),)): 3},
+            duration=0.3,
+            failed=False,
+            finished_at=finished_at,
+        )
+        update_textfile(path, samples)
+
+    text = path.read_text()
+    assert "# TYPE multi_command_duration_seconds histogram" in text
+    samples = parse_textfile(text)
+    command = (("command", "multi sync"),)
+    assert samples[("multi_commands_total", command + (("result", "success"),))] == 2
+    assert samples[("multi_command_duration_seconds_count", command)] == 2
+    assert (
+        samples[("multi_command_duration_seconds_bucket", command + (("le", "0.25"),))]
+        == 0
+    )
+    assert (
+        samples[("multi_command_duration_seconds_bucket", command + (("le", "0.5"),))]
+        == 2
+    )
+    assert samples[("multi_last_run_timestamp_seconds", command)] == 2000
+    assert samples[("multi_bytes_written_total", command)] == 1024
+    assert samples[("multi_cache_hits_total", command + (("cache", "files"),))] == 6
+    assert samples[("multi_repos_processed_total", command)] == 2
+    git = command + (("subcommand", "status"),)
+    assert samples[("multi_git_subprocesses_total", git)] == 2
+    merge = command + (("file", "settings.json"),)
+    assert samples[("multi_merge_duration_seconds_count", merge)] == 2
+
+
+def test_metrics_textfile_configuration(tmp_path, monkeypatch):
+    """Test the multi.json setting and the environment variable that overrides it."""
+    monkeypatch.delenv(METRICS_ENV_VAR, raising=False)
+    multi_json = tmp_path / "multi.json"
+    multi_json.write_text(json.dumps({"repos": []}))
+    assert metrics_textfile(WorkspaceSession(tmp_path)) is None
+
+    multi_json.write_text(
+        json.dumps({"repos": [], "metrics": {"textfile": "metrics/multi.prom"}})
+    )
+    assert metrics_textfile(WorkspaceSession(tmp_path)) == (
+        tmp_path.resolve() / "metrics" / "multi.prom"
+    )
+
+    monkeypatch.setenv(METRICS_ENV_VAR, "")
+    assert metrics_textfile(WorkspaceSession(tmp_path)) is None
+    monkeypatch.setenv(METRICS_ENV_VAR, str(tmp_path / "env.prom"))
+    assert metrics_textfile(WorkspaceSession(tmp_path)) == tmp_path / "env.prom"
+
+
+def test_commands_write_metrics(setup_git_repos, tmp_path, monkeypatch):
+    """Test that each command, but not the group running it, is counted."""
+    root_repo_path, _ = setup_git_repos
+    monkeypatch.chdir(root_repo_path)
+    path = tmp_path / "multi.prom"
+    monkeypatch.setenv(METRICS_ENV_VAR, str(path))
+
+    for args in (["sync"], ["sync", "vscode"], ["git", "status"]):
+        result = CliRunner().invoke(main, args)
+        assert result.exit_code == 0, result.output
+
+    samples = parse_textfile(path.read_text())
+    commands = {
+        dict(labels)["command"]
+        for name, labels in samples
+        if name == "multi_commands_total"
+    }
+    assert commands == {"multi sync", "multi sync vscode", "multi git"}
+    git = (("command", "multi git"), ("subcommand", "status"))
+    assert samples[("multi_git_subprocesses_total", git)] == 3
+
+
+def test_serve_writes_metrics_per_request(setup_git_repos, tmp_path, monkeypatch):
+    """Test that each request to the server is counted, but not the server itself."""
+    root_repo_path, _ = setup_git_repos
+    monkeypatch.chdir(root_repo_path)
+    path = tmp_path / "multi.prom"
+    monkeypatch.setenv(METRICS_ENV_VAR, str(path))
+    stdin = io.BytesIO()
+    for message in (
+        {"jsonrpc": "2.0", "id": 1, "method": "status"},
+        {"jsonrpc": "2.0", "id": 2, "method": "status"},
+        {"jsonrpc": "2.0", "id": 3, "method": "syncVscode", "params": {"kind": "x"}},
+    ):
+        write_message(stdin, message)
+
+    result = CliRunner().invoke(main, ["serve", "--stdio"], input=stdin.getvalue())
+
+    assert result.exit_code == 0, result.output
+    samples = parse_textfile(path.read_text())
+    commands = {
+        dict(labels)["command"]: (dict(labels)["result"], value)
+        for (name, labels), value in samples.items()
+        if name == "multi_commands_total"
+    }
+    assert commands == {
+        "multi serve status": ("success", 2),
+        "multi serve syncVscode": ("failure", 1),
+    }
+
+
+@pytest.mark.parametrize("setting", [True, "multi.prom", {"textfile": 1}])
+def test_metrics_setting_must_be_an_object(tmp_path, monkeypatch, setting):
+    """Test that a "metrics" setting that is not an object is rejected."""
+    monkeypatch.delenv(METRICS_ENV_VAR, raising=False)
+    (tmp_path / "multi.json").write_text(json.dumps({"repos": [], "metrics": setting}))
+
+    with pytest.raises(ValueError, match='"metrics" must be an object'):
+        metrics_textfile(WorkspaceSession(tmp_path))
+
+
+def test_invalid_metrics_setting_does_not_fail_the_command(
+    setup_git_repos, monkeypatch
+):
+    """Test that the command runs, and the setting is reported, with metrics off."""
+    root_repo_path, _ = setup_git_repos
+    monkeypatch.chdir(root_repo_path)
+    monkeypatch.delenv(METRICS_ENV_VAR, raising=False)
+    multi_json = root_repo_path / "multi.json"
+    settings = json.loads(multi_json.read_text())
+    multi_json.write_text(json.dumps({**settings, "metrics": True}))
+
+    result = CliRunner().invoke(main, ["sync", "vscode"])
+
+    assert result.exit_code == 0, result.output
+    assert '"metrics" must be an object' in result.stderr
@@ -0,0 +1,169 @@
+import json
+from pathlib import Path
+
+import git
+from click.testing import CliRunner
+
+from multi.cli import main
+from multi.object_cache import (
+    OBJECT_CACHE_ENV_VAR,
+    default_object_cache_dir,
+    mirror_path,
+    object_cache_dir,
+    update_mirror,
+)
+from multi.session import WorkspaceSession
+from multi.sync import sync
+
+
+def _create_workspace(root_path, urls, **settings):
+    root_path.mkdir(parents=True)
+    (root_path / "multi.json").write_text(
+        json.dumps(
+            {
+                "repos": [{"url": url, "name": Path(url).stem} for url in urls],
+                **settings,
+            }
+        )
+    )
+    root_repo = git.Repo.init(root_path)
+    root_repo.git.add(["multi.json"])
+    root_repo.index.commit("Initial commit")
+
+
+def _push_commit(repo_path, message):
+    repo = git.Repo(repo_path)
+    repo.git.commit("--allow-empty", "-m", message)
+    repo.git.push("origin", "main")
+    return repo.head.commit.hexsha
+
+
+def test_object_cache_configuration(tmp_path, monkeypatch):
+    """Test the multi.json setting and the environment variable that overrides it."""
+    monkeypatch.delenv(OBJECT_CACHE_ENV_VAR, raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    multi_json = tmp_path / "multi.json"
+    multi_json.write_text(json.dumps({"repos": []}))
+    assert object_cache_dir(WorkspaceSession(tmp_path)) is None
+
+    multi_json.write_text(json.dumps({"repos": [], "objectCache": True}))
+    assert object_cache_dir(WorkspaceSession(tmp_path)) == default_object_cache_dir()
+    assert default_object_cache_dir() == tmp_path / "xdg" / "multi" / "objects"
+
+    multi_json.write_text(json.dumps({"repos": [], "objectCache": "cache"}))
+    assert object_cache_dir(WorkspaceSession(tmp_path)) == tmp_path.resolve() / "cache"
+
+    monkeypatch.setenv(OBJECT_CACHE_ENV_VAR, "")
+    assert object_cache_dir(WorkspaceSession(tmp_path)) is None
+
+
+def test_workspaces_share_mirrors(setup_git_repos_with_remotes, tmp_path, monkeypatch):
+    """Test that clones borrow objects from one mirror per remote."""
+    _, sub_repo_dirs = setup_git_repos_with_remotes
+    remotes_root = sub_repo_dirs[0].parent.parent / "remotes"
+    urls = [(remotes_root / f"{d.name}.git").as_uri() for d in sub_repo_dirs]
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv(OBJECT_CACHE_ENV_VAR, str(cache_dir))
+
+    for workspace in ("workspace1", "workspace2"):
+        _create_workspace(tmp_path / workspace, urls)
+        sync(root_dir=tmp_path / workspace)
+
+    assert len(list(cache_dir.glob("*.git"))) == len(urls)
+    for workspace in ("workspace1", "workspace2"):
+        for d, url in zip(sub_repo_dirs, urls, strict=True):
+            clone = tmp_path / workspace / d.name
+            alternates = clone / ".git" / "objects" / "info" / "alternates"
+            assert alternates.read_text().strip() == str(
+                mirror_path(cache_dir, url) / "objects"
+            )
+            # Every object is in the mirror, none were copied into the clone
+            counts = git.Repo(clone).git.count_objects("-v")
+            assert "\ncount: 0\n" in f"\n{counts}\n"
+            assert "\nin-pack: 0\n" in f"\n{counts}\n"
+
+
+def test_cache_update_fetches_every_mirror(
+    setup_git_repos_with_remotes, tmp_path, monkeypatch
+):
+    """Test that `multi cache update` refreshes mirrors, including other workspaces'."""
+    _, sub_repo_dirs = setup_git_repos_with_remotes
+    remotes_root = sub_repo_dirs[0].parent.parent / "remotes"
+    urls = [(remotes_root / f"{d.name}.git").as_uri() for d in sub_repo_dirs]
+    cache_dir = tmp_path / "cache"
+    # Only the first repository is in this workspace
+    workspace = tmp_path / "workspace"
+    _create_workspace(workspace, urls[:1], objectCache=str(cache_dir))
+    monkeypatch.delenv(OBJECT_CACHE_ENV_VAR, raising=False)
+    monkeypatch.chdir(workspace)
+    sync(root_dir=workspace)
+    other_mirror = mirror_path(cache_dir, urls[1])
+    assert update_mirror(other_mirror, urls[1]) == "created"
+
+    heads = [_push_commit(d, "New commit") for d in sub_repo_dirs]
+    result = CliRunner().invoke(main, ["cache", "update", "--jobs", "2"])
+
+    assert result.exit_code == 0, result.output
+    for url, head in zip(urls, heads, strict=True):
+        mirror = git.Repo(mirror_path(cache_dir, url))
+        assert mirror.git.rev_parse("main") == head
+        assert mirror.git.config("gc.auto") == "0"
+
+
+def test_cache_update_outside_a_workspace(tmp_path, monkeypatch):
+    """Test that a missing multi.json is reported once, without a traceback."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv(OBJECT_CACHE_ENV_VAR, str(tmp_path / "cache"))
+
+    result = CliRunner().invoke(main, ["cache", "update"])
+
+    assert result.exit_code == 1
+    assert isinstance(result.exception, SystemExit)
+    assert result.stderr.count("Could not find multi.json") == 1
+
+
+def test_mirrors_follow_clone_options(
+    setup_git_repos_with_remotes, tmp_path, monkeypatch
+):
+    """Test that partial clones get a partial mirror and shallow clones none."""
+    _, sub_repo_dirs = setup_git_repos_with_remotes
+    remotes_root = sub_repo_dirs[0].parent.parent / "remotes"
+    for name in ("repo0", "repo1"):
+        git.Repo(remotes_root / f"{name}.git").git.config(
+            "uploadpack.allowFilter", "true"
+        )
+    urls = [(remotes_root / f"{d.name}.git").as_uri() for d in sub_repo_dirs]
+    cache_dir = tmp_path / "cache"
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    (workspace / "multi.json").write_text(
+        json.dumps(
+            {
+                "repos": [
+                    {"url": urls[0], "name": "repo0", "clone": {"filter": "blob:none"}},
+                    {"url": urls[1], "name": "repo1", "clone": {"depth": 1}},
+                ],
+                "objectCache": str(cache_dir),
+            }
+        )
+    )
+    root_repo = git.Repo.init(workspace)
+    root_repo.git.add(["multi.json"])
+    root_repo.index.commit("Initial commit")
+    monkeypatch.delenv(OBJECT_CACHE_ENV_VAR, raising=False)
+    monkeypatch.chdir(workspace)
+
+    sync(root_dir=workspace)
+    result = CliRunner().invoke(main, ["cache", "update"])
+
+    assert result.exit_code == 0, result.output
+    partial_mirror = mirror_path(cache_dir, urls[0], "blob:none")
+    assert list(cache_dir.glob("*.git")) == [partial_mirror]
+    mirror = git.Repo(partial_mirror)
+    assert mirror.git.config("remote.origin.partialclonefilter") == "blob:none"
+    info = workspace / "repo0" / ".git" / "objects" / "info"
+    assert (info / "alternates").read_text().strip() == str(partial_mirror / "objects")
+    assert not (
+        workspace / "repo1" / ".git" / "objects" / "info" / "alternates"
+    ).exists()
+    assert (workspace / "repo1" / "README.md").exists()
@@ -0,0 +1,37 @@
+import threading
+
+from multi.parallel import run_in_parallel
+
+
+def test_run_in_parallel_collects_results_and_errors():
+    """Test that results keep input order and errors are captured per item."""
+
+    def task(item):
+        if item == 2:
+            raise ValueError("boom")
+        return item * 10
+
+    results = run_in_parallel(task, [1, 2, 3], jobs=3)
+
+    assert [result.item for result in results] == [1, 2, 3]
+    assert [result.value for result in results] == [10, None, 30]
+    assert [result.ok for result in results] == [True, False, True]
+    assert isinstance(results[1].error, ValueError)
+
+
+def test_run_in_parallel_fail_fast_cancels_pending_tasks():
+    """Test that fail_fast skips tasks that had not started yet."""
+    started = []
+    lock = threading.Lock()
+
+    def task(item):
+        with lock:
+            started.append(item)
+        if item == 0:
+            raise ValueError("boom")
+        return item
+
+    results = run_in_parallel(task, list(range(50)), jobs=1, fail_fast=True)
+
+    assert not results[0].ok
+    assert len(results) == len(started) < 50
@@ -0,0 +1,88 @@
+import pstats
+import threading
+
+from click.testing import CliRunner
+
+from multi.cli import main
+from multi.profiling import format_stages, recording, stage
+
+
+def test_stages_are_only_recorded_while_recording():
+    """Test that stage() records from any thread, and only inside recording()."""
+    with stage("ignored"):
+        pass
+
+    with recording() as recorder:
+        with stage("outer"):
+            with stage("inner"):
+                pass
+        for _ in range(2):
+            with stage("repeated"):
+                pass
+        worker = threading.Thread(target=stage("worker")(lambda: None))
+        worker.start()
+        worker.join()
+
+    with stage("after"):
+        pass
+
+    names = [record.name for record in recorder.records]
+    assert names == ["inner", "outer", "repeated", "repeated", "worker"]
+    assert recorder.records[-1].thread_id != threading.get_ident()
+    table = format_stages(recorder.records).splitlines()
+    assert [line.split()[0] for line in table] == [
+        "stage",
+        "outer",
+        "inner",
+        "repeated",
+        "worker",
+    ]
+    assert table[3].split()[1] == "2"
+
+
+def test_profile_option_writes_stats_and_stage_timings(
+    setup_git_repos, tmp_path, monkeypatch
+):
+    """Test that --profile writes a pstats file and reports every stage."""
+    root_repo_path, _ = setup_git_repos
+    monkeypatch.chdir(root_repo_path)
+    profile_path = tmp_path / "sync.pstats"
+
+    result = CliRunner().invoke(main, ["sync", f"--profile={profile_path}"])
+
+    assert result.exit_code == 0, result.output
+    assert pstats.Stats(str(profile_path)).total_calls > 0
+    for name in (
+        "load settings",
+        "load repos",
+        "clone repos",
+        "merge settings.json",
+        "merge extensions.json",
+        "convert cursor rules",
+        "check branches",
+    ):
+        assert name in result.stderr
+    assert "Ordered by: cumulative time" in result.stderr
+
+
+def test_profile_option_on_a_group_covers_the_subcommand(
+    setup_git_repos, tmp_path, monkeypatch
+):
+    """Test that --profile given to a group keeps profiling until the subcommand ends."""
+    root_repo_path, _ = setup_git_repos
+    monkeypatch.chdir(root_repo_path)
+    profile_path = tmp_path / "sync.pstats"
+
+    result = CliRunner().invoke(
+        main, ["sync", f"--profile={profile_path}", "vscode", "--force"]
+    )
+
+    assert result.exit_code == 0, result.output
+    functions = {function for _, _, function in pstats.Stats(str(profile_path)).stats}
+    assert "merge_vscode_configs" in functions
+    assert "merge settings.json" in result.stderr
+    # The branches are checked once, after the subcommand
+    stage_rows = [
+        line.split() for line in result.stderr.splitlines() if line.startswith("check")
+    ]
+    assert stage_rows[0][:3] == ["check", "branches", "1"]
@@ -0,0 +1,106 @@
+import io
+import json
+
+import click
+import git
+
+from multi.serve import (
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    WorkspaceServer,
+    read_message,
+    serve,
+    write_message,
+)
+from multi.session import get_session
+from multi.utils import soft_read_json_file
+
+
+def _framed(*messages):
+    stream = io.BytesIO()
+    for message in messages:
+        write_message(stream, message)
+    stream.seek(0)
+    return stream
+
+
+def _responses(stream):
+    stream.seek(0)
+    responses = []
+    while (body := read_message(stream)) is not None:
+        responses.append(json.loads(body))
+    return responses
+
+
+def test_serve_answers_framed_requests(setup_git_repos):
+    """Test requests, notifications and errors over Content-Length framing."""
+    root_repo_path, _ = setup_git_repos
+    stdin = _framed(
+        {"jsonrpc": "2.0", "id": 1, "method": "status"},
+        {"jsonrpc": "2.0", "method": "syncClaude"},
+        {"jsonrpc": "2.0", "id": 2, "method": "missing"},
+        {"jsonrpc": "2.0", "id": 3, "method": "syncVscode", "params": {"kind": "x"}},
+        {"jsonrpc": "2.0", "id": 4, "method": "setBranch", "params": {}},
+        {"jsonrpc": "2.0", "id": 5, "method": "shutdown"},
+        {"jsonrpc": "2.0", "id": 6, "method": "status"},
+    )
+    stdout = io.BytesIO()
+
+    serve(root_repo_path, stdin=stdin, stdout=stdout)
+
+    status, missing, bad_kind, no_branch, shutdown = _responses(stdout)
+    assert status["id"] == 1
+    assert status["result"]["onSameBranch"] is True
+    assert [repo["branch"] for repo in status["result"]["repos"]] == ["main", "main"]
+    assert missing["error"]["code"] == METHOD_NOT_FOUND
+    assert bad_kind["error"]["code"] == INVALID_PARAMS
+    assert no_branch["error"]["code"] == INVALID_PARAMS
+    # Nothing is answered after shutdown
+    assert shutdown == {"jsonrpc": "2.0", "id": 5, "result": None}
+
+
+def test_server_sees_changes_between_requests(setup_git_repos):
+    """Test that the warm session picks up files edited between requests."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    vscode_dir = sub_repo_dirs[0] / ".vscode"
+    vscode_dir.mkdir(exist_ok=True)
+    launch_path = vscode_dir / "launch.json"
+    merged_path = root_repo_path / ".vscode" / "launch.json"
+
+    server = WorkspaceServer(root_repo_path)
+    try:
+        launch_path.write_text(json.dumps({"configurations": [{"name": "One"}]}))
+        assert server.call("syncVscode", {"kind": "launch"}) == {"written": ["launch"]}
+        assert server.call("syncVscode", {"kind": "launch"}) == {"written": []}
+
+        launch_path.write_text(json.dumps({"configurations": [{"name": "Two"}]}))
+        assert server.call("syncVscode", ["launch"]) == {"written": ["launch"]}
+        names = [c["name"] for c in soft_read_json_file(merged_path)["configurations"]]
+        assert names == ["Two"]
+    finally:
+        server.close()
+
+
+def test_set_branch_uses_the_refreshed_session(setup_git_repos):
+    """Test that setBranch switches the repos of the current multi.json."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    root_repo = git.Repo(root_repo_path)
+    server = WorkspaceServer(root_repo_path)
+    # Under `multi serve`, get_session() returns the session cached on the context
+    with click.Context(click.Command("serve")):
+        try:
+            assert len(get_session(root_repo_path).repos) == 2
+            multi_json = root_repo_path / "multi.json"
+            settings = json.loads(multi_json.read_text())
+            settings["repos"] = settings["repos"][:1]
+            multi_json.write_text(json.dumps(settings))
+            root_repo.git.add("multi.json")
+            root_repo.index.commit("Drop repo1")
+
+            server.call("setBranch", ["feature/served"])
+        finally:
+            server.close()
+
+    assert root_repo.active_branch.name == "feature/served"
+    assert git.Repo(sub_repo_dirs[0]).active_branch.name == "feature/served"
+    assert git.Repo(sub_repo_dirs[1]).active_branch.name == "main"
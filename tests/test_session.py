@@ -0,0 +1,39 @@
+import click
+
+import multi.session
+from multi.session import get_session
+from multi.settings import settings_cache
+from multi.sync import sync
+
+
+def test_sync_loads_repos_once(setup_git_repos, monkeypatch):
+    """Test that a full sync constructs the repository list exactly once."""
+    root_repo_path, _ = setup_git_repos
+    calls = []
+    original_load_repos = multi.session.load_repos
+
+    def counting_load_repos(*args, **kwargs):
+        calls.append(args)
+        return original_load_repos(*args, **kwargs)
+
+    monkeypatch.setattr(multi.session, "load_repos", counting_load_repos)
+    settings_cache.clear()
+
+    sync(root_dir=root_repo_path)
+
+    assert len(calls) == 1
+    assert settings_cache.misses == 1
+
+
+def test_get_session_is_shared_within_click_context(setup_git_repos):
+    """Test that get_session returns one session per invocation and root."""
+    root_repo_path, _ = setup_git_repos
+
+    # Outside of Click every call gets a fresh session
+    assert get_session(root_repo_path) is not get_session(root_repo_path)
+
+    with click.Context(click.Command("outer")) as ctx:
+        session = get_session(root_repo_path)
+        with click.Context(click.Command("inner"), parent=ctx):
+            assert get_session(root_repo_path) is session
+        assert session.repos is session.repos
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from multi.settings import SettingsCache
+
+
+def test_settings_cache_returns_same_object_until_file_changes(tmp_path):
+    """Test that the cache hands back the same Settings until multi.json changes."""
+    multi_json_path = tmp_path / "multi.json"
+    multi_json_path.write_text(json.dumps({"repos": [{"url": "https://x/a"}]}))
+    cache = SettingsCache()
+
+    first = cache.get(multi_json_path)
+    second = cache.get(multi_json_path)
+    assert first is second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Changing the file (different size) invalidates the entry
+    multi_json_path.write_text(
+        json.dumps({"repos": [{"url": "https://x/a"}, {"url": "https://x/b"}]})
+    )
+    third = cache.get(multi_json_path)
+    assert third is not first
+    assert len(third["repos"]) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_settings_are_immutable(tmp_path):
+    """Test that cached settings cannot be modified by callers."""
+    multi_json_path = tmp_path / "multi.json"
+    multi_json_path.write_text(json.dumps({"repos": []}))
+    settings = SettingsCache().get(multi_json_path)
+
+    # Defaults are applied
+    assert "workbench.colorCustomizations" in settings["vscode"]["skipSettings"]
+
+    with pytest.raises(TypeError):
+        settings["vscode"]["skipSettings"] = []
+    with pytest.raises(AttributeError):
+        settings["vscode"]["skipSettings"].append("x")
+    with pytest.raises(AttributeError):
+        settings.dict = {}
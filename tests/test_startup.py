@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+# Cumulative import time allowed for multi.cli when running `multi --version`.
+# Generous, so that it only fails when something heavy is imported eagerly
+# again; importing GitPython alone takes about as long.
+STARTUP_IMPORT_BUDGET_US = 150_000
+
+
+def _imported_modules(*args):
+    """Run multi in a fresh interpreter; map imported modules to cumulative µs."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "multi", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            _, cumulative_us, name = line[len("import time:") :].split("|")
+            modules[name.strip()] = int(cumulative_us)
+    return modules
+
+
+def test_version_imports_no_subcommands():
+    """Test that `multi --version` only imports click and the entry point."""
+    modules = _imported_modules("--version")
+
+    assert "git" not in modules
+    assert sorted(name for name in modules if name.startswith("multi.")) == [
+        "multi._version",
+        "multi.cli",
+    ]
+    assert modules["multi.cli"] < STARTUP_IMPORT_BUDGET_US
+
+
+def test_subcommands_load_without_gitpython():
+    """Test that GitPython is only imported by code that calls it."""
+    modules = _imported_modules("sync", "--help")
+
+    # importlib.import_module is not logged by -X importtime, but what the
+    # loaded module imports is
+    assert "multi.sync_vscode" in modules
+    assert "multi.init" not in modules
+    assert "git" not in modules
@@ -0,0 +1,122 @@
+import json
+
+import git
+import pytest
+
+from multi.errors import GitError
+from multi.repos import CloneOptions
+from multi.sync import sync
+
+
+def _create_workspace(root_path, repos, **settings):
+    """Create a root repo with a multi.json listing the given repo configs."""
+    root_path.mkdir(parents=True)
+    (root_path / "multi.json").write_text(
+        json.dumps({"repos": repos, **settings}, indent=2)
+    )
+    root_repo = git.Repo.init(root_path)
+    root_repo.git.add(["multi.json"])
+    root_repo.index.commit("Initial commit")
+    return root_repo
+
+
+def test_sync_clones_repos_in_parallel(setup_git_repos_with_remotes, tmp_path):
+    """Test that sync clones every missing repo from file:// remotes."""
+    _, sub_repo_dirs = setup_git_repos_with_remotes
+    remotes_root = sub_repo_dirs[0].parent.parent / "remotes"
+    names = [sub_repo_dir.name for sub_repo_dir in sub_repo_dirs]
+    workspace = tmp_path / "workspace"
+    _create_workspace(
+        workspace,
+        [
+            {"url": (remotes_root / f"{name}.git").as_uri(), "name": name}
+            for name in names
+        ],
+    )
+
+    sync(root_dir=workspace, jobs=2)
+
+    for name in names:
+        cloned_repo = git.Repo(workspace / name)
+        assert cloned_repo.active_branch.name == "main"
+        assert (workspace / name / "README.md").exists()
+
+    gitignore_lines = (workspace / ".gitignore").read_text().splitlines()
+    ignore_lines = (workspace / ".ignore").read_text().splitlines()
+    for name in names:
+        assert f"{name}/" in gitignore_lines
+        assert f"!{name}/" in ignore_lines
+
+
+def test_sync_collects_clone_errors(setup_git_repos_with_remotes, tmp_path):
+    """Test that one failed clone does not stop the others and is reported."""
+    _, sub_repo_dirs = setup_git_repos_with_remotes
+    remotes_root = sub_repo_dirs[0].parent.parent / "remotes"
+    workspace = tmp_path / "workspace"
+    _create_workspace(
+        workspace,
+        [
+            {"url": (remotes_root / "repo0.git").as_uri(), "name": "repo0"},
+            {"url": (remotes_root / "missing.git").as_uri(), "name": "missing"},
+        ],
+    )
+
+    with pytest.raises(GitError, match="Failed to clone 1 of 2 repositories: missing"):
+        sync(root_dir=workspace, jobs=2)
+
+    assert (workspace / "repo0" / "README.md").exists()
+    assert not (workspace / "missing").exists()
+    # Ignore files are still updated after the clones finish
+    assert "missing/" in (workspace / ".gitignore").read_text().splitlines()
+
+
+def test_sync_applies_clone_options(setup_git_repos_with_remotes, tmp_path):
+    """Test partial and shallow clones, and checking out the root's branch in them."""
+    _, sub_repo_dirs = setup_git_repos_with_remotes
+    remotes_root = sub_repo_dirs[0].parent.parent / "remotes"
+    for name in ("repo0", "repo1"):
+        git.Repo(remotes_root / f"{name}.git").git.config(
+            "uploadpack.allowFilter", "true"
+        )
+    git.Repo(remotes_root / "repo1.git").git.branch("feature", "main")
+    workspace = tmp_path / "workspace"
+    root_repo = _create_workspace(
+        workspace,
+        [
+            {"url": (remotes_root / "repo0.git").as_uri(), "name": "repo0"},
+            {
+                "url": (remotes_root / "repo1.git").as_uri(),
+                "name": "repo1",
+                "clone": {"depth": 1, "noTags": True},
+            },
+        ],
+        clone={"filter": "blob:none"},
+    )
+    root_repo.git.checkout("-b", "feature")
+
+    sync(root_dir=workspace)
+
+    for name in ("repo0", "repo1"):
+        cloned_repo = git.Repo(workspace / name)
+        assert cloned_repo.git.config("remote.origin.partialclonefilter") == "blob:none"
+    repo0 = git.Repo(workspace / "repo0")
+    assert repo0.active_branch.name == "main"
+    assert repo0.git.rev_parse("--is-shallow-repository") == "false"
+    repo1 = git.Repo(workspace / "repo1")
+    assert repo1.git.rev_parse("--is-shallow-repository") == "true"
+    # Only the default branch was cloned, the root's branch was fetched after
+    assert repo1.active_branch.name == "feature"
+
+
+def test_clone_options_from_settings():
+    """Test that repo clone options override the defaults key by key, and are checked."""
+    options = CloneOptions.from_settings(
+        {"filter": "tree:0", "singleBranch": True}, {"singleBranch": False, "depth": 5}
+    )
+    assert options.git_args() == ["--filter=tree:0", "--depth=5"]
+    assert options.fetches_one_branch
+    assert CloneOptions.from_settings(None, None).git_args() == []
+
+    for config in ({"depth": 0}, {"depth": True}, {"noTags": "yes"}, {"shallow": 1}):
+        with pytest.raises(ValueError):
+            CloneOptions.from_settings(config)
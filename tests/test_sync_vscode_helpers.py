@@ -0,0 +1,135 @@
+import copy
+import random
+
+from multi.sync_vscode_helpers import (
+    _list_union,
+    _OwnedNodes,
+    deep_merge,
+    prefix_repo_name_to_path_recursive,
+)
+
+
+def _legacy_list_union(existing, new):
+    return existing + [x for x in new if x not in existing]
+
+
+def test_list_union_keeps_order_and_dedup_semantics():
+    """Test that only items equal to an existing item are dropped."""
+    existing = ["a", {"name": "x", "args": [1, 2]}, [1, {"k": None}], 1]
+    new = [
+        "b",
+        "a",
+        {"args": [1, 2], "name": "x"},  # equal dict, different key order
+        {"name": "x", "args": [2, 1]},  # different list order is not equal
+        [1, {"k": None}],
+        True,  # == 1
+        2.0,
+        "b",  # repeats within the new list are kept
+    ]
+    assert _list_union(existing, new) == _legacy_list_union(existing, new)
+    assert _list_union(existing, new) == existing + [
+        "b",
+        {"name": "x", "args": [2, 1]},
+        2.0,
+        "b",
+    ]
+
+
+def test_list_union_matches_linear_scan_on_random_values():
+    """Test the hash index against the previous implementation on random JSON."""
+    rng = random.Random(0)
+
+    def value(depth=0):
+        kind = rng.randrange(6 if depth < 2 else 4)
+        if kind == 0:
+            return rng.choice([0, 1, 1.0, True, False, None])
+        if kind == 1:
+            return rng.choice("abc")
+        if kind == 2:
+            return rng.randrange(3) + 0.5
+        if kind == 3:
+            return rng.choice([0.0, "", "0"])
+        if kind == 4:
+            return [value(depth + 1) for _ in range(rng.randrange(3))]
+        return {rng.choice("xy"): value(depth + 1) for _ in range(rng.randrange(3))}
+
+    for _ in range(500):
+        existing = [value() for _ in range(rng.randrange(6))]
+        new = [value() for _ in range(rng.randrange(6))]
+        assert _list_union(existing, new) == _legacy_list_union(existing, new)
+
+
+def test_list_union_falls_back_for_unhashable_items():
+    """Test that items without an equality key are still compared with ==."""
+    existing = [{1, 2}, "a"]
+    assert _list_union(existing, [{2, 1}, {3}, "a"]) == [{1, 2}, "a", {3}]
+
+
+def test_deep_merge_unions_nested_lists():
+    """Test that nested lists are unioned while other values are overridden."""
+    base = {"cSpell.words": ["alpha", "beta"], "nested": {"list": [{"a": 1}]}}
+    override = {"cSpell.words": ["beta", "gamma"], "nested": {"list": [{"a": 1}]}}
+    assert deep_merge(base, override) == {
+        "cSpell.words": ["alpha", "beta", "gamma"],
+        "nested": {"list": [{"a": 1}]},
+    }
+
+
+def test_deep_merge_shares_untouched_subtrees_and_never_mutates_inputs():
+    """Test that only the dicts and lists along changed paths are copied."""
+    base = {"untouched": {"big": list(range(10))}, "changed": {"a": 1}, "words": ["x"]}
+    override = {"changed": {"b": 2}, "words": ["y"], "new": {"c": [3]}}
+    base_before, override_before = copy.deepcopy(base), copy.deepcopy(override)
+
+    merged = deep_merge(base, override)
+
+    assert merged == {
+        "untouched": {"big": list(range(10))},
+        "changed": {"a": 1, "b": 2},
+        "words": ["x", "y"],
+        "new": {"c": [3]},
+    }
+    assert base == base_before and override == override_before
+    assert merged["untouched"] is base["untouched"]
+    assert merged["new"] is override["new"]
+    assert merged["changed"] is not base["changed"]
+
+
+def test_deep_merge_with_owned_nodes_updates_the_accumulator_in_place():
+    """Test that a sequence of merges sharing owned state matches separate merges."""
+    repos = [
+        {"files.exclude": {f"**/{i}": True}, "cSpell.words": [f"w{i}", "common"]}
+        for i in range(5)
+    ]
+    repos_before = copy.deepcopy(repos)
+
+    owned = _OwnedNodes()
+    accumulated = deep_merge({}, repos[0], owned=owned)
+    first = accumulated
+    for repo_json in repos[1:]:
+        accumulated = deep_merge(accumulated, repo_json, owned=owned)
+
+    expected = {}
+    for repo_json in repos:
+        expected = deep_merge(expected, repo_json)
+
+    assert accumulated == expected
+    assert accumulated is first
+    assert accumulated["cSpell.words"] == ["w0", "common", "w1", "w2", "w3", "w4"]
+    assert repos == repos_before
+
+
+def test_prefix_repo_name_only_copies_changed_containers():
+    """Test that values without ${workspaceFolder} are returned as they are."""
+    value = {"plain": {"a": [1, "x"]}, "path": ["${workspaceFolder}/src", "other"]}
+
+    result = prefix_repo_name_to_path_recursive(value, "repo0")
+
+    assert result == {
+        "plain": {"a": [1, "x"]},
+        "path": ["${workspaceFolder}/repo0/src", "other"],
+    }
+    assert result["plain"] is value["plain"]
+    assert value["path"][0] == "${workspaceFolder}/src"
+    untouched = {"a": {"b": ["c"]}}
+    assert prefix_repo_name_to_path_recursive(untouched, "repo0") is untouched
@@ -0,0 +1,133 @@
+import json
+
+from click.testing import CliRunner
+
+from multi.cli import main
+from multi.parallel import run_in_parallel
+from multi.profiling import recording, stage
+from multi.tracing import chrome_trace, otlp_trace
+
+
+def _run_nested_stages():
+    with recording() as recorder:
+        with stage("outer", kind="test"):
+            run_in_parallel(
+                lambda i: stage("task", index=i)(lambda: None)(), [0, 1], jobs=2
+            )
+            try:
+                with stage("failing"):
+                    raise ValueError()
+            except ValueError:
+                pass
+    return recorder.records
+
+
+def test_stages_nest_across_threads():
+    """Test that stages run on the thread pool are children of the submitting stage."""
+    records = _run_nested_stages()
+    by_name = {record.name: record for record in records}
+    tasks = [record for record in records if record.name == "task"]
+
+    assert by_name["outer"].parent_id is None
+    assert by_name["outer"].attributes == {"kind": "test"}
+    assert by_name["failing"].parent_id == by_name["outer"].span_id
+    assert by_name["failing"].error == "ValueError"
+    assert [record.parent_id for record in tasks] == [by_name["outer"].span_id] * 2
+    assert all(record.thread_name.startswith("multi") for record in tasks)
+
+
+def test_chrome_and_otlp_exports():
+    """Test the two trace formats for the same records."""
+    records = _run_nested_stages()
+    by_name = {record.name: record for record in records}
+    origin = by_name["outer"].start
+
+    chrome = chrome_trace(records, origin, "multi test")
+    spans = [event for event in chrome["traceEvents"] if event["ph"] == "X"]
+    assert [event["name"] for event in spans][0] == "outer"
+    assert spans[0]["ts"] == 0
+    assert spans[0]["args"] == {"kind": "test", "span_id": by_name["outer"].span_id}
+    assert {event["args"]["index"] for event in spans if event["name"] == "task"} == {
+        0,
+        1,
+    }
+    # Every task started on a pool thread is linked back to "outer"
+    flows = [event for event in chrome["traceEvents"] if event["ph"] in "sf"]
+    assert len(flows) == 4
+
+    otlp = otlp_trace(records, origin, 1_000_000_000)
+    otlp_spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    outer = otlp_spans[0]
+    assert outer["startTimeUnixNano"] == "1000000000"
+    assert "parentSpanId" not in outer
+    assert {span["traceId"] for span in otlp_spans} == {outer["traceId"]}
+    failing = next(span for span in otlp_spans if span["name"] == "failing")
+    assert failing["parentSpanId"] == outer["spanId"]
+    assert failing["status"] == {"code": 2, "message": "ValueError"}
+
+
+def test_trace_option_writes_nested_spans(setup_git_repos, tmp_path, monkeypatch):
+    """Test that --trace writes a Chrome trace, or appends OTLP JSON lines."""
+    root_repo_path, _ = setup_git_repos
+    monkeypatch.chdir(root_repo_path)
+    trace_path = tmp_path / "sync.json"
+
+    result = CliRunner().invoke(main, ["sync", "--trace", str(trace_path)])
+
+    assert result.exit_code == 0, result.output
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    spans = {event["args"]["span_id"]: event for event in events if event["ph"] == "X"}
+    scans = [span for span in spans.values() if span["name"] == "scan repo"]
+    assert {span["args"]["repo"] for span in scans} >= {"repo0", "repo1"}
+    # Files are read on the thread pool, under the stages that asked for them
+    chain = []
+    span = next(span for span in spans.values() if span["name"] == "read file")
+    while span:
+        chain.append(span["name"])
+        span = spans.get(span["args"].get("parent_id"))
+    assert chain[1:] == [
+        "read merge inputs",
+        "merge vscode configs",
+        "sync",
+        "multi sync",
+    ]
+
+    otlp_path = tmp_path / "spans.jsonl"
+    for _ in range(2):
+        result = CliRunner().invoke(
+            main, ["git", "--trace", str(otlp_path), "status", "--short"]
+        )
+        assert result.exit_code == 0, result.output
+    lines = [json.loads(line) for line in otlp_path.read_text().splitlines()]
+    assert len(lines) == 2
+    names = [
+        span["name"] for span in lines[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    assert names.count("git status") == 3
+
+
+def test_trace_option_on_a_group_covers_the_subcommand(
+    setup_git_repos, tmp_path, monkeypatch
+):
+    """Test that --trace given to a group keeps tracing until the subcommand ends."""
+    root_repo_path, _ = setup_git_repos
+    monkeypatch.chdir(root_repo_path)
+    trace_path = tmp_path / "vscode.json"
+
+    result = CliRunner().invoke(
+        main, ["sync", "--trace", str(trace_path), "vscode", "--force"]
+    )
+
+    assert result.exit_code == 0, result.output
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    spans = {event["args"]["span_id"]: event for event in events if event["ph"] == "X"}
+    root = next(span for span in spans.values() if "parent_id" not in span["args"])
+    assert root["name"] == "multi sync vscode"
+    merges = [span for span in spans.values() if span["name"] == "merge settings.json"]
+    assert merges
+    assert "check branches" in {span["name"] for span in spans.values()}
+    # Every span of the subcommand is nested under the command's span
+    for span in spans.values():
+        while "parent_id" in span["args"]:
+            span = spans[span["args"]["parent_id"]]
+        assert span is root
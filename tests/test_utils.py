@@ -1,6 +1,14 @@
 import copy
+import json
+import os
 
-from multi.utils import apply_defaults_to_structure
+from multi.utils import (
+    apply_defaults_to_structure,
+    soft_read_json_file,
+    strip_jsonc,
+    write_file_if_changed,
+    write_json_file,
+)
 
 
 def test_apply_defaults_to_list_of_dicts():
@@ -222,3 +230,96 @@ def test_primitive_defaults():
     assert apply_defaults_to_structure(None, 42) == 42
     assert apply_defaults_to_structure("existing", "default") == "existing"
     assert apply_defaults_to_structure(10, "default") == 10
+
+
+def test_apply_defaults_returns_target_when_nothing_is_missing():
+    """Test that defaults which are all present do not copy the target."""
+    target = {"cwd": "x", "items": [{"a": 1, "b": 2}, "s"], "other": {"k": [1]}}
+    defaults = {"cwd": "d", "items": [{"a": 0}]}
+    assert apply_defaults_to_structure(target, defaults) is target
+
+    result = apply_defaults_to_structure(target, {"items": [{"c": 3}]})
+    assert result is not target
+    assert result["other"] is target["other"]
+    assert result["items"][1] == "s"
+    assert "c" not in target["items"][0]
+
+
+def test_strip_jsonc_removes_comments_and_trailing_commas():
+    """Test that JSONC comments and trailing commas are removed."""
+    text = """// header comment
+{
+    /* block
+       comment */
+    "a": 1, // trailing line comment
+    "list": [1, 2, /* inline */ 3,],
+    "nested": {"b": true, /* c */},
+}
+"""
+    assert json.loads(strip_jsonc(text)) == {
+        "a": 1,
+        "list": [1, 2, 3],
+        "nested": {"b": True},
+    }
+    # Line numbers are preserved for parse errors
+    assert strip_jsonc(text).count("\n") == text.count("\n")
+
+
+def test_strip_jsonc_keeps_commas_followed_by_values():
+    """Test that a comma before a comment and another value is not removed."""
+    text = '{"a": [1, /* x */ 2], "b": {"c": 1, /* y */ "d": 2}}'
+    assert json.loads(strip_jsonc(text)) == {"a": [1, 2], "b": {"c": 1, "d": 2}}
+
+
+def test_strip_jsonc_leaves_strings_untouched():
+    """Test that comment markers, commas and escapes inside strings are kept."""
+    text = r"""{
+    "url": "http://example.com/*not a comment*/",
+    "path": "${workspaceFolder}//x",
+    "quote": "say \"hi\" // still a string,]",
+    "backslash": "C:\\",
+    "comma": ",}"
+}"""
+    assert json.loads(strip_jsonc(text)) == {
+        "url": "http://example.com/*not a comment*/",
+        "path": "${workspaceFolder}//x",
+        "quote": 'say "hi" // still a string,]',
+        "backslash": "C:\\",
+        "comma": ",}",
+    }
+
+
+def test_soft_read_json_file_reads_jsonc(tmp_path):
+    """Test that soft_read_json_file accepts JSONC and handles missing files."""
+    path = tmp_path / "settings.json"
+    path.write_text('// generated\n{"editor.tabSize": 2, /* x */}\n')
+    assert soft_read_json_file(path) == {"editor.tabSize": 2}
+    assert soft_read_json_file(tmp_path / "missing.json") == {}
+
+
+def test_write_file_if_changed_only_replaces_different_content(tmp_path):
+    """Test that identical content leaves the file alone and new content replaces it."""
+    path = tmp_path / "nested" / "file.txt"
+    assert write_file_if_changed(path, "one") is True
+    os.chmod(path, 0o640)
+    inode = path.stat().st_ino
+
+    assert write_file_if_changed(path, b"one") is False
+    assert path.stat().st_ino == inode
+
+    assert write_file_if_changed(path, "two") is True
+    assert path.read_text() == "two"
+    # Replaced atomically (a new inode), keeping the mode and leaving no temp files
+    assert path.stat().st_ino != inode
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert os.listdir(path.parent) == ["file.txt"]
+
+
+def test_write_json_file_reports_whether_it_wrote(tmp_path):
+    """Test that write_json_file skips rewriting identical JSON."""
+    path = tmp_path / "settings.json"
+    assert write_json_file(path, {"a": 1}, header_comment="generated") is True
+    assert path.read_text().startswith("// generated\n")
+    assert soft_read_json_file(path) == {"a": 1}
+    assert write_json_file(path, {"a": 1}, header_comment="generated") is False
+    assert write_json_file(path, {"a": 2}, header_comment="generated") is True
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+
+import pytest
+from click.testing import CliRunner
+
+import multi.watch
+from multi.cli import main
+from multi.session import WorkspaceSession
+from multi.utils import soft_read_json_file
+from multi.watch import (
+    PollingWatcher,
+    WatchPlan,
+    _load_inotify,
+    collect_changes,
+    create_watcher,
+    plan_changes,
+    run_plan,
+    watch_workspace,
+)
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_plan_changes_maps_paths_to_stages(setup_git_repos):
+    """Test that each changed file only schedules the stage it feeds."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    repo0, repo1 = sub_repo_dirs
+    session = WorkspaceSession(root_repo_path)
+
+    plan = plan_changes(
+        session,
+        [
+            repo1 / ".vscode" / "tasks.json",
+            repo0 / ".vscode" / "settings.shared.json",
+            repo0 / ".vscode" / "tasks.json",
+            repo0 / ".cursor" / "rules" / "style.mdc",
+            repo1 / "ruff.toml",
+            # Generated files and unrelated files are ignored
+            root_repo_path / ".vscode" / "settings.json",
+            root_repo_path / "CLAUDE.md",
+            root_repo_path / "ruff.toml",
+            repo0 / "main.py",
+        ],
+    )
+    assert plan.merger_kinds == ["settings", "tasks"]
+    assert plan.cursor_dirs == [repo0 / ".cursor"]
+    assert plan.ruff is True
+    assert plan.reload is False
+
+    assert plan_changes(session, [root_repo_path / "multi.json"]).reload is True
+    assert plan_changes(session, [root_repo_path / ".vscode" / "launch.json"]).is_empty
+
+
+def test_python_marker_changes_update_settings(setup_git_repos):
+    """Test that adding pyproject.toml to a repo adds it to the Python paths."""
+    root_repo_path, sub_repo_dirs = setup_git_repos
+    repo0 = sub_repo_dirs[0]
+    settings_path = root_repo_path / ".vscode" / "settings.json"
+    run_plan(
+        WorkspaceSession(root_repo_path), WatchPlan(["settings"], [], False, False)
+    )
+    assert "python.autoComplete.extraPaths" not in soft_read_json_file(settings_path)
+
+    (repo0 / "pyproject.toml").write_text("[project]\n")
+    session = WorkspaceSession(root_repo_path)
+    plan = plan_changes(session, [repo0 / "pyproject.toml"])
+    assert plan.merger_kinds == ["settings"]
+    assert plan_changes(session, [root_repo_path / "setup.py"]).is_empty
+
+    run_plan(session, plan)
+    extra_paths = soft_read_json_file(settings_path)["python.autoComplete.extraPaths"]
+    assert extra_paths == [repo0.name]
+
+
+def test_polling_watcher_coalesces_a_burst_of_changes(tmp_path):
+    """Test that many writes in quick succession come back as one batch."""
+    (tmp_path / ".vscode").mkdir()
+    watcher = PollingWatcher([tmp_path, tmp_path / ".vscode"], interval=0.02)
+
+    def burst():
+        for i in range(30):
+            (tmp_path / ".vscode" / f"file{i}.json").write_text("{}")
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=burst)
+    thread.start()
+    changed = collect_changes(watcher, timeout=5, debounce=0.2)
+    thread.join()
+
+    # The directory itself is reported too, since its mtime changed
+    files = {path for path in changed if path.suffix == ".json"}
+    assert files == {tmp_path / ".vscode" / f"file{i}.json" for i in range(30)}
+    assert collect_changes(watcher, timeout=0.1) == set()
+
+
+@pytest.mark.skipif(_load_inotify() is None, reason="inotify is not available")
+def test_inotify_watcher_sees_files_in_new_directories(tmp_path):
+    """Test that a directory created after watching started is picked up."""
+    watcher = create_watcher([tmp_path, tmp_path / ".vscode"])
+    try:
+        assert watcher.name == "inotify"
+        (tmp_path / ".vscode").mkdir()
+        (tmp_path / ".vscode" / "launch.json").write_text("{}")
+        changed = collect_changes(watcher, timeout=5, debounce=0.2)
+        assert tmp_path / ".vscode" / "launch.json" in changed
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watch_workspace_remerges_changed_files(
+    setup_git_repos, monkeypatch, use_inotify
+):
+    """Test that a saved launch.json only re-runs the launch merger."""
+    if use_inotify and _load_inotify() is None:
+        pytest.skip("inotify is not available")
+    if not use_inotify:
+        monkeypatch.setattr(multi.watch, "_load_inotify", lambda: None)
+    root_repo_path, sub_repo_dirs = setup_git_repos
+
+    ran = []
+    original_run_plan = multi.watch.run_plan
+
+    def recording_run_plan(session, plan):
+        ran.append(plan)
+        original_run_plan(session, plan)
+
+    monkeypatch.setattr(multi.watch, "run_plan", recording_run_plan)
+
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=watch_workspace,
+        kwargs={
+            "root_dir": root_repo_path,
+            "debounce": 0.1,
+            "poll_interval": 0.05,
+            "stop": stop,
+        },
+    )
+    thread.start()
+    try:
+        time.sleep(0.2)
+        launch_dir = sub_repo_dirs[0] / ".vscode"
+        launch_dir.mkdir(exist_ok=True)
+        (launch_dir / "launch.json").write_text(
+            json.dumps({"configurations": [{"name": "Run", "type": "python"}]})
+        )
+        merged_path = root_repo_path / ".vscode" / "launch.json"
+        assert _wait_for(lambda: soft_read_json_file(merged_path).get("configurations"))
+    finally:
+        stop.set()
+        thread.join()
+
+    assert [plan.merger_kinds for plan in ran] == [["launch"]]
+
+
+def test_watch_cannot_be_combined_with_a_subcommand(setup_git_repos, monkeypatch):
+    """Test that `multi sync --watch vscode` fails instead of merging once."""
+    root_repo_path, _ = setup_git_repos
+    monkeypatch.chdir(root_repo_path)
+    settings_path = root_repo_path / ".vscode" / "settings.json"
+    settings_path.unlink()
+
+    result = CliRunner().invoke(main, ["sync", "--watch", "vscode"])
+
+    assert result.exit_code != 0
+    assert "--watch cannot be combined with a subcommand" in result.stderr
+    assert not settings_path.exists()